@@ -1,9 +1,16 @@
-from typing import Optional
+import argparse
+import json
+from typing import Optional, List, Sequence
 
+from aave_tokens_model.core.log_sink import FORMATS, StructuredLogSink
 from aave_tokens_model.core.logging import get_logger
+from aave_tokens_model.core.metrics import get_metrics
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.reporter import DeltaReporter, render_block
+from aave_tokens_model.core.scenario import ScenarioRunner, read_operations
+from aave_tokens_model.core.timeline import Timeline, read_rebase_factors
 from aave_tokens_model.core.tokens import (
-    get_asteth, get_steth, get_debtsteth,
-    deposit_steth, stake_eth, borrow_steth, repay_steth
+    Market, get_asteth, get_steth, get_debtsteth, get_market
 )
 from aave_tokens_model.core.utilities import generate_address, AddressT
 
@@ -12,32 +19,32 @@ Logger = get_logger()
 
 @Logger.function_log
 def stake(user: AddressT, value: float) -> float:
-    return stake_eth(get_steth(), user, value)
+    return get_market().stake(user, value)
 
 
 @Logger.function_log
 def deposit(user: AddressT, value: float) -> float:
-    return deposit_steth(get_steth(), get_asteth(), user, value)
+    return get_market().deposit(user, value)
 
 
 @Logger.function_log
 def borrow(user: AddressT, value: float) -> float:
-    return borrow_steth(
-        get_steth(), get_debtsteth(), get_asteth(), user, value
-    )
+    return get_market().borrow(user, value)
 
 
 @Logger.function_log
 def repay(user: AddressT, value: float) -> float:
-    return repay_steth(get_steth(), get_debtsteth(), get_asteth(), user, value)
+    return get_market().repay(user, value)
 
 
 @Logger.function_log
 def rebase(factor: float) -> float:
-    return get_steth().rebase_mul(factor)
+    return get_market().rebase(factor)
 
 
 class Account:
+    __slots__ = ('_address',)
+
     def __init__(self, steth_amount: Optional[int] = None):
         if steth_amount is None:
             steth_amount = 0
@@ -48,14 +55,68 @@ class Account:
             assert get_steth().balance_of(self._address) == steth_amount
 
     @property
-    def address(self) -> str:
+    def address(self) -> AddressT:
         return self._address
 
 
-def main():
-    get_steth().switch_up_logger(True)
-    get_asteth().switch_up_logger(True)
-    get_debtsteth().switch_up_logger(True)
+def positive_int(text: str) -> int:
+    """Parse a positive integer argument."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'{text} is not a positive integer')
+    return value
+
+
+def run_scenario(
+        path: str, snapshot_every: int, verbose: bool,
+        log_sink: Optional[StructuredLogSink] = None,
+        rebases: Optional[str] = None, report_days: Sequence[int] = (),
+        report: Optional[str] = None
+) -> None:
+    """
+    Run scenario file; print snapshots as JSON lines.
+
+    With `log_sink` operations are logged into it instead of stdout.
+    With `rebases` the scenario is replayed over the daily rebase history
+    of file, in a market accruing interest by the default rate model, and
+    reports of `report_days` are printed instead of snapshots.
+    With `report` changes of every operation are written into the file as
+    delta records.
+    """
+    if rebases is None:
+        runner = ScenarioRunner(get_market())
+    else:
+        runner = ScenarioRunner(Market(rate_model=RateModel()))
+    if log_sink is not None:
+        runner.market.switch_up_structured_log(log_sink)
+    else:
+        runner.market.switch_up_logger(verbose)
+    reporter = DeltaReporter(report)
+    if report is not None:
+        reporter.attach(runner.market)
+    if rebases is not None:
+        timeline = Timeline(runner, read_rebase_factors(rebases))
+        reports = timeline.run(read_operations(path), report_days)
+    else:
+        reports = runner.run(read_operations(path), snapshot_every)
+    with reporter:
+        for snapshot in reports:
+            print(json.dumps(snapshot._asdict()))
+
+
+def run_default_scenario(report: Optional[str] = None):
+    """
+    Run the built-in steps printing a text block of balances after each.
+
+    With `report` changes of every step are written into the file as
+    delta records instead and a summary is printed at the end.
+    """
+    market = get_market()
+    market.switch_up_logger(report is None)
+    reporter = None
+    if report is not None:
+        reporter = DeltaReporter(report)
+        reporter.attach(market)
 
     get_new_acc = Account
 
@@ -65,94 +126,138 @@ def main():
 
     all_accounts = {'a': a, 'b': b, 'c': c}
 
-    def _acc_info(name: str, acc: Account) -> str:
-        address = acc.address
-        return (
-            f'Address of {name} = {address}; '
-            f'stETH balance = {get_steth().balance_of(address)}; '
-            f'aStETH balance = {get_asteth().balance_of(address)}; '
-            f'debtStETH balance = {get_debtsteth().balance_of(address)}'
-        )
-
-    def _all_accounts_info() -> str:
-        return '\n'.join((
-            _acc_info(name, acc) for name, acc in all_accounts.items()
-        ))
-
-    def _balance_of_asteth() -> str:
-        address = get_asteth().address
-        return (
-            f'Address of aStETH = {address}; '
-            f'stETH balance = {get_steth().balance_of(address)}; '
-            f'total supply = {get_asteth().total_supply()}; '
-            f'total shares = {get_asteth()._total_shares}'  # noqa
-        )
-
-    def _block_header(name: str) -> str:
-        name = f'  {name}  '
-        name = name.ljust(70, '=')
-        name = name.rjust(110, '=')
-
-        return name
-
-    def _block_end() -> str:
-        return '=' * 110
-
-    def _single_block(name: str) -> str:
-        elements = [
-            _block_header(name),
-            _all_accounts_info(),
-            _balance_of_asteth(),
-            _block_end()
-        ]
-
-        return '\n'.join(elements)
+    def _single_block(name: str) -> None:
+        if reporter is None:
+            print(render_block(market, name, {
+                label: acc.address for label, acc in all_accounts.items()
+            }))
 
     # Initial state
-    print(_single_block('Initial state'))
+    _single_block('Initial state')
 
     # Deposit #1
     deposit(a.address, 500)
     deposit(b.address, 500)
-    print(_single_block('Deposit #1'))
+    _single_block('Deposit #1')
 
     # Borrow #1
     borrow(c.address, 500)
-    print(_single_block('Borrow #1'))
+    _single_block('Borrow #1')
 
     # Rebase #1; x2
     rebase(2.0)
-    print(_single_block('Rebase #1'))
+    _single_block('Rebase #1')
 
     # Repay #1
     repay(c.address, 500)
-    print(_single_block('Repay #1'))
+    _single_block('Repay #1')
 
     # Rebase #2
     rebase(2.0)
-    print(_single_block('Rebase #2'))
+    _single_block('Rebase #2')
 
     # Deposit #2
     d = get_new_acc(steth_amount=1000)
     all_accounts['d'] = d
     deposit(d.address, 500)
-    print(_single_block('Deposit #2'))
+    _single_block('Deposit #2')
 
     # Rebase #3
     rebase(2.0)
-    print(_single_block('Rebase #3'))
+    _single_block('Rebase #3')
 
     # Borrow #2
     borrow(c.address, 500)
-    print(_single_block('Borrow #2'))
+    _single_block('Borrow #2')
 
     # Rebase #4
     rebase(2.0)
-    print(_single_block('Rebase #4'))
+    _single_block('Rebase #4')
 
     # Repay #2
     repay(c.address, 500)
-    print(_single_block('Repay #2'))
+    _single_block('Repay #2')
+
+    if reporter is not None:
+        print(json.dumps(reporter.summary()))
+        reporter.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='aave_market_model',
+        description='Run the market model; the built-in steps by default.'
+    )
+    parser.add_argument(
+        'scenario', nargs='?',
+        help='JSONL or CSV file with operations to run instead.'
+    )
+    parser.add_argument(
+        '--snapshot-every', type=positive_int, default=1000,
+        help='Print aggregate state every N operations of scenario.'
+    )
+    parser.add_argument(
+        '--verbose', action='store_true',
+        help='Log every operation of scenario.'
+    )
+    parser.add_argument(
+        '--rebases', metavar='CSV',
+        help='Replay scenario over daily rebase factors (or APR) of file.'
+    )
+    parser.add_argument(
+        '--report-days', type=int, nargs='*', default=[], metavar='DAY',
+        help='Print state at the end of these days of --rebases history.'
+    )
+    parser.add_argument(
+        '--report', metavar='PATH',
+        help='Write changes of every operation into file as delta records.'
+    )
+    parser.add_argument(
+        '--log-file', metavar='PATH',
+        help='Write structured records of scenario operations to file.'
+    )
+    parser.add_argument(
+        '--log-format', choices=FORMATS, default='jsonl',
+        help='Format of records of --log-file.'
+    )
+    parser.add_argument(
+        '--log-max-bytes', type=int, default=100 * 2 ** 20,
+        help='Rotate --log-file when it grows over this size.'
+    )
+    parser.add_argument(
+        '--metrics-json', metavar='PATH',
+        help='Save call counts and latencies of operations as JSON.'
+    )
+    args = parser.parse_args(argv)
+    if args.log_file and args.scenario is None:
+        parser.error('--log-file needs a scenario')
+    if args.report_days and args.rebases is None:
+        parser.error('--report-days needs --rebases')
+
+    metrics = get_metrics()
+    if args.metrics_json:
+        metrics.enable()
+
+    if args.scenario is None:
+        run_default_scenario(args.report)
+    elif args.log_file:
+        with StructuredLogSink(
+                args.log_file, args.log_format, args.log_max_bytes
+        ) as sink:
+            run_scenario(
+                args.scenario, args.snapshot_every, args.verbose, sink,
+                args.rebases, args.report_days, args.report
+            )
+    else:
+        run_scenario(
+            args.scenario, args.snapshot_every, args.verbose,
+            rebases=args.rebases, report_days=args.report_days,
+            report=args.report
+        )
+
+    if args.metrics_json:
+        metrics.dump(args.metrics_json)
+
 
-    if __name__ == '__main__':
-        main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Checkpointed history of a market.
+
+After `attach` the history keeps, for every token of market:
+
+* per-account checkpoints of internal balances: a list of steps at which
+  the balance changed and a list of the new balances, appended by balance
+  hooks of tokens;
+* a global timeline of the scalar state (`_total_supply`,
+  `StETH._pooled_eth`, `AStETH._total_shares`/`_liq_index`,
+  `VDebtStETH._borrowed_shares`/`_bor_index`), appended after operations
+  that changed it.
+
+Storage is proportional to the number of changes. A token at a past step
+is a copy of the live token over the checkpoints found by bisection, so
+`balance_of_at` and `total_supply_at` use the same formulas as the live
+`balance_of` and `total_supply`. The queries share one set of copies that
+is moved between steps by resetting its scalar state, so a query copies
+nothing.
+
+Step `s` is the state after `s` operations of market. The history follows
+operations of market: direct calls of token methods are seen at the next
+operation.
+"""
+import copy
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import AStETH, Market, StETH, VDebtStETH
+from aave_tokens_model.core.tokens.erc20 import ERC20
+from aave_tokens_model.core.utilities.types import AddressT
+
+_Checkpoints = Tuple[List[int], List[Any]]
+
+# Scalar state of tokens kept in the timeline.
+_FIELDS = {
+    StETH: ('_total_supply', '_pooled_eth'),
+    VDebtStETH: ('_total_supply', '_borrowed_shares', '_bor_index'),
+    AStETH: ('_total_supply', '_total_shares', '_liq_index'),
+}
+
+
+class CheckpointLedger:
+    """Read-only ledger of internal balances at a step."""
+
+    def __init__(self, checkpoints: Dict[AddressT, _Checkpoints], step: int):
+        self._checkpoints = checkpoints
+        self._step = step
+
+    def get(self, user: AddressT, default: Any = 0) -> Any:
+        checkpoints = self._checkpoints.get(user)
+        if checkpoints is None:
+            return default
+        steps, values = checkpoints
+        position = bisect_right(steps, self._step)
+        if position == 0:
+            return default
+        return values[position - 1]
+
+    def __getitem__(self, user: AddressT) -> Any:
+        return self.get(user)
+
+    def get_many(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users as an array."""
+        return np.fromiter(
+            (self.get(user) for user in users),
+            dtype=np.float64, count=len(users)
+        )
+
+
+class History:
+    """Balance checkpoints and state timeline of a market."""
+
+    def __init__(self):
+        self._market: Optional[Market] = None
+        self._start = 0
+        self._balances: Dict[ERC20, Dict[AddressT, _Checkpoints]] = {}
+        self._steps: List[int] = []
+        self._states: List[Tuple] = []
+        self._views: Optional[Tuple[StETH, VDebtStETH, AStETH]] = None
+        self._view_step: Optional[int] = None
+
+    @property
+    def start(self) -> int:
+        """Get the first step of history."""
+        return self._start
+
+    def _tokens(self) -> Tuple[StETH, VDebtStETH, AStETH]:
+        market = self._market
+        return market.steth, market.debtsteth, market.asteth
+
+    def attach(self, market: Market) -> None:
+        """Start recording history from the current state of market."""
+        self._market = market
+        self._start = market.step
+        self._balances = {}
+        for token in self._tokens():
+            self._balances[token] = {
+                user: ([market.step], [value])
+                for user, value in token._balances.items()
+            }
+            token.add_hook(self)
+            token._history = self
+        self._steps = [market.step]
+        self._states = [self._state()]
+        self._views = None
+        self._view_step = None
+        market.subscribe(self)
+
+    def detach(self) -> None:
+        """
+        Stop recording; recorded history stays queryable through the
+        history, no more through tokens.
+        """
+        market = self._market
+        market.unsubscribe(self)
+        for token in self._tokens():
+            token.remove_hook(self)
+            if token._history is self:
+                token._history = None
+
+    def _state(self) -> Tuple:
+        return tuple(
+            tuple(getattr(token, field) for field in _FIELDS[type(token)])
+            for token in self._tokens()
+        )
+
+    def on_balances(
+            self, token: ERC20, users: Sequence[AddressT], deltas: Any
+    ) -> None:
+        # Hooks run inside the operation that makes the next step.
+        step = self._market.step + 1
+        checkpoints = self._balances[token]
+        ledger = token._balances
+        for user in users:
+            value = ledger[user]
+            steps_values = checkpoints.get(user)
+            if steps_values is None:
+                if value != 0:
+                    checkpoints[user] = ([step], [value])
+                continue
+            steps, values = steps_values
+            if values[-1] == value:
+                continue
+            if steps[-1] == step:
+                values[-1] = value
+            else:
+                steps.append(step)
+                values.append(value)
+
+    def on_operation(self, market: Market, name: str, args: Tuple) -> None:
+        state = self._state()
+        if state != self._states[-1]:
+            self._steps.append(market.step)
+            self._states.append(state)
+
+    def _copies(self) -> Tuple[StETH, VDebtStETH, AStETH]:
+        """Get detached copies of tokens over the checkpoints."""
+        tokens = []
+        for token in self._tokens():
+            past = copy.copy(token)
+            past._balances = CheckpointLedger(
+                self._balances[token], self._start
+            )
+            past._hooks = []
+            past._history = None
+            past._verbose = False
+            tokens.append(past)
+
+        steth, debtsteth, asteth = tokens
+        debtsteth._steth = steth
+        asteth._steth = steth
+        asteth._debtsteth = debtsteth
+        return steth, debtsteth, asteth
+
+    def _move(self, tokens: Tuple[ERC20, ...], step: int) -> None:
+        """Put copies of tokens into state after step."""
+        if step < self._start:
+            raise ValueError(f'no history before step {self._start}')
+        state = self._states[bisect_right(self._steps, step) - 1]
+        for past, fields in zip(tokens, state):
+            past._balances._step = step
+            for name, value in zip(_FIELDS[type(past)], fields):
+                setattr(past, name, value)
+            # Drop conversions cached for another state.
+            past._touch()
+
+    def tokens_at(self, step: int) -> Tuple[StETH, VDebtStETH, AStETH]:
+        """Get detached copies of tokens in state after step."""
+        tokens = self._copies()
+        self._move(tokens, step)
+        return tokens
+
+    def token_at(self, token: ERC20, step: int) -> ERC20:
+        """Get copy of token of market in state after step."""
+        index = self._tokens().index(token)
+        return self.tokens_at(step)[index]
+
+    def _view(self, token: ERC20, step: int) -> ERC20:
+        """Get shared copy of token in state after step."""
+        if self._views is None:
+            self._views = self._copies()
+        if step != self._view_step:
+            self._view_step = None
+            self._move(self._views, step)
+            self._view_step = step
+        return self._views[self._tokens().index(token)]
+
+    def balance_of_at(self, token: ERC20, user: AddressT, step: int) -> Any:
+        """Get balance of user of token of market after step."""
+        return self._view(token, step).balance_of(user)
+
+    def total_supply_at(self, token: ERC20, step: int) -> Any:
+        """Get total supply of token of market after step."""
+        return self._view(token, step).total_supply()
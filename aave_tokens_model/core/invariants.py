@@ -0,0 +1,161 @@
+"""
+Incremental invariant checker of a market.
+
+The checker keeps a running sum of internal balances of every token,
+updated by balance hooks of tokens, and checks after every operation of
+market in O(1) (plus the accounts touched by operation):
+
+* the sum of internal balances of a token equals its `_total_supply`;
+* `AStETH._total_shares` equals the stETH shares held at the aToken
+  address plus the borrowed shares, while liquidity and borrow indices
+  are still one (deposits and borrows are scaled by indices after that);
+* borrowed shares, debt and balances of touched accounts are not negative.
+
+A full scan recomputes the sums from ledgers; it runs every
+`full_scan_every` operations to validate the running aggregates.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.tokens.erc20 import ERC20
+from aave_tokens_model.core.utilities.types import AddressT
+
+
+class InvariantViolation(Exception):
+    """Raised when state of market breaks an invariant."""
+    pass
+
+
+class InvariantChecker:
+    """
+    Checker of market invariants.
+
+    After `load_state` of the attached market the running sums are stale;
+    call `resync` to take them from ledgers again.
+    """
+
+    def __init__(
+            self, full_scan_every: int = 0, rel_tol: float = 1e-9,
+            abs_tol: float = 1e-9
+    ):
+        self._full_scan_every = full_scan_every
+        self._rel_tol = rel_tol
+        self._abs_tol = abs_tol
+        self._market: Optional[Market] = None
+        self._sums: Dict[ERC20, Any] = {}
+        self._touched: List[Tuple[ERC20, Sequence[AddressT]]] = []
+        self._checks = 0
+
+    @property
+    def checks(self) -> int:
+        """Get amount of checked operations."""
+        return self._checks
+
+    def _tokens(self) -> Tuple[ERC20, ERC20, ERC20]:
+        market = self._market
+        return market.steth, market.debtsteth, market.asteth
+
+    def attach(self, market: Market) -> None:
+        """Start checking market from its current state."""
+        self._market = market
+        self.resync()
+        for token in self._tokens():
+            token.add_hook(self)
+        market.subscribe(self)
+
+    def detach(self) -> None:
+        """Stop checking market."""
+        if self._market is None:
+            return
+        self._market.unsubscribe(self)
+        for token in self._tokens():
+            token.remove_hook(self)
+        self._market = None
+
+    def resync(self) -> None:
+        """Take running sums from ledgers of tokens."""
+        self._sums = {
+            token: self._ledger_sum(token) for token in self._tokens()
+        }
+        self._touched = []
+
+    @staticmethod
+    def _ledger_sum(token: ERC20) -> Any:
+        return sum(value for _, value in token._balances.items())
+
+    def _close(self, first: Any, second: Any) -> bool:
+        return math.isclose(
+            first, second, rel_tol=self._rel_tol, abs_tol=self._abs_tol
+        )
+
+    def on_balances(
+            self, token: ERC20, users: Sequence[AddressT], deltas: Any
+    ) -> None:
+        if isinstance(deltas, np.ndarray):
+            self._sums[token] += float(np.sum(deltas))
+        else:
+            self._sums[token] += sum(deltas)
+        self._touched.append((token, users))
+
+    def on_operation(self, market: Market, name: str, args: Tuple) -> None:
+        self.check()
+        if self._full_scan_every and market.step % self._full_scan_every == 0:
+            self.full_scan()
+
+    def check(self) -> None:
+        """Check invariants on running sums and touched accounts."""
+        for token, running_sum in self._sums.items():
+            if not self._close(running_sum, token._total_supply):
+                raise InvariantViolation(
+                    f'{token.symbol}: sum of balances {running_sum} != '
+                    f'total supply {token._total_supply}'
+                )
+        self._check_shares()
+        self._check_debt()
+
+        touched, self._touched = self._touched, []
+        for token, users in touched:
+            balances = token._balances.get_many(users)
+            if np.any(balances < -self._abs_tol):
+                raise InvariantViolation(f'{token.symbol}: negative balance')
+        self._checks += 1
+
+    def _check_shares(self) -> None:
+        steth, debtsteth, asteth = self._tokens()
+        one = asteth.numeric.one
+        if asteth.liq_index != one or debtsteth.bor_index != one:
+            return
+        held_shares = steth._balances[asteth.address]
+        expected = held_shares + debtsteth._borrowed_shares
+        if not self._close(asteth._total_shares, expected):
+            raise InvariantViolation(
+                f'aToken shares {asteth._total_shares} != held '
+                f'{held_shares} + borrowed {debtsteth._borrowed_shares}'
+            )
+
+    def _check_debt(self) -> None:
+        debtsteth = self._market.debtsteth
+        if debtsteth._borrowed_shares < -self._abs_tol:
+            raise InvariantViolation(
+                f'negative borrowed shares {debtsteth._borrowed_shares}'
+            )
+        if debtsteth.total_supply() < -self._abs_tol:
+            raise InvariantViolation(
+                f'negative debt {debtsteth.total_supply()}'
+            )
+
+    def full_scan(self) -> None:
+        """Validate running sums and all balances against ledgers."""
+        for token, running_sum in self._sums.items():
+            values = [value for _, value in token._balances.items()]
+            scanned = sum(values)
+            if not self._close(running_sum, scanned):
+                raise InvariantViolation(
+                    f'{token.symbol}: running sum {running_sum} != '
+                    f'scanned sum {scanned}'
+                )
+            if values and min(values) < -self._abs_tol:
+                raise InvariantViolation(f'{token.symbol}: negative balance')
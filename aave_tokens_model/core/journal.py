@@ -0,0 +1,180 @@
+"""
+Write-ahead journal of market operations.
+
+The journal is an append-only binary file of records. Every record is a
+header `(kind, step, size)` followed by a pickled payload of `size` bytes:
+an operation `(name, args)` of step, a full snapshot of market state after
+step, the parameters of rate model of market (written on `attach`), or a
+failure of the operation of step that raised. An operation is written and
+flushed before it is applied, so a crash never loses an applied step.
+Restoring replays only the operations after the nearest snapshot. A failed
+operation is replayed too, with its exception swallowed: it may have
+changed balances before it reverted, and the replay changes them alike.
+
+Only operations of `Market` are journaled. Token methods called directly,
+e.g. `StETH.rebase_mul`, `increase_liq_index_mul` or `mint_many` of a
+token, change the market unseen by the journal and are lost on restore;
+call them through market operations while a journal is attached.
+"""
+import pickle
+import struct
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market
+
+OPERATION = 1
+SNAPSHOT = 2
+RATE_MODEL = 3
+FAILED = 4
+
+_HEADER = struct.Struct('<BQI')
+
+
+def _write_record(file: BinaryIO, kind: int, step: int, payload: Any) -> None:
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    file.write(_HEADER.pack(kind, step, len(data)))
+    file.write(data)
+
+
+def _read_headers(file: BinaryIO) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield `(kind, step, size, offset of payload)` skipping payloads."""
+    while True:
+        header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        kind, step, size = _HEADER.unpack(header)
+        offset = file.tell()
+        yield kind, step, size, offset
+        file.seek(offset + size)
+
+
+class Journal:
+    """
+    Journal of a market.
+
+    After `attach` every operation of market is appended to the file before
+    it is applied and a snapshot is written every `snapshot_every` steps.
+    """
+
+    def __init__(self, path: str, snapshot_every: int = 10000):
+        self._path = path
+        self._snapshot_every = snapshot_every
+        self._file: Optional[BinaryIO] = None
+        self._market: Optional[Market] = None
+
+    @property
+    def path(self) -> str:
+        """Get path of journal file."""
+        return self._path
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def attach(self, market: Market) -> None:
+        """Start journaling market from its current state."""
+        self._file = open(self._path, 'ab')
+        self._market = market
+        rate_model = market.rate_model
+        _write_record(
+            self._file, RATE_MODEL, market.step,
+            None if rate_model is None else tuple(rate_model)
+        )
+        self.snapshot()
+        market.subscribe(self)
+
+    def close(self) -> None:
+        """Stop journaling and close the file."""
+        if self._market is not None:
+            self._market.unsubscribe(self)
+            self._market = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def snapshot(self) -> None:
+        """Write a snapshot of current market state."""
+        market = self._market
+        _write_record(self._file, SNAPSHOT, market.step, market.state())
+        self._file.flush()
+
+    def before_operation(
+            self, market: Market, name: str, args: Tuple
+    ) -> None:
+        _write_record(self._file, OPERATION, market.step + 1, (name, args))
+        self._file.flush()
+
+    def on_failure(self, market: Market, name: str, args: Tuple) -> None:
+        _write_record(self._file, FAILED, market.step + 1, None)
+        self._file.flush()
+
+    def on_operation(self, market: Market, name: str, args: Tuple) -> None:
+        if market.step % self._snapshot_every == 0:
+            self.snapshot()
+
+    @staticmethod
+    def steps(path: str) -> List[int]:
+        """Get steps of all snapshots in journal."""
+        with open(path, 'rb') as file:
+            return [
+                step for kind, step, _, _ in _read_headers(file)
+                if kind == SNAPSHOT
+            ]
+
+    @staticmethod
+    def restore(
+            path: str, step: Optional[int] = None,
+            market_factory: Optional[Callable[[], Market]] = None,
+    ) -> Market:
+        """
+        Restore market at step (the last journaled step by default).
+
+        The nearest snapshot at or before step is loaded into a market made
+        by `market_factory`, by default a market with the journaled rate
+        model, then the following operations are replayed.
+        """
+        with open(path, 'rb') as file:
+            snapshot = None
+            rate_model = None
+            operations = []
+            for kind, record_step, size, offset in _read_headers(file):
+                if step is not None and record_step > step:
+                    break
+                if kind == SNAPSHOT:
+                    snapshot = (size, offset)
+                    operations = []
+                elif kind == RATE_MODEL:
+                    rate_model = (size, offset)
+                elif kind == FAILED:
+                    operations[-1] = operations[-1][:2] + (True,)
+                else:
+                    operations.append((size, offset, False))
+            if snapshot is None:
+                raise ValueError(f'no snapshot before step {step}')
+
+            def _load(size: int, offset: int) -> Any:
+                file.seek(offset)
+                return pickle.loads(file.read(size))
+
+            if market_factory is None:
+                params = None if rate_model is None else _load(*rate_model)
+                market = Market(
+                    rate_model=None if params is None else RateModel(*params)
+                )
+            else:
+                market = market_factory()
+            market.load_state(_load(*snapshot))
+            for size, offset, failed in operations:
+                name, args = _load(size, offset)
+                if not failed:
+                    getattr(market, name)(*args)
+                    continue
+                try:
+                    getattr(market, name)(*args)
+                except Exception:
+                    pass
+
+        return market
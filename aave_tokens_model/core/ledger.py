@@ -0,0 +1,549 @@
+"""
+Balance ledgers for ERC20 tokens.
+
+A ledger maps an address to the internal balance of that address.
+`DictLedger` is the default hash-based storage, `ArrayLedger` interns
+addresses into integer slots and keeps balances in a growable NumPy array,
+so bulk operations work on whole arrays at once. `ColumnLedger` is an
+`ArrayLedger` over one column of a `BalanceTable`, a matrix of balances of
+several tokens with a row per address. `OverlayLedger` keeps only the
+changes made on top of a frozen base ledger. `MappedLedger` is a read-only
+ledger over sorted address and balance columns, e.g. memory-mapped files.
+"""
+from typing import (
+    Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+import numpy as np
+
+from aave_tokens_model.core.utilities.address import to_address
+from aave_tokens_model.core.utilities.types import Address, AddressT
+
+_INITIAL_CAPACITY = 1024
+# Overlays a ledger of fork may stack before they are flattened.
+MAX_FORK_DEPTH = 8
+
+
+def as_values(values: Iterable[float], size: int) -> np.ndarray:
+    """Get values as a float array of size; a scalar is broadcast."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        values = np.full(size, float(values))
+    if values.shape != (size,):
+        raise ValueError('users and values must have the same length')
+    return values
+
+
+class DictLedger(dict):
+    """
+    Hash-based ledger.
+
+    A balance of unknown user reads as zero without inserting an entry.
+    """
+
+    def __missing__(self, user: AddressT) -> float:
+        return 0
+
+    def get_many(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users as an array."""
+        return np.fromiter(
+            (self[user] for user in users), dtype=np.float64, count=len(users)
+        )
+
+    def add_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Add values to balances of users; return new balances."""
+        values = as_values(values, len(users))
+        for user, value in zip(users, values.tolist()):
+            self[user] += value
+        return self.get_many(users)
+
+    def can_spend(
+            self, users: Sequence[AddressT], values: np.ndarray
+    ) -> bool:
+        """Check that every user holds the sum of its values."""
+        spent: Dict[AddressT, float] = {}
+        for user, value in zip(users, values.tolist()):
+            spent[user] = spent.get(user, 0) + value
+        return all(self[user] >= value for user, value in spent.items())
+
+
+class AddressIndex:
+    """Intern table that maps addresses to dense integer slots."""
+
+    def __init__(self):
+        self._slots: Dict[AddressT, int] = {}
+        self._addresses: List[AddressT] = []
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def __contains__(self, address: AddressT) -> bool:
+        return address in self._slots
+
+    def get(self, address: AddressT) -> Optional[int]:
+        """Get slot of address or None if it was never interned."""
+        return self._slots.get(address)
+
+    def intern(self, address: AddressT) -> int:
+        """Get slot of address, allocate a new one on the first use."""
+        slot = self._slots.get(address)
+        if slot is None:
+            slot = len(self._addresses)
+            self._slots[address] = slot
+            self._addresses.append(address)
+        return slot
+
+    def slots(
+            self, addresses: Iterable[AddressT], create: bool = False
+    ) -> np.ndarray:
+        """
+        Get slots of addresses as an array.
+
+        Unknown addresses are interned if `create` is set, otherwise their
+        slot is -1.
+        """
+        if create:
+            lookup = self.intern
+        else:
+            get = self._slots.get
+
+            def lookup(address: AddressT) -> int:
+                return get(address, -1)
+
+        return np.fromiter(map(lookup, addresses), dtype=np.int64)
+
+    def address(self, slot: int) -> AddressT:
+        """Get address stored in slot."""
+        return self._addresses[slot]
+
+    @property
+    def addresses(self) -> List[AddressT]:
+        """Get all interned addresses ordered by slot."""
+        return self._addresses
+
+
+class ArrayLedger:
+    """
+    Ledger with balances stored in a growable NumPy array.
+
+    Several ledgers may share one `AddressIndex`, then an address has the
+    same slot in all of them.
+    """
+
+    def __init__(self, index: Optional[AddressIndex] = None):
+        if index is None:
+            index = AddressIndex()
+        self._index = index
+        self._values = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+
+    @property
+    def index(self) -> AddressIndex:
+        """Get address index of ledger."""
+        return self._index
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get balances ordered by slot of the address index."""
+        self._reserve(len(self._index))
+        return self._values[:len(self._index)]
+
+    def _reserve(self, size: int) -> None:
+        capacity = self._values.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        values = np.zeros(capacity, dtype=np.float64)
+        values[:self._values.shape[0]] = self._values
+        self._values = values
+
+    def get(self, user: AddressT, default: float = 0) -> float:
+        slot = self._index.get(user)
+        if slot is None or slot >= self._values.shape[0]:
+            return default
+        return float(self._values[slot])
+
+    def __getitem__(self, user: AddressT) -> float:
+        return self.get(user)
+
+    def __setitem__(self, user: AddressT, value: float) -> None:
+        slot = self._index.intern(user)
+        self._reserve(slot + 1)
+        self._values[slot] = value
+
+    def __contains__(self, user: AddressT) -> bool:
+        return user in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[AddressT]:
+        return iter(self._index.addresses)
+
+    def clear(self) -> None:
+        """Reset all balances to zero."""
+        self._values[:] = 0
+
+    def keys(self) -> Iterator[AddressT]:
+        return iter(self)
+
+    def items(self) -> Iterator:
+        return zip(self._index.addresses, self.values.tolist())
+
+    def get_many(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users as an array."""
+        slots = self._index.slots(users)
+        result = np.zeros(slots.shape[0], dtype=np.float64)
+        known = (slots >= 0) & (slots < self._values.shape[0])
+        result[known] = self._values[slots[known]]
+        return result
+
+    def add_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Add values to balances of users; return new balances."""
+        values = as_values(values, len(users))
+        slots = self._index.slots(users, create=True)
+        self._reserve(len(self._index))
+        np.add.at(self._values, slots, values)
+        return self._values[slots]
+
+    def can_spend(
+            self, users: Sequence[AddressT], values: np.ndarray
+    ) -> bool:
+        """Check that every user holds the sum of its values."""
+        slots = self._index.slots(users)
+        senders, inverse = np.unique(slots, return_inverse=True)
+        spent = np.bincount(inverse, weights=values)
+        balances = np.zeros(senders.shape[0], dtype=np.float64)
+        known = (senders >= 0) & (senders < self._values.shape[0])
+        balances[known] = self._values[senders[known]]
+        return bool(np.all(balances >= spent))
+
+
+class BalanceTable:
+    """
+    Balances of several tokens in one matrix: a row per address slot and a
+    column per token, so balances of an address are contiguous.
+    """
+
+    def __init__(self, index: Optional[AddressIndex] = None):
+        if index is None:
+            index = AddressIndex()
+        self._index = index
+        self._values = np.zeros((_INITIAL_CAPACITY, 0), dtype=np.float64)
+
+    @property
+    def index(self) -> AddressIndex:
+        """Get address index of table."""
+        return self._index
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get the whole matrix of balances including spare rows."""
+        return self._values
+
+    @property
+    def columns(self) -> int:
+        """Get amount of columns."""
+        return self._values.shape[1]
+
+    def add_column(self) -> 'ColumnLedger':
+        """Add a zero column; get a ledger over it."""
+        rows, columns = self._values.shape
+        values = np.zeros((rows, columns + 1), dtype=np.float64)
+        values[:, :columns] = self._values
+        self._values = values
+        return ColumnLedger(self, columns)
+
+    def reserve(self, size: int) -> None:
+        """Grow the matrix to hold at least size rows."""
+        rows, columns = self._values.shape
+        if size <= rows:
+            return
+        while rows < size:
+            rows *= 2
+        values = np.zeros((rows, columns), dtype=np.float64)
+        values[:self._values.shape[0]] = self._values
+        self._values = values
+
+    def rows(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users in all columns; zeros for unknown ones."""
+        slots = self._index.slots(users)
+        result = np.zeros((slots.shape[0], self.columns), dtype=np.float64)
+        known = (slots >= 0) & (slots < self._values.shape[0])
+        result[known] = self._values[slots[known]]
+        return result
+
+
+class ColumnLedger(ArrayLedger):
+    """Ledger stored in a column of balance table."""
+
+    def __init__(self, table: BalanceTable, column: int):
+        self._index = table.index
+        self._table = table
+        self._column = column
+
+    @property
+    def table(self) -> BalanceTable:
+        """Get table of ledger."""
+        return self._table
+
+    @property
+    def column(self) -> int:
+        """Get column of ledger in table."""
+        return self._column
+
+    @property
+    def _values(self) -> np.ndarray:
+        # A view, the matrix is reallocated when it grows.
+        return self._table.values[:, self._column]
+
+    def _reserve(self, size: int) -> None:
+        self._table.reserve(size)
+
+
+class OverlayLedger:
+    """
+    Copy-on-write ledger over a base ledger.
+
+    Reads fall through to the base, writes are kept in the overlay, so the
+    base must not change while overlays over it are alive.
+    """
+
+    def __init__(
+            self, base: 'LedgerT',
+            changes: Optional[Dict[AddressT, float]] = None
+    ):
+        self._base = base
+        self._changes: Dict[AddressT, float] = (
+            {} if changes is None else changes
+        )
+
+    @property
+    def depth(self) -> int:
+        """Get number of overlays down to the first plain ledger."""
+        depth, ledger = 1, self._base
+        while isinstance(ledger, OverlayLedger):
+            depth, ledger = depth + 1, ledger.base
+        return depth
+
+    @property
+    def base(self) -> 'LedgerT':
+        """Get base ledger."""
+        return self._base
+
+    @property
+    def changes(self) -> Dict[AddressT, float]:
+        """Get balances changed in the overlay."""
+        return self._changes
+
+    def get(self, user: AddressT, default: float = 0) -> float:
+        value = self._changes.get(user)
+        if value is None:
+            return self._base.get(user, default)
+        return value
+
+    def __getitem__(self, user: AddressT) -> float:
+        return self.get(user)
+
+    def __setitem__(self, user: AddressT, value: float) -> None:
+        self._changes[user] = value
+
+    def __contains__(self, user: AddressT) -> bool:
+        return user in self._changes or user in self._base
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __iter__(self) -> Iterator[AddressT]:
+        yield from self._changes
+        for user in self._base.keys():
+            if user not in self._changes:
+                yield user
+
+    def keys(self) -> Iterator[AddressT]:
+        return iter(self)
+
+    def items(self) -> Iterator:
+        return ((user, self.get(user)) for user in self)
+
+    def clear(self) -> None:
+        """Reset all balances to zero."""
+        self._base = DictLedger()
+        self._changes = {}
+
+    def get_many(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users as an array."""
+        return np.fromiter(
+            (self.get(user) for user in users),
+            dtype=np.float64, count=len(users)
+        )
+
+    def add_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Add values to balances of users; return new balances."""
+        values = as_values(values, len(users))
+        for user, value in zip(users, values.tolist()):
+            self[user] = self.get(user) + value
+        return self.get_many(users)
+
+    def can_spend(
+            self, users: Sequence[AddressT], values: np.ndarray
+    ) -> bool:
+        """Check that every user holds the sum of its values."""
+        spent: Dict[AddressT, float] = {}
+        for user, value in zip(users, values.tolist()):
+            spent[user] = spent.get(user, 0) + value
+        return all(self.get(user) >= value for user, value in spent.items())
+
+
+ADDRESS_DTYPE = np.dtype('S20')
+
+
+def address_bytes(users: Iterable[AddressT]) -> np.ndarray:
+    """
+    Get addresses as an array of 20 big-endian bytes, which sorts the
+    same way as the addresses themselves.
+    """
+    return np.array(
+        [int(to_address(user)).to_bytes(20, 'big') for user in users],
+        dtype=ADDRESS_DTYPE
+    )
+
+
+class MappedLedger:
+    """
+    Read-only ledger over an address column sorted as `address_bytes` and
+    a column of balances in the same order.
+
+    Columns may be memory-mapped: a lookup is a binary search that touches
+    only the pages it reads. Wrap into `OverlayLedger` to change balances.
+    """
+
+    def __init__(self, addresses: np.ndarray, values: np.ndarray):
+        if addresses.shape != values.shape:
+            raise ValueError('addresses and values must have the same length')
+        self._addresses = addresses
+        self._values = values
+
+    @property
+    def addresses(self) -> np.ndarray:
+        """Get sorted address column."""
+        return self._addresses
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get balances ordered as addresses."""
+        return self._values
+
+    def _rows(self, keys: np.ndarray) -> np.ndarray:
+        """Get rows of address bytes; -1 for unknown addresses."""
+        rows = np.searchsorted(self._addresses, keys)
+        found = rows < self._addresses.shape[0]
+        found[found] = self._addresses[rows[found]] == keys[found]
+        return np.where(found, rows, -1)
+
+    def get(self, user: AddressT, default: float = 0) -> float:
+        row = self._rows(address_bytes((user,)))[0]
+        if row < 0:
+            return default
+        return float(self._values[row])
+
+    def __getitem__(self, user: AddressT) -> float:
+        return self.get(user)
+
+    def __setitem__(self, user: AddressT, value: float) -> None:
+        raise TypeError('mapped ledger is read-only')
+
+    def __contains__(self, user: AddressT) -> bool:
+        return self._rows(address_bytes((user,)))[0] >= 0
+
+    def __len__(self) -> int:
+        return self._addresses.shape[0]
+
+    def __iter__(self) -> Iterator[AddressT]:
+        for key in self._addresses:
+            # `S20` items lose trailing zero bytes.
+            yield Address(int.from_bytes(key.ljust(20, b'\0'), 'big'))
+
+    def keys(self) -> Iterator[AddressT]:
+        return iter(self)
+
+    def items(self) -> Iterator:
+        return zip(self, self._values.tolist())
+
+    def clear(self) -> None:
+        raise TypeError('mapped ledger is read-only')
+
+    def get_many(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users as an array."""
+        return self.get_many_bytes(address_bytes(users))
+
+    def add_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        raise TypeError('mapped ledger is read-only')
+
+    def can_spend(
+            self, users: Sequence[AddressT], values: np.ndarray
+    ) -> bool:
+        """Check that every user holds the sum of its values."""
+        keys, inverse = np.unique(address_bytes(users), return_inverse=True)
+        spent = np.bincount(inverse, weights=values)
+        return bool(np.all(self.get_many_bytes(keys) >= spent))
+
+    def get_many_bytes(self, keys: np.ndarray) -> np.ndarray:
+        """Get balances of addresses given as `address_bytes`."""
+        rows = self._rows(keys)
+        result = np.zeros(rows.shape[0], dtype=np.float64)
+        known = rows >= 0
+        result[known] = self._values[rows[known]]
+        return result
+
+
+LedgerT = Union[
+    DictLedger, ArrayLedger, ColumnLedger, OverlayLedger, MappedLedger
+]
+
+
+def keeps_floats(ledger: LedgerT) -> bool:
+    """Check whether ledger, or the base of its overlays, is float64."""
+    while isinstance(ledger, OverlayLedger):
+        ledger = ledger.base
+    return isinstance(ledger, (ArrayLedger, MappedLedger))
+
+
+def _flattened(ledger: OverlayLedger) -> OverlayLedger:
+    """
+    Get one overlay with all changes of a chain of overlays over the first
+    plain ledger of the chain.
+    """
+    layers = []
+    while isinstance(ledger, OverlayLedger):
+        layers.append(ledger.changes)
+        ledger = ledger.base
+    changes: Dict[AddressT, float] = {}
+    for layer in reversed(layers):
+        changes.update(layer)
+    return OverlayLedger(ledger, changes)
+
+
+def fork_ledger(ledger: LedgerT) -> Tuple[LedgerT, LedgerT]:
+    """
+    Fork ledger copy-on-write; return ledgers for parent and child.
+
+    The forked ledger becomes a frozen base of both. An overlay without
+    changes is not stacked again, so repeated forks of an unchanged parent
+    share one base. A chain of `MAX_FORK_DEPTH` overlays is flattened into
+    one overlay over its plain ledger, which copies only the changes.
+    """
+    if isinstance(ledger, OverlayLedger):
+        if not ledger.changes:
+            return ledger, OverlayLedger(ledger.base)
+        if ledger.depth >= MAX_FORK_DEPTH:
+            ledger = _flattened(ledger)
+    return OverlayLedger(ledger), OverlayLedger(ledger)
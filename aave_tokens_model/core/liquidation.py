@@ -0,0 +1,110 @@
+"""
+Index of positions by health factor.
+
+Health factor of user is
+
+    HF = aStETH * threshold / debt
+       = (internal / scaled_debt) * threshold * supply_factor / bor_index
+
+where `internal` is the internal aStETH balance, `scaled_debt` the scaled
+debt balance, `supply_factor` the aStETH balance per internal unit and
+`bor_index` the borrow index. Rebases and index bumps change only the
+factors common to everybody, so positions are kept sorted by
+`internal / scaled_debt`, which changes only when the balances of user
+change. Liquidatable users (HF < 1) are a prefix of the sorted positions
+found by bisection, without touching every account.
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.tokens.atoken import LIQUIDATION_THRESHOLD
+from aave_tokens_model.core.tokens.erc20 import ERC20
+from aave_tokens_model.core.utilities.types import AddressT
+
+
+class HealthIndex:
+    """Borrowers of a market sorted by collateral to debt ratio."""
+
+    def __init__(self, threshold: float = LIQUIDATION_THRESHOLD):
+        self._threshold = threshold
+        self._market: Optional[Market] = None
+        self._positions: List[Tuple[float, AddressT]] = []
+        self._ratios: Dict[AddressT, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def attach(self, market: Market) -> None:
+        """Index borrowers of market and follow changes of balances."""
+        self._market = market
+        self.rebuild()
+        market.asteth.add_hook(self)
+        market.debtsteth.add_hook(self)
+
+    def detach(self) -> None:
+        """Stop following market."""
+        if self._market is None:
+            return
+        self._market.asteth.remove_hook(self)
+        self._market.debtsteth.remove_hook(self)
+        self._market = None
+
+    def rebuild(self) -> None:
+        """Index all borrowers from ledgers."""
+        self._positions = []
+        self._ratios = {}
+        for user, debt in self._market.debtsteth._balances.items():
+            if debt > 0:
+                self._update(user)
+
+    def _ratio(self, user: AddressT) -> Optional[float]:
+        market = self._market
+        debt = market.debtsteth._balances[user]
+        if debt <= 0:
+            return None
+        return float(market.asteth._balances[user]) / float(debt)
+
+    def _update(self, user: AddressT) -> None:
+        previous = self._ratios.pop(user, None)
+        if previous is not None:
+            position = bisect_left(self._positions, (previous, user))
+            del self._positions[position]
+        ratio = self._ratio(user)
+        if ratio is not None:
+            self._ratios[user] = ratio
+            insort(self._positions, (ratio, user))
+
+    def on_balances(
+            self, token: ERC20, users: Sequence[AddressT], deltas: Any
+    ) -> None:
+        for user in set(users):
+            self._update(user)
+
+    def _bor_index(self) -> float:
+        debtsteth = self._market.debtsteth
+        return debtsteth.numeric.index_float(debtsteth.bor_index)
+
+    def _bound(self) -> float:
+        """Get ratio below which positions are liquidatable."""
+        supply_factor = self._market.asteth.balance_factor()
+        if supply_factor == 0:
+            return float('inf')
+        return self._bor_index() / (self._threshold * supply_factor)
+
+    def health_factor(self, user: AddressT) -> float:
+        """Get health factor of user from the index; infinity without debt."""
+        ratio = self._ratios.get(user)
+        if ratio is None:
+            return float('inf')
+        return (
+            ratio * self._threshold * self._market.asteth.balance_factor()
+            / self._bor_index()
+        )
+
+    def liquidatable(self, limit: Optional[int] = None) -> List[AddressT]:
+        """Get users with health factor below 1, the least healthy first."""
+        end = bisect_left(self._positions, (self._bound(),))
+        if limit is not None:
+            end = min(end, limit)
+        return [user for _, user in self._positions[:end]]
@@ -0,0 +1,237 @@
+"""
+Asynchronous structured log sink.
+
+Logged models in structured mode put raw records into a bounded queue; a
+background thread renders and writes them to a file, so an operation never
+waits for formatting or disk I/O unless the queue is full. A record holds
+the function, stage, symbol, call arguments and numeric state fields of
+model:
+
+    {"ts": 1700000000000000000, "function": "StETH.mint", "stage": "AFTER",
+     "symbol": "stETH", "args": [1, 10.0], "state": {"total_supply": ...}}
+
+Records are written as compact JSON lines or, in binary format, as a
+`<I` size followed by a pickle of the record dictionary. The file is
+rotated when it grows over `max_bytes`: `log.jsonl` becomes
+`log.jsonl.1`, the previous `.1` becomes `.2` and so on up to `backups`.
+
+Arrays and containers of a record are copied when it is queued, so later
+changes of them do not reach the file. If the writer thread fails, its
+error is raised by the following `emit` or `close`.
+"""
+import json
+import os
+import pickle
+import struct
+import threading
+from decimal import Decimal
+from queue import Full, Queue
+from time import time_ns
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+FORMATS = ('jsonl', 'binary')
+
+_SIZE = struct.Struct('<I')
+_STOP = None
+# Seconds between checks of the writer thread while the queue is full.
+_POLL = 0.1
+
+RecordT = Tuple[int, Dict[str, Any], Tuple, Dict[str, Any], Dict[str, Any]]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Decimal):
+        return str(value)
+    return repr(value)
+
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, int) and type(value) is not int:
+        return int(value)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if type(value) in (list, tuple):
+        return type(value)(_copy(item) for item in value)
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+class StructuredLogSink:
+    """Queue of log records written to a rotated file by a thread."""
+
+    def __init__(
+            self, path: str, format: str = 'jsonl',
+            max_bytes: int = 100 * 2 ** 20, backups: int = 5,
+            queue_size: int = 100_000
+    ):
+        if format not in FORMATS:
+            raise ValueError(f'unknown log format {format!r}')
+        self._path = path
+        self._format = format
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._queue: Queue = Queue(queue_size)
+        self._file: BinaryIO = open(path, 'ab')
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._write_records, name='structured-log', daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        """Get path of the current log file."""
+        return self._path
+
+    def __enter__(self) -> 'StructuredLogSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def emit(
+            self, context: Dict[str, Any], args: Tuple,
+            kwargs: Dict[str, Any], state: Dict[str, Any]
+    ) -> None:
+        """Queue a record; blocks only while the queue is full."""
+        if self._error is not None:
+            raise self._error
+        self._put((
+            time_ns(), context, _copy(args), _copy(kwargs), _copy(state)
+        ))
+
+    def close(self) -> None:
+        """Write queued records and close the file."""
+        if self._file is None:
+            return
+        try:
+            self._put(_STOP)
+            self._thread.join()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, record: Optional[RecordT]) -> None:
+        """Queue record, waiting for room only while the writer runs."""
+        try:
+            self._queue.put_nowait(record)
+            return
+        except Full:
+            pass
+        while True:
+            if not self._thread.is_alive():
+                if self._error is not None:
+                    raise self._error
+                raise RuntimeError('structured log writer is stopped')
+            try:
+                self._queue.put(record, timeout=_POLL)
+                return
+            except Full:
+                continue
+
+    def _drain(self) -> Iterator[List[Optional[RecordT]]]:
+        """Yield batches of queued records, blocking for the first one."""
+        queue = self._queue
+        while True:
+            batch = [queue.get()]
+            while not queue.empty() and len(batch) < 1024:
+                batch.append(queue.get_nowait())
+            yield batch
+
+    def _write_records(self) -> None:
+        try:
+            self._write_batches()
+        except BaseException as error:
+            self._error = error
+
+    def _write_batches(self) -> None:
+        encode = self._encode_json if self._format == 'jsonl' else (
+            self._encode_binary
+        )
+        for batch in self._drain():
+            stop = _STOP in batch
+            for record in batch:
+                if record is _STOP:
+                    continue
+                if self._file.tell() >= self._max_bytes:
+                    self._rotate()
+                self._file.write(encode(record))
+            self._file.flush()
+            if stop:
+                return
+
+    @staticmethod
+    def _fields(record: RecordT) -> Dict[str, Any]:
+        ts, context, args, kwargs, state = record
+        fields = {'ts': ts}
+        fields.update(context)
+        fields['args'] = args
+        if kwargs:
+            fields['kwargs'] = kwargs
+        fields['state'] = state
+        return fields
+
+    def _encode_json(self, record: RecordT) -> bytes:
+        line = json.dumps(
+            self._fields(record), separators=(',', ':'), default=_to_json
+        )
+        return line.encode() + b'\n'
+
+    def _encode_binary(self, record: RecordT) -> bytes:
+        fields = self._fields(record)
+        fields['args'] = _to_plain(fields['args'])
+        if 'kwargs' in fields:
+            fields['kwargs'] = {
+                key: _to_plain(value)
+                for key, value in fields['kwargs'].items()
+            }
+        data = pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL)
+        return _SIZE.pack(len(data)) + data
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for number in range(self._backups - 1, 0, -1):
+            source = f'{self._path}.{number}'
+            if os.path.exists(source):
+                os.replace(source, f'{self._path}.{number + 1}')
+        if self._backups > 0:
+            os.replace(self._path, f'{self._path}.1')
+        else:
+            os.remove(self._path)
+        self._file = open(self._path, 'ab')
+
+
+def read_records(
+        path: str, format: str = 'jsonl'
+) -> Iterator[Dict[str, Any]]:
+    """Read records of a structured log file of format."""
+    with open(path, 'rb') as file:
+        if format == 'jsonl':
+            for line in file:
+                yield json.loads(line)
+            return
+        while True:
+            size = file.read(_SIZE.size)
+            if len(size) < _SIZE.size:
+                return
+            yield pickle.loads(file.read(_SIZE.unpack(size)[0]))
@@ -2,13 +2,42 @@ import inspect
 import sys
 from functools import wraps, lru_cache
 from itertools import zip_longest, chain
-from typing import List, Callable, Dict, Any, Tuple
+from time import perf_counter_ns
+from typing import (
+    List, Callable, Dict, Any, ForwardRef, Optional, Tuple, Union,
+    get_args, get_origin
+)
 
 from loguru import logger
 
+from aave_tokens_model.core.log_sink import StructuredLogSink
+from aave_tokens_model.core.metrics import Metrics, get_metrics
 
+_metrics = get_metrics()
+
+
+def _type_name(value_type: Any) -> str:
+    """Get name of annotation; `typing` generics with their arguments."""
+    if value_type is type(None):
+        return 'None'
+    if isinstance(value_type, ForwardRef):
+        return value_type.__forward_arg__
+    origin = get_origin(value_type)
+    if origin is None:
+        return getattr(value_type, '__name__', str(value_type))
+    if origin is Union:
+        name = 'Union'
+    else:
+        name = getattr(value_type, '_name', None) or getattr(
+            origin, '__name__', str(origin)
+        )
+    arguments = ', '.join(_type_name(arg) for arg in get_args(value_type))
+    return f'{name}[{arguments}]'
+
+
+@lru_cache(maxsize=None)
 def get_function_signature(func: Callable) -> str:
-    """Get function signature as string."""
+    """Get function signature as string; rendered once per function."""
     full_spec = inspect.getfullargspec(func)
     arguments = full_spec.args
     if arguments is None:
@@ -29,8 +58,7 @@ def get_function_signature(func: Callable) -> str:
             default_value = ''
 
         if value_type is not None:
-            value_type = getattr(value_type, '__name__', value_type)
-            value_type = f': {value_type}'
+            value_type = f': {_type_name(value_type)}'
         else:
             value_type = ''
 
@@ -57,7 +85,27 @@ def get_function_signature(func: Callable) -> str:
     return f'{func_name}({arguments})'
 
 
+@lru_cache(maxsize=None)
+def _get_signature_line(func: Callable) -> str:
+    """Get the static signature line of base log message."""
+    return f'signature: {get_function_signature(func)}'
+
+
+_DELIMITER = '=' * 20
+
+
 class Logged:
+    """
+    Base of logged models.
+
+    Logging is done only for verbose instances; otherwise the decorated
+    calls go straight to the wrapped function without building messages.
+    While metrics are enabled the decorated calls are also timed, see
+    `aave_tokens_model.core.metrics`.
+
+    In structured mode, see `switch_up_structured_log`, records of calls
+    with numeric state of model go to an asynchronous sink instead.
+    """
     LOG_BEFORE = 'BEFORE'
     LOG_AFTER = 'AFTER'
     LOG_INTERNAL = 'INTERNAL'
@@ -68,17 +116,44 @@ class Logged:
         LOG_INTERNAL: 'red'
     }
 
+    __slots__ = ('_verbose', '_logger', '_sink')
+
     def __init__(self, verbose: bool = False):
         self._verbose = verbose
+        self._sink: Optional[StructuredLogSink] = None
 
         self._logger = logger
-        self._setup_logger()
+        if verbose:
+            self._setup_logger()
+
+    @staticmethod
+    def metrics() -> Metrics:
+        """Get metrics of decorated calls."""
+        return _metrics
 
     def function_log(self, func):
+        function = func.__qualname__
+        stats = _metrics.stats(function)
+
         @wraps(func)
         def _log(*args, **kwargs) -> Any:
-            function = func.__qualname__
-            base_message = self._prepare_base_message(func, *args, *kwargs)
+            if _metrics.enabled:
+                started = perf_counter_ns()
+                try:
+                    return _call(*args, **kwargs)
+                finally:
+                    stats.record(perf_counter_ns() - started)
+            return _call(*args, **kwargs)
+
+        def _call(*args, **kwargs) -> Any:
+            if not self._verbose:
+                return func(*args, **kwargs)
+            if self._sink is not None:
+                self._emit(function, self.LOG_BEFORE, args, kwargs)
+                result = func(*args, **kwargs)
+                self._emit(function, self.LOG_AFTER, args, kwargs)
+                return result
+            base_message = self._prepare_base_message(func, *args, **kwargs)
             with self._logger.contextualize(
                     function=function, stage=self.LOG_BEFORE, symbol='func'
             ):
@@ -129,18 +204,16 @@ class Logged:
     def _prepare_base_message(
             self, action: Callable, *args, **kwargs
     ) -> List[str]:
-        signature = get_function_signature(action)
         args = ' '.join([str(arg) for arg in args])
         kwargs = ' '.join([
             f'{str(key)} = {str(value)}'
             for key, value in kwargs.items()
         ])
-        delimiter = '=' * 20
         return [
-            f'signature: {signature}',
+            _get_signature_line(action),
             f'args: {args}',
             f'kwargs: {kwargs}',
-            f'{delimiter}',
+            _DELIMITER,
         ]
 
     def _prepare_log_before(self, action, *args, **kwargs) -> List[str]:
@@ -156,9 +229,29 @@ class Logged:
         }
 
     def with_log(action):
+        function = action.__qualname__
+        stats = _metrics.stats(function)
+
         @wraps(action)
         def _handler(self, *args, **kwargs):
-            function = action.__qualname__
+            if not _metrics.enabled:
+                if not self._verbose:
+                    return action(self, *args, **kwargs)
+                return _logged(self, *args, **kwargs)
+            started = perf_counter_ns()
+            try:
+                if not self._verbose:
+                    return action(self, *args, **kwargs)
+                return _logged(self, *args, **kwargs)
+            finally:
+                stats.record(perf_counter_ns() - started)
+
+        def _logged(self, *args, **kwargs):
+            if self._sink is not None:
+                self._emit(function, self.LOG_BEFORE, args, kwargs)
+                result = action(self, *args, **kwargs)
+                self._emit(function, self.LOG_AFTER, args, kwargs)
+                return result
             with self._logger.contextualize(**self._get_context(
                     function=function,
                     stage=self.LOG_BEFORE,
@@ -178,7 +271,26 @@ class Logged:
 
         return _handler
 
+    def _log_state(self) -> Dict[str, Any]:
+        """Get numeric state fields of structured log records."""
+        return {}
+
+    def _emit(
+            self, function: str, stage: str, args: Tuple,
+            kwargs: Dict[str, Any]
+    ) -> None:
+        context = self._get_context(function=function, stage=stage)
+        context.setdefault('symbol', 'func')
+        self._sink.emit(context, args, kwargs, self._log_state())
+
     def log(self, act: Callable, message: str) -> None:
+        if not self._verbose:
+            return
+        if self._sink is not None:
+            self._emit(
+                act.__qualname__, Logged.LOG_INTERNAL, (message,), {}
+            )
+            return
         with self._logger.contextualize(**self._get_context(
                 function=act.__qualname__,
                 stage=Logged.LOG_INTERNAL,
@@ -188,8 +300,16 @@ class Logged:
     def switch_up_logger(self, with_logging: bool) -> None:
         """Switch-up logging"""
         self._verbose = with_logging
+        self._sink = None
         self._setup_logger()
 
+    def switch_up_structured_log(
+            self, sink: Optional[StructuredLogSink]
+    ) -> None:
+        """Log records of calls into sink; None switches logging off."""
+        self._verbose = sink is not None
+        self._sink = sink
+
 
 @lru_cache(1)
 def get_logger() -> Logged:
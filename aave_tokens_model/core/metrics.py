@@ -0,0 +1,157 @@
+"""
+Per-function call metrics of logged models.
+
+When metrics are enabled every call wrapped by `Logged.with_log` or
+`Logged.function_log` records its latency under the qualified name of
+function (`AStETH._mint_scaled`, `StETH.transfer`, ...). Times are
+inclusive: a call of `StETH.mint` also counts the nested `ERC20.mint`.
+
+Latencies go to HDR-style log-linear histograms: values below
+`2 ** SUB_BUCKET_BITS` nanoseconds are exact, larger ones fall into
+`2 ** (SUB_BUCKET_BITS - 1)` buckets per power of two, so a bucket is
+within 1/16 of its values. Recording is a couple of integer operations
+and dictionary updates.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Tuple
+
+SUB_BUCKET_BITS = 5
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_of(nanoseconds: int) -> int:
+    """Get index of histogram bucket of latency."""
+    bits = nanoseconds.bit_length()
+    if bits <= SUB_BUCKET_BITS:
+        return nanoseconds
+    shift = bits - SUB_BUCKET_BITS
+    return (shift << SUB_BUCKET_BITS) + (nanoseconds >> shift)
+
+
+def bucket_floor(bucket: int) -> int:
+    """Get the lowest latency of histogram bucket."""
+    shift = bucket >> SUB_BUCKET_BITS
+    return (bucket & ((1 << SUB_BUCKET_BITS) - 1)) << shift
+
+
+class FunctionStats:
+    """Call count, cumulative time and latency histogram of a function."""
+    __slots__ = ('count', 'total_ns', 'max_ns', 'histogram')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram: Dict[int, int] = {}
+
+    def record(self, nanoseconds: int) -> None:
+        self.count += 1
+        self.total_ns += nanoseconds
+        if nanoseconds > self.max_ns:
+            self.max_ns = nanoseconds
+        # Inlined `bucket_of`, this is the hot path.
+        bits = nanoseconds.bit_length()
+        if bits <= SUB_BUCKET_BITS:
+            bucket = nanoseconds
+        else:
+            shift = bits - SUB_BUCKET_BITS
+            bucket = (shift << SUB_BUCKET_BITS) + (nanoseconds >> shift)
+        histogram = self.histogram
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def percentiles(
+            self, percentiles: Iterable[float] = PERCENTILES
+    ) -> Dict[str, int]:
+        """Get lower bounds of latency percentiles in nanoseconds."""
+        buckets = sorted(self.histogram.items())
+        result = {}
+        for percentile in percentiles:
+            rank = self.count * percentile / 100
+            seen = 0
+            for bucket, count in buckets:
+                seen += count
+                if seen >= rank:
+                    result[f'p{percentile:g}_ns'] = bucket_floor(bucket)
+                    break
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """Get JSON-ready statistics."""
+        summary = {
+            'count': self.count,
+            'total_ns': self.total_ns,
+            'mean_ns': self.total_ns / self.count if self.count else 0,
+            'max_ns': self.max_ns,
+        }
+        summary.update(self.percentiles())
+        summary['histogram'] = {
+            bucket_floor(bucket): count
+            for bucket, count in sorted(self.histogram.items())
+        }
+        return summary
+
+
+class Metrics:
+    """
+    Registry of function statistics; disabled until `enable`.
+
+    Decorated functions take their `FunctionStats` once and record into
+    it directly, so statistics are cleared in place.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._stats: Dict[str, FunctionStats] = {}
+
+    def enable(self) -> None:
+        """Start recording calls."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording calls; recorded statistics are kept."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Drop recorded statistics."""
+        for stats in self._stats.values():
+            stats.clear()
+
+    def stats(self, function: str) -> FunctionStats:
+        """Get statistics of function, registering it on the first use."""
+        stats = self._stats.get(function)
+        if stats is None:
+            stats = self._stats[function] = FunctionStats()
+        return stats
+
+    def record(self, function: str, nanoseconds: int) -> None:
+        """Record a call of function."""
+        self.stats(function).record(nanoseconds)
+
+    def items(self) -> Iterable[Tuple[str, FunctionStats]]:
+        """Get functions with recorded calls and their statistics."""
+        return [
+            (function, stats) for function, stats in self._stats.items()
+            if stats.count
+        ]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get JSON-ready statistics of every function."""
+        return {
+            function: stats.summary()
+            for function, stats in sorted(self.items())
+        }
+
+    def dump(self, path: str) -> None:
+        """Write statistics of every function as JSON."""
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+@lru_cache(1)
+def get_metrics() -> Metrics:
+    """Get the registry shared by all logged models."""
+    return Metrics()
@@ -0,0 +1,178 @@
+"""
+Numeric backends of token models.
+
+A backend defines how amounts are represented and how conversions between
+them are rounded:
+
+* `FloatMath` - Python floats, the default one;
+* `DecimalMath` - `decimal.Decimal` amounts in the current decimal context;
+* `FixedPointMath` - integer amounts scaled by 1e18 (wei and shares) and
+  indices scaled by 1e27 (ray), rounded like the Solidity contracts: share
+  conversions floor as in Lido, index scaling rounds half up as in Aave
+  `WadRayMath`.
+
+Conversion factors are opaque to the tokens: `ratio` makes a factor once
+and `apply` converts amounts with it. Vectorized paths, which work on float
+arrays, take factors and indices as floats via `factor_float` and
+`index_float`.
+"""
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Optional, Tuple, Union
+
+WAD = 10 ** 18
+RAY = 10 ** 27
+HALF_RAY = RAY // 2
+
+
+class FloatMath:
+    """Float amounts."""
+    zero = 0.0
+    one = 1.0
+
+    @staticmethod
+    def ratio(numerator: float, denominator: float) -> float:
+        """Get factor of numerator to denominator, 0 for zero denominator."""
+        if denominator == 0:
+            return 0
+        return numerator / denominator
+
+    @staticmethod
+    def apply(value: float, factor: float) -> float:
+        """Convert value with factor."""
+        return value * factor
+
+    @staticmethod
+    def div(numerator: float, denominator: float) -> float:
+        return numerator / denominator
+
+    @staticmethod
+    def index_mul(value: float, index: float) -> float:
+        """Get value with interest of index."""
+        return value * index
+
+    @staticmethod
+    def index_div(value: float, index: float) -> float:
+        """Get value without interest of index."""
+        return value / index
+
+    @staticmethod
+    def scale(value: float, factor: float) -> float:
+        """Multiply value by a real factor, like a rebase."""
+        return value * factor
+
+    @staticmethod
+    def factor_float(factor: float) -> float:
+        """Get factor made by `ratio` as a float."""
+        return factor
+
+    @staticmethod
+    def index_float(index: float) -> float:
+        """Get index as a float, 1.0 for no interest."""
+        return index
+
+
+class DecimalMath:
+    """Decimal amounts; precision is the one of current decimal context."""
+    zero = Decimal(0)
+    one = Decimal(1)
+
+    @staticmethod
+    def ratio(numerator: Decimal, denominator: Decimal) -> Decimal:
+        """Get factor of numerator to denominator, 0 for zero denominator."""
+        if denominator == 0:
+            return DecimalMath.zero
+        return numerator / denominator
+
+    @staticmethod
+    def apply(value: Decimal, factor: Decimal) -> Decimal:
+        """Convert value with factor."""
+        return value * factor
+
+    @staticmethod
+    def div(numerator: Decimal, denominator: Decimal) -> Decimal:
+        return numerator / denominator
+
+    @staticmethod
+    def index_mul(value: Decimal, index: Decimal) -> Decimal:
+        """Get value with interest of index."""
+        return value * index
+
+    @staticmethod
+    def index_div(value: Decimal, index: Decimal) -> Decimal:
+        """Get value without interest of index."""
+        return value / index
+
+    @staticmethod
+    def scale(value: Decimal, factor: Any) -> Decimal:
+        """Multiply value by a real factor, like a rebase."""
+        return value * Decimal(str(factor))
+
+    @staticmethod
+    def factor_float(factor: Decimal) -> float:
+        """Get factor made by `ratio` as a float."""
+        return float(factor)
+
+    @staticmethod
+    def index_float(index: Decimal) -> float:
+        """Get index as a float, 1.0 for no interest."""
+        return float(index)
+
+
+class FixedPointMath:
+    """Integer amounts in wei, indices in ray."""
+    zero = 0
+    one = RAY
+
+    @staticmethod
+    def ratio(
+            numerator: int, denominator: int
+    ) -> Optional[Tuple[int, int]]:
+        """Get factor of numerator to denominator, None for zero one."""
+        if denominator == 0:
+            return None
+        return numerator, denominator
+
+    @staticmethod
+    def apply(value: int, factor: Optional[Tuple[int, int]]) -> int:
+        """Convert value with factor rounding down."""
+        if factor is None:
+            return 0
+        numerator, denominator = factor
+        return value * numerator // denominator
+
+    @staticmethod
+    def div(numerator: int, denominator: int) -> int:
+        return numerator // denominator
+
+    @staticmethod
+    def index_mul(value: int, index: int) -> int:
+        """Get value with interest of index; `rayMul`."""
+        return (value * index + HALF_RAY) // RAY
+
+    @staticmethod
+    def index_div(value: int, index: int) -> int:
+        """Get value without interest of index; `rayDiv`."""
+        return (value * RAY + index // 2) // index
+
+    @staticmethod
+    def scale(value: int, factor: Any) -> int:
+        """Multiply value by a real factor taken as an exact decimal."""
+        factor = Fraction(str(factor))
+        return value * factor.numerator // factor.denominator
+
+    @staticmethod
+    def factor_float(factor: Optional[Tuple[int, int]]) -> float:
+        """Get factor made by `ratio` as a float."""
+        if factor is None:
+            return 0.0
+        numerator, denominator = factor
+        return numerator / denominator
+
+    @staticmethod
+    def index_float(index: int) -> float:
+        """Get index as a float, 1.0 for no interest."""
+        return index / RAY
+
+
+NumericT = Union[FloatMath, DecimalMath, FixedPointMath]
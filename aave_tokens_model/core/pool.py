@@ -0,0 +1,144 @@
+"""
+Lending pool of several reserves.
+
+Every reserve is a `Market` of its own: an underlying share-based token
+(`StETH`; a reserve of a non-rebasing asset simply never rebases), its
+variable debt token and aToken. Balances of all reserves are kept in three
+`BalanceTable`s sharing one address index: wallets of underlying tokens,
+internal aToken balances and scaled debt balances, a column per reserve.
+
+Per-reserve liquidity and borrow indices, balance factors and prices are
+contiguous arrays refreshed after every operation of reserve, so
+cross-reserve queries of users are matrix products instead of loops over
+tokens. Balances are float arrays: reserves use the float backend.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from aave_tokens_model.core.ledger import AddressIndex, BalanceTable
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import (
+    AStETH, Market, StETH, VDebtStETH
+)
+from aave_tokens_model.core.utilities import to_addresses
+from aave_tokens_model.core.utilities.types import AddressT
+
+
+class LendingPool:
+    """Registry of reserves with vectorized cross-reserve queries."""
+
+    def __init__(self):
+        self._index = AddressIndex()
+        self._wallets = BalanceTable(self._index)
+        self._supplied = BalanceTable(self._index)
+        self._borrowed = BalanceTable(self._index)
+
+        self._symbols: Dict[str, int] = {}
+        self._reserves: List[Market] = []
+        self._rows: Dict[Market, int] = {}
+
+        self._liq_indices = np.zeros(0, dtype=np.float64)
+        self._bor_indices = np.zeros(0, dtype=np.float64)
+        self._supply_factors = np.zeros(0, dtype=np.float64)
+        self._prices = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._reserves)
+
+    @property
+    def index(self) -> AddressIndex:
+        """Get address index shared by all reserves."""
+        return self._index
+
+    @property
+    def symbols(self) -> List[str]:
+        """Get symbols of reserves ordered by row."""
+        return list(self._symbols)
+
+    @property
+    def liq_indices(self) -> np.ndarray:
+        """Get liquidity indices of reserves."""
+        return self._liq_indices
+
+    @property
+    def bor_indices(self) -> np.ndarray:
+        """Get borrow indices of reserves."""
+        return self._bor_indices
+
+    @property
+    def prices(self) -> np.ndarray:
+        """Get prices of reserve assets in the pool currency."""
+        return self._prices
+
+    def add_reserve(
+            self, symbol: str, price: float = 1.0,
+            rate_model: Optional[RateModel] = None
+    ) -> Market:
+        """Add a reserve of asset; get its market."""
+        if symbol in self._symbols:
+            raise ValueError(f'reserve {symbol} already exists')
+        steth = StETH(self._wallets.add_column())
+        debtsteth = VDebtStETH(steth, self._borrowed.add_column())
+        asteth = AStETH(steth, debtsteth, self._supplied.add_column())
+        market = Market(steth, debtsteth, asteth, rate_model)
+
+        row = len(self._reserves)
+        self._symbols[symbol] = row
+        self._reserves.append(market)
+        self._rows[market] = row
+        self._liq_indices = np.append(self._liq_indices, 0)
+        self._bor_indices = np.append(self._bor_indices, 0)
+        self._supply_factors = np.append(self._supply_factors, 0)
+        self._prices = np.append(self._prices, price)
+        self._sync(row)
+
+        market.subscribe(self)
+        return market
+
+    def reserve(self, symbol: str) -> Market:
+        """Get market of reserve."""
+        return self._reserves[self._symbols[symbol]]
+
+    def set_price(self, symbol: str, price: float) -> None:
+        """Set price of reserve asset."""
+        self._prices[self._symbols[symbol]] = price
+
+    def advance(self, blocks: int) -> None:
+        """Move clocks of all reserves forward."""
+        for market in self._reserves:
+            market.advance(blocks)
+
+    def _sync(self, row: int) -> None:
+        market = self._reserves[row]
+        self._liq_indices[row] = market.asteth.liq_index
+        self._bor_indices[row] = market.debtsteth.bor_index
+        self._supply_factors[row] = market.asteth.balance_factor()
+
+    def sync(self) -> None:
+        """Refresh arrays of all reserves, after direct token calls."""
+        for row in range(len(self._reserves)):
+            self._sync(row)
+
+    def on_operation(self, market: Market, name: str, args: tuple) -> None:
+        self._sync(self._rows[market])
+
+    def supplied_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get aToken balances of users, a row per user."""
+        rows = self._supplied.rows(to_addresses(users))
+        return rows * self._supply_factors
+
+    def borrowed_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get debt token balances of users, a row per user."""
+        rows = self._borrowed.rows(to_addresses(users))
+        return rows * self._bor_indices
+
+    def collateral_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get values of all aTokens of users in the pool currency."""
+        rows = self._supplied.rows(to_addresses(users))
+        return rows @ (self._supply_factors * self._prices)
+
+    def debt_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get values of all debts of users in the pool currency."""
+        rows = self._borrowed.rows(to_addresses(users))
+        return rows @ (self._bor_indices * self._prices)
@@ -0,0 +1,59 @@
+"""
+Utilization-based interest rate model.
+
+Rates follow the default reserve strategy of Aave: the borrow rate grows
+with `slope1` up to the optimal utilization and with `slope2` after it;
+depositors earn the borrow rate times utilization less the reserve factor.
+
+Rates are yearly and compound per block. Indices are accrued lazily: for
+an idle stretch of `n` blocks the growth factor is `(1 + rate) ** n`, so
+skipping any number of blocks costs O(1). Utilization is taken at the
+start of the stretch, as the contracts do between two updates of reserve.
+"""
+from typing import NamedTuple, Tuple
+
+BLOCKS_PER_YEAR = 2_102_400
+
+
+class RateModel(NamedTuple):
+    """Parameters of the rate strategy, yearly rates as fractions."""
+    optimal_utilization: float = 0.8
+    base_rate: float = 0.0
+    slope1: float = 0.04
+    slope2: float = 0.75
+    reserve_factor: float = 0.1
+    blocks_per_year: int = BLOCKS_PER_YEAR
+
+    def borrow_rate(self, utilization: float) -> float:
+        """Get yearly borrow rate at utilization."""
+        optimal = self.optimal_utilization
+        if utilization <= optimal:
+            return self.base_rate + self.slope1 * utilization / optimal
+        excess = (utilization - optimal) / (1 - optimal)
+        return self.base_rate + self.slope1 + self.slope2 * excess
+
+    def liquidity_rate(self, utilization: float) -> float:
+        """Get yearly rate earned by deposits at utilization."""
+        return (
+            self.borrow_rate(utilization) * utilization
+            * (1 - self.reserve_factor)
+        )
+
+    def growth(self, utilization: float, blocks: int) -> Tuple[float, float]:
+        """
+        Get factors of liquidity and borrow indices after blocks
+        compounded at utilization.
+        """
+        if blocks <= 0:
+            return 1.0, 1.0
+        per_year = self.blocks_per_year
+        liquidity = (1 + self.liquidity_rate(utilization) / per_year) ** blocks
+        borrow = (1 + self.borrow_rate(utilization) / per_year) ** blocks
+        return liquidity, borrow
+
+
+def utilization(borrowed: float, supplied: float) -> float:
+    """Get share of supplied liquidity that is borrowed, 0 without supply."""
+    if supplied <= 0:
+        return 0.0
+    return min(float(borrowed / supplied), 1.0)
@@ -0,0 +1,231 @@
+"""
+Delta reports of market state.
+
+After `attach` the reporter writes a record per operation of market with
+only what the operation changed:
+
+    {"step": 12, "op": "transfer", "args": [...],
+     "aggregates": {"AStETH.total_supply": 800.0, ...},
+     "balances": {"AStETH": (["0x..", "0x.."], array([300., 500.]))}}
+
+`balances` holds new internal balances (shares, internal aStETH balances,
+scaled debts) of accounts touched by the operation, found by balance hooks
+of tokens; public balances are the internal ones times the common factors
+kept in `aggregates`, so a rebase writes no balances at all. `aggregates`
+holds only values that changed. The first record, of operation `attach`,
+has all aggregates and all non-zero balances.
+
+Records are a `<I` size followed by a pickle, the binary format of the
+structured log, so `read_reports` reads them lazily. Holders of tokens are
+kept sorted by balance, so the top-K and the aggregates are available at
+any step without scanning accounts. `render_block` is the text block of
+balances of named accounts.
+"""
+import pickle
+import struct
+from bisect import bisect_left, insort
+from typing import (
+    Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+)
+
+from aave_tokens_model.core.log_sink import read_records
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.tokens.erc20 import ERC20
+from aave_tokens_model.core.utilities.types import AddressT
+
+_SIZE = struct.Struct('<I')
+
+
+class DeltaReporter:
+    """Writer of per-operation changes with incremental summaries."""
+
+    def __init__(self, path: Optional[str] = None, top_k: int = 10):
+        self._file: Optional[BinaryIO] = None
+        if path is not None:
+            self._file = open(path, 'ab')
+        self._top_k = top_k
+        self._market: Optional[Market] = None
+        self._attached = False
+        self._dirty: Dict[ERC20, Set[AddressT]] = {}
+        self._ranks: Dict[ERC20, List[Tuple[Any, AddressT]]] = {}
+        self._values: Dict[ERC20, Dict[AddressT, Any]] = {}
+        self._aggregates: Dict[str, Any] = {}
+
+    def __enter__(self) -> 'DeltaReporter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _tokens(self) -> Tuple[ERC20, ...]:
+        market = self._market
+        return market.steth, market.debtsteth, market.asteth
+
+    def _token(self, symbol: str) -> ERC20:
+        for token in self._tokens():
+            if token.symbol == symbol:
+                return token
+        raise KeyError(symbol)
+
+    def attach(self, market: Market) -> None:
+        """Write full state of market and follow its operations."""
+        self._market = market
+        balances = {}
+        for token in self._tokens():
+            self._ranks[token] = []
+            self._values[token] = {}
+            users = [
+                user for user, value in token._balances.items() if value != 0
+            ]
+            self._rank(token, users)
+            balances[token.symbol] = (users, token._balances.get_many(users))
+            self._dirty[token] = set()
+            token.add_hook(self)
+        market.subscribe(self)
+        self._attached = True
+
+        self._aggregates = self._collect()
+        self._write(market.step, 'attach', (), self._aggregates, balances)
+
+    def detach(self) -> None:
+        """Stop following market; summaries stay queryable."""
+        if not self._attached:
+            return
+        self._market.unsubscribe(self)
+        for token in self._tokens():
+            token.remove_hook(self)
+        self._attached = False
+
+    def close(self) -> None:
+        """Stop following market and close the file."""
+        self.detach()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rank(self, token: ERC20, users: Sequence[AddressT]) -> None:
+        ranks, values, ledger = (
+            self._ranks[token], self._values[token], token._balances
+        )
+        for user in users:
+            previous = values.pop(user, None)
+            if previous is not None:
+                del ranks[bisect_left(ranks, (-previous, user))]
+            value = ledger[user]
+            if value != 0:
+                values[user] = value
+                insort(ranks, (-value, user))
+
+    def _collect(self) -> Dict[str, Any]:
+        market = self._market
+        aggregates = {}
+        for token in self._tokens():
+            aggregates[f'{token.symbol}.total_supply'] = token.total_supply()
+            aggregates[f'{token.symbol}.holders'] = len(self._values[token])
+        aggregates['pooled_eth'] = market.steth._pooled_eth
+        aggregates['liq_index'] = market.asteth.liq_index
+        aggregates['bor_index'] = market.debtsteth.bor_index
+        aggregates['block'] = market.block
+        return aggregates
+
+    def _write(
+            self, step: int, op: str, args: Tuple,
+            aggregates: Dict[str, Any], balances: Dict[str, Tuple]
+    ) -> None:
+        if self._file is None:
+            return
+        record = {
+            'step': step, 'op': op, 'args': args,
+            'aggregates': aggregates, 'balances': balances,
+        }
+        data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(_SIZE.pack(len(data)) + data)
+
+    def on_balances(
+            self, token: ERC20, users: Sequence[AddressT], deltas: Any
+    ) -> None:
+        self._dirty[token].update(users)
+
+    def on_operation(self, market: Market, name: str, args: Tuple) -> None:
+        balances = {}
+        for token, dirty in self._dirty.items():
+            if not dirty:
+                continue
+            users = sorted(dirty)
+            dirty.clear()
+            self._rank(token, users)
+            balances[token.symbol] = (users, token._balances.get_many(users))
+
+        aggregates = self._collect()
+        changed = {
+            key: value for key, value in aggregates.items()
+            if self._aggregates.get(key) != value
+        }
+        self._aggregates = aggregates
+        self._write(market.step, name, args, changed, balances)
+
+    @property
+    def aggregates(self) -> Dict[str, Any]:
+        """Get aggregates after the last operation."""
+        return dict(self._aggregates)
+
+    def top(
+            self, symbol: str, k: Optional[int] = None
+    ) -> List[Tuple[AddressT, float]]:
+        """Get the `k` largest holders of token with their balances."""
+        token = self._token(symbol)
+        if k is None:
+            k = self._top_k
+        return [
+            (user, token.balance_of(user))
+            for _, user in self._ranks[token][:k]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Get aggregates and top holders of every token."""
+        return {
+            'step': self._market.step,
+            'aggregates': self.aggregates,
+            'top': {
+                token.symbol: [
+                    (str(user), balance)
+                    for user, balance in self.top(token.symbol)
+                ]
+                for token in self._tokens()
+            },
+        }
+
+
+def read_reports(path: str) -> Iterator[Dict[str, Any]]:
+    """Read records of a delta report file lazily."""
+    return read_records(path, 'binary')
+
+
+def render_block(
+        market: Market, name: str, accounts: Dict[str, AddressT]
+) -> str:
+    """Render balances of named accounts and of aStETH as a text block."""
+    steth, debtsteth, asteth = market.steth, market.debtsteth, market.asteth
+
+    def _acc_info(label: str, address: AddressT) -> str:
+        return (
+            f'Address of {label} = {address}; '
+            f'stETH balance = {steth.balance_of(address)}; '
+            f'aStETH balance = {asteth.balance_of(address)}; '
+            f'debtStETH balance = {debtsteth.balance_of(address)}'
+        )
+
+    address = asteth.address
+    header = f'  {name}  '.ljust(70, '=').rjust(110, '=')
+    return '\n'.join([
+        header,
+        '\n'.join(
+            _acc_info(label, address)
+            for label, address in accounts.items()
+        ),
+        f'Address of aStETH = {address}; '
+        f'stETH balance = {steth.balance_of(address)}; '
+        f'total supply = {asteth.total_supply()}; '
+        f'total shares = {asteth._total_shares}',  # noqa
+        '=' * 110,
+    ])
@@ -0,0 +1,185 @@
+"""
+Streaming scenarios of market operations.
+
+A scenario is a JSONL or CSV file with one operation per line:
+
+    {"op": "stake", "user": "alice", "value": 1000}
+    {"op": "transfer", "user": "alice", "to": "bob", "value": 10}
+    {"op": "rebase", "value": 1.01}
+    {"op": "advance", "value": 7200}
+    {"op": "liquidate", "user": "carol", "to": "bob", "value": 50}
+    {"op": "deposit", "user": "alice", "value": 10, "day": 30}
+
+or
+
+    op,user,value,to
+    stake,alice,1000,
+    rebase,,1.01,
+
+Users are labels; every label gets its own address on the first use.
+A liquidation is made by `user` for the position of `to`. The optional
+`day` of operation is used by `Timeline` to place it into a rebase history.
+The file is read lazily, so memory does not depend on its length.
+"""
+import csv
+import json
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+from aave_tokens_model.core.utilities.types import AddressT
+
+OPERATIONS = (
+    'stake', 'deposit', 'borrow', 'repay', 'rebase', 'transfer', 'advance',
+    'liquidate'
+)
+_MARKET_OPERATIONS = ('rebase', 'advance')
+
+
+class Operation(NamedTuple):
+    """Single operation of scenario."""
+    op: str
+    user: Optional[str]
+    value: float
+    to: Optional[str] = None
+    day: Optional[int] = None
+
+
+class Snapshot(NamedTuple):
+    """Aggregate state of market after a step."""
+    step: int
+    users: int
+    steth_total_supply: float
+    asteth_total_supply: float
+    debt_total_supply: float
+    steth_held: float
+
+
+def _parse_operation(record: Dict[str, str], line: int) -> Operation:
+    op = record.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f'line {line}: unknown operation {op!r}')
+    try:
+        value = float(record['value'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f'line {line}: bad value of {op}') from None
+
+    user = record.get('user') or None
+    to = record.get('to') or None
+    if op not in _MARKET_OPERATIONS and user is None:
+        raise ValueError(f'line {line}: {op} needs a user')
+    if op in ('transfer', 'liquidate') and to is None:
+        raise ValueError(f'line {line}: {op} needs a receiver')
+    day = record.get('day')
+    if day in (None, ''):
+        day = None
+    else:
+        try:
+            day = int(day)
+        except (TypeError, ValueError):
+            raise ValueError(f'line {line}: bad day of {op}') from None
+
+    return Operation(op=op, user=user, value=value, to=to, day=day)
+
+
+def _read_jsonl(lines: Iterable[str]) -> Iterator[Operation]:
+    for line, text in enumerate(lines, start=1):
+        text = text.strip()
+        if text:
+            yield _parse_operation(json.loads(text), line)
+
+
+def _read_csv(lines: Iterable[str]) -> Iterator[Operation]:
+    for line, record in enumerate(csv.DictReader(lines), start=2):
+        yield _parse_operation(record, line)
+
+
+def read_operations(path: str) -> Iterator[Operation]:
+    """Read operations of a `.jsonl` or `.csv` scenario file lazily."""
+    reader = _read_csv if path.endswith('.csv') else _read_jsonl
+    with open(path, newline='') as scenario:
+        yield from reader(scenario)
+
+
+class ScenarioRunner:
+    """Dispatch operations into a market."""
+
+    def __init__(self, market: Optional[Market] = None):
+        if market is None:
+            market = Market()
+        self._market = market
+        self._addresses: Dict[str, AddressT] = {}
+        self._steps = 0
+
+        self._dispatch: Dict[str, Callable[[Operation], None]] = {
+            'stake': self._user_op(market.stake),
+            'deposit': self._user_op(market.deposit),
+            'borrow': self._user_op(market.borrow),
+            'repay': self._user_op(market.repay),
+            'rebase': lambda op: market.rebase(op.value),
+            'advance': lambda op: market.advance(op.value),
+            'liquidate': lambda op: market.liquidate(
+                self.address(op.user), self.address(op.to), op.value
+            ),
+            'transfer': lambda op: market.transfer(
+                self.address(op.user), self.address(op.to), op.value
+            ),
+        }
+
+    @property
+    def market(self) -> Market:
+        """Get market of runner."""
+        return self._market
+
+    @property
+    def steps(self) -> int:
+        """Get amount of applied operations."""
+        return self._steps
+
+    def _user_op(self, action: Callable) -> Callable[[Operation], None]:
+        return lambda op: action(self.address(op.user), op.value)
+
+    def address(self, user: str) -> AddressT:
+        """Get address of user label."""
+        address = self._addresses.get(user)
+        if address is None:
+            address = self._addresses[user] = generate_address()
+        return address
+
+    def apply(self, operation: Operation) -> None:
+        """Apply single operation to market."""
+        self._dispatch[operation.op](operation)
+        self._steps += 1
+
+    def snapshot(self) -> Snapshot:
+        """Get aggregate state of market."""
+        market = self._market
+        return Snapshot(
+            step=self._steps,
+            users=len(self._addresses),
+            steth_total_supply=market.steth.total_supply(),
+            asteth_total_supply=market.asteth.total_supply(),
+            debt_total_supply=market.debtsteth.total_supply(),
+            steth_held=market.steth.balance_of(market.asteth.address),
+        )
+
+    def run(
+            self, operations: Iterable[Operation], snapshot_every: int = 1000
+    ) -> Iterator[Snapshot]:
+        """
+        Apply operations; yield snapshot every `snapshot_every` steps and
+        after the last one.
+        """
+        if snapshot_every < 1:
+            raise ValueError('snapshot_every must be positive')
+        operations = iter(operations)
+        while True:
+            applied = 0
+            for operation in islice(operations, snapshot_every):
+                self.apply(operation)
+                applied += 1
+            if applied:
+                yield self.snapshot()
+            if applied < snapshot_every:
+                return
@@ -0,0 +1,132 @@
+"""
+Monte-Carlo simulation of randomized market paths.
+
+Every path builds its own isolated market, so paths are independent and
+fan out over a process pool.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+
+# Seeds of paths are spread so that paths of neighbour seeds never meet.
+_PATH_SEED_STRIDE = 1_000_003
+
+
+class SimulationConfig(NamedTuple):
+    """Ranges which every randomized path is drawn from."""
+    paths: int = 1000
+    seed: int = 0
+    users: Tuple[int, int] = (2, 20)
+    steps: int = 50
+    stake: Tuple[float, float] = (1.0, 1000.0)
+    deposit_ratio: Tuple[float, float] = (0.1, 1.0)
+    borrow_ratio: Tuple[float, float] = (0.0, 0.8)
+    rebase_factor: Tuple[float, float] = (0.99, 1.02)
+
+
+class PathResult(NamedTuple):
+    """Summary of a single simulated path."""
+    path: int
+    users: int
+    borrow_ratio: float
+    rebase_factor: float
+    asteth_balances: Tuple[float, ...]
+    asteth_total_supply: float
+    debt_total_supply: float
+    supply_residual: float
+    shares_residual: float
+    balances_residual: float
+
+
+def simulate_path(config: SimulationConfig, path: int) -> PathResult:
+    """Simulate a single path; the result depends on seed and path only."""
+    rng = random.Random(config.seed * _PATH_SEED_STRIDE + path)
+
+    market = Market()
+    steth, debtsteth, asteth = market.steth, market.debtsteth, market.asteth
+
+    users = [generate_address() for _ in range(rng.randint(*config.users))]
+    for user in users:
+        market.stake(user, rng.uniform(*config.stake))
+        deposit = steth.balance_of(user) * rng.uniform(*config.deposit_ratio)
+        market.deposit(user, deposit)
+
+    borrow_ratio = rng.uniform(*config.borrow_ratio)
+    rebase_factor = 1.0
+    for _ in range(config.steps):
+        user = rng.choice(users)
+        action = rng.random()
+        if action < 0.4:
+            value = steth.balance_of(user) * rng.random()
+            if value > 0:
+                market.deposit(user, value)
+        elif action < 0.7:
+            available = steth.balance_of(asteth.address)
+            value = available * borrow_ratio * rng.random()
+            if value > 0:
+                market.borrow(user, value)
+        else:
+            value = min(
+                debtsteth.balance_of(user), steth.balance_of(user)
+            ) * rng.random()
+            if value > 0:
+                market.repay(user, value)
+
+        factor = rng.uniform(*config.rebase_factor)
+        market.rebase(factor)
+        rebase_factor *= factor
+
+    asteth_balances = tuple(asteth.balance_of(user) for user in users)
+    asteth_total_supply = asteth.total_supply()
+    debt_total_supply = debtsteth.total_supply()
+    held_steth = steth.balance_of(asteth.address)
+    held_shares = steth.get_shares_by_pooled_steth(held_steth)
+    borrowed_shares, _ = debtsteth.get_borrowed_state()
+
+    return PathResult(
+        path=path,
+        users=len(users),
+        borrow_ratio=borrow_ratio,
+        rebase_factor=rebase_factor,
+        asteth_balances=asteth_balances,
+        asteth_total_supply=asteth_total_supply,
+        debt_total_supply=debt_total_supply,
+        supply_residual=(
+            asteth_total_supply - held_steth - debt_total_supply
+        ),
+        shares_residual=(
+            asteth._total_shares - held_shares - borrowed_shares  # noqa
+        ),
+        balances_residual=sum(asteth_balances) - asteth_total_supply,
+    )
+
+
+def run_simulation(
+        config: SimulationConfig,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+) -> Iterator[PathResult]:
+    """
+    Simulate all paths of config; yield results in order of paths.
+
+    Paths are run in a pool of `workers` processes (one per core by
+    default) and handed out in chunks of `chunk_size` paths. With a single
+    worker paths are run in the current process.
+    """
+    simulate = partial(simulate_path, config)
+    paths = range(config.paths)
+    if workers == 1:
+        yield from map(simulate, paths)
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, config.paths // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(simulate, paths, chunksize=chunk_size)
@@ -0,0 +1,132 @@
+"""
+Columnar files of market state.
+
+`save_market` writes a directory:
+
+    header.json     scalar state of market and tokens
+    addresses.npy   addresses of accounts as 20 big-endian bytes, sorted
+    steth.npy       stETH shares of accounts
+    debtsteth.npy   scaled debts of accounts
+    asteth.npy      internal aStETH balances of accounts
+
+`load_market` maps the columns with `np.load(mmap_mode='r')`, so opening
+a market takes the same time for any number of accounts and pages of
+columns are read only when balances on them are looked up. Balances are
+float64, so only markets on the float backend are saved; other backends
+raise `TypeError` rather than lose their exact amounts.
+"""
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from aave_tokens_model.core.ledger import (
+    ArrayLedger, MappedLedger, OverlayLedger, address_bytes
+)
+from aave_tokens_model.core.numeric import FloatMath
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import AStETH, Market, StETH, VDebtStETH
+from aave_tokens_model.core.utilities import to_address
+
+FORMAT_VERSION = 1
+
+# Scalar state of tokens kept in the header.
+_FIELDS = {
+    'steth': ('total_supply', 'pooled_eth'),
+    'debtsteth': ('total_supply', 'borrowed_shares', 'bor_index'),
+    'asteth': ('total_supply', 'total_shares', 'liq_index'),
+}
+
+
+def _tokens(market: Market) -> Tuple[StETH, VDebtStETH, AStETH]:
+    return market.steth, market.debtsteth, market.asteth
+
+
+def _columns(market: Market) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Get sorted address column and balance columns of tokens."""
+    ledgers = [token._balances for token in _tokens(market)]
+    if (
+            all(isinstance(ledger, ArrayLedger) for ledger in ledgers)
+            and len({id(ledger.index) for ledger in ledgers}) == 1
+    ):
+        addresses = ledgers[0].index.addresses
+        columns = [ledger.values for ledger in ledgers]
+    else:
+        rows = {}
+        for ledger in ledgers:
+            for user in ledger.keys():
+                rows.setdefault(to_address(user), len(rows))
+        addresses = list(rows)
+        columns = [ledger.get_many(addresses) for ledger in ledgers]
+
+    keys = address_bytes(addresses)
+    order = np.argsort(keys, kind='stable')
+    return keys[order], [column[order] for column in columns]
+
+
+def save_market(market: Market, directory: str) -> None:
+    """Save state of market as columnar files in directory."""
+    for token in _tokens(market):
+        if not isinstance(token.numeric, FloatMath):
+            raise TypeError(f'saving {token.symbol} needs the float backend')
+    os.makedirs(directory, exist_ok=True)
+    keys, columns = _columns(market)
+    np.save(os.path.join(directory, 'addresses.npy'), keys)
+    for name, column in zip(_FIELDS, columns):
+        np.save(os.path.join(directory, f'{name}.npy'), column)
+
+    header = {
+        'version': FORMAT_VERSION,
+        'accounts': int(keys.shape[0]),
+        'step': market.step,
+        'block': market.block,
+        'accrued_block': market._accrued_block,
+    }
+    for name, token in zip(_FIELDS, _tokens(market)):
+        header[name] = {'address': str(token.address)}
+        for field in _FIELDS[name]:
+            header[name][field] = float(getattr(token, f'_{field}'))
+    with open(os.path.join(directory, 'header.json'), 'w') as file:
+        json.dump(header, file, indent=2)
+
+
+def load_market(
+        directory: str, writable: bool = True,
+        rate_model: Optional[RateModel] = None
+) -> Market:
+    """
+    Open market saved in directory without reading its columns.
+
+    A writable market keeps changes in memory over the mapped files; a
+    read-only one raises `TypeError` on every change of balances.
+    """
+    with open(os.path.join(directory, 'header.json')) as file:
+        header = json.load(file)
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f'unsupported market format in {directory}')
+
+    addresses = np.load(
+        os.path.join(directory, 'addresses.npy'), mmap_mode='r'
+    )
+    ledgers = {}
+    for name in _FIELDS:
+        values = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        ledger = MappedLedger(addresses, values)
+        ledgers[name] = OverlayLedger(ledger) if writable else ledger
+
+    steth = StETH(ledgers['steth'])
+    debtsteth = VDebtStETH(steth, ledgers['debtsteth'])
+    asteth = AStETH(steth, debtsteth, ledgers['asteth'])
+    for name, token in zip(_FIELDS, (steth, debtsteth, asteth)):
+        state = header[name]
+        token._address = to_address(state['address'])
+        for field in _FIELDS[name]:
+            setattr(token, f'_{field}', state[field])
+        token._touch()
+
+    market = Market(steth, debtsteth, asteth, rate_model)
+    market._step = header['step']
+    market._block = header['block']
+    market._accrued_block = header['accrued_block']
+    return market
@@ -0,0 +1,148 @@
+"""
+Fast-forward replay of a daily rebase history.
+
+A rebase history is a CSV file with a stETH rebase factor per day:
+
+    day,factor
+    2021-01-01,1.00012
+    2021-01-02,1.00011
+
+or with `apr`, the yearly rate of the day, instead of `factor`; it is
+taken as the daily factor `1 + apr / 365`. Rows are days in order, the
+`day` column is only a label: day `i` is the `i`-th row.
+
+`Timeline` places operations with `day` into the history. Operations of
+a day run before the rebase of that day. Days without operations are
+skipped in one jump: the clock of market moves by the blocks of all
+skipped days, so liquidity and borrow indices accrue in closed form at
+the next operation, and stETH is rebased once by the product of their
+factors. Reports are made only for the requested days.
+"""
+import csv
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.scenario import Operation, ScenarioRunner
+
+BLOCKS_PER_DAY = RateModel().blocks_per_year // 365
+
+
+class DayReport(NamedTuple):
+    """Aggregate state of market at the end of a day."""
+    day: int
+    step: int
+    block: int
+    steth_total_supply: float
+    asteth_total_supply: float
+    debt_total_supply: float
+    liq_index: float
+    bor_index: float
+
+
+def read_rebase_factors(path: str) -> np.ndarray:
+    """Read daily rebase factors of a `factor` or `apr` CSV file."""
+    factors = []
+    with open(path, newline='') as history:
+        for line, record in enumerate(csv.DictReader(history), start=2):
+            try:
+                if record.get('factor') not in (None, ''):
+                    factors.append(float(record['factor']))
+                else:
+                    factors.append(1 + float(record['apr']) / 365)
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f'line {line}: bad rebase factor') from None
+    return np.array(factors, dtype=np.float64)
+
+
+class Timeline:
+    """Replay operations over a daily rebase history."""
+
+    def __init__(
+            self, runner: ScenarioRunner, factors: Iterable[float],
+            blocks_per_day: int = BLOCKS_PER_DAY
+    ):
+        self._runner = runner
+        self._factors = np.asarray(factors, dtype=np.float64)
+        self._blocks_per_day = blocks_per_day
+        self._day = 0
+
+    @property
+    def runner(self) -> ScenarioRunner:
+        """Get runner of operations."""
+        return self._runner
+
+    @property
+    def day(self) -> int:
+        """Get the first day whose rebase is not applied yet."""
+        return self._day
+
+    @property
+    def days(self) -> int:
+        """Get length of history in days."""
+        return len(self._factors)
+
+    def fast_forward(self, day: int) -> None:
+        """Apply rebases and blocks of all days before `day` at once."""
+        if day < self._day:
+            raise ValueError(f'day {day} is already passed')
+        if day > len(self._factors):
+            raise ValueError(f'day {day} is beyond the history')
+        days = day - self._day
+        if days == 0:
+            return
+
+        market = self._runner.market
+        market.advance(days * self._blocks_per_day)
+        factor = float(np.prod(self._factors[self._day:day]))
+        if factor != 1.0:
+            market.rebase(factor)
+        self._day = day
+
+    def report(self) -> DayReport:
+        """Get state of market at the end of the last passed day."""
+        market = self._runner.market
+        market.accrue()
+        return DayReport(
+            day=self._day - 1,
+            step=market.step,
+            block=market.block,
+            steth_total_supply=market.steth.total_supply(),
+            asteth_total_supply=market.asteth.total_supply(),
+            debt_total_supply=market.debtsteth.total_supply(),
+            liq_index=market.asteth.liq_index,
+            bor_index=market.debtsteth.bor_index,
+        )
+
+    def run(
+            self, operations: Iterable[Operation],
+            report_days: Iterable[int] = ()
+    ) -> Iterator[DayReport]:
+        """
+        Apply operations at their days, a day without `day` being the
+        current one; yield report of every requested day. The market is
+        left at the end of history.
+        """
+        report_days = sorted(set(report_days))
+        if report_days and (
+                report_days[0] < 0 or report_days[-1] >= len(self._factors)
+        ):
+            raise ValueError('report days are beyond the history')
+        pending = iter(report_days)
+        report_day: Optional[int] = next(pending, None)
+
+        for operation in operations:
+            day = self._day if operation.day is None else operation.day
+            while report_day is not None and report_day < day:
+                self.fast_forward(report_day + 1)
+                yield self.report()
+                report_day = next(pending, None)
+            self.fast_forward(day)
+            self._runner.apply(operation)
+
+        while report_day is not None:
+            self.fast_forward(report_day + 1)
+            yield self.report()
+            report_day = next(pending, None)
+        self.fast_forward(len(self._factors))
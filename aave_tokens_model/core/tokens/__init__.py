@@ -1,13 +1,20 @@
 # noqa
 from .atoken import (
-    AStETH, get_asteth,
-    deposit_steth, borrow_steth, repay_steth
+    AStETH,
+    deposit_steth, borrow_steth, repay_steth,
+    deposit_many, borrow_many, repay_many,
+    health_factor, liquidate_steth
+)
+from .steth import StETH, stake_eth
+from .vdebtsteth import VDebtStETH
+from .market import (
+    Market, get_market, get_asteth, get_steth, get_debtsteth
 )
-from .steth import StETH, get_steth, stake_eth
-from .vdebtsteth import VDebtStETH, get_debtsteth
 
 __all__ = [
-    'AStETH', 'StETH', 'VDebtStETH',
-    'get_asteth', 'get_steth', 'get_debtsteth',
-    'deposit_steth', 'stake_eth', 'borrow_steth', 'repay_steth'
+    'AStETH', 'StETH', 'VDebtStETH', 'Market',
+    'get_market', 'get_asteth', 'get_steth', 'get_debtsteth',
+    'deposit_steth', 'stake_eth', 'borrow_steth', 'repay_steth',
+    'deposit_many', 'borrow_many', 'repay_many',
+    'health_factor', 'liquidate_steth'
 ]
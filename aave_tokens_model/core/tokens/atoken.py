@@ -1,29 +1,86 @@
 from collections import namedtuple
-from functools import lru_cache, partial
-from typing import Tuple, List
+from functools import partial
+from typing import (
+    Any, Callable, Dict, Tuple, List, Optional, Sequence, Iterable
+)
 
+import numpy as np
+
+from aave_tokens_model.core.ledger import LedgerT, as_values
 from aave_tokens_model.core.logging import Logged
+from aave_tokens_model.core.numeric import FloatMath
+from aave_tokens_model.core.rates import utilization
 from aave_tokens_model.core.tokens.erc20 import ERC20
-from aave_tokens_model.core.tokens.steth import StETH, get_steth
-from aave_tokens_model.core.tokens.vdebtsteth import VDebtStETH, get_debtsteth
+from aave_tokens_model.core.tokens.steth import StETH
+from aave_tokens_model.core.tokens.vdebtsteth import VDebtStETH
+from aave_tokens_model.core.utilities import require
+from aave_tokens_model.core.utilities.restriction import HEALTHY_POSITION
 from aave_tokens_model.core.utilities.types import AddressT
 
+LIQUIDATION_THRESHOLD = 0.8
+LIQUIDATION_BONUS = 0.05
+CLOSE_FACTOR = 0.5
+
 
 class AStETH(ERC20):
-    def __init__(self, steth: StETH, debtsteth: VDebtStETH):
-        super().__init__('aToken implementation for stETH', 'AStETH')
+    __slots__ = (
+        '_steth', '_debtsteth', '_total_shares', '_liq_index', '_scaled_epoch',
+        '_scaled_total_supply_value', '_scaled_ratio'
+    )
+
+    def __init__(
+            self, steth: StETH, debtsteth: VDebtStETH,
+            ledger: Optional[LedgerT] = None
+    ):
+        super().__init__(
+            'aToken implementation for stETH', 'AStETH', ledger=ledger,
+            numeric=steth.numeric
+        )
 
         self._steth = steth
         self._debtsteth = debtsteth
 
-        self._total_shares: float = 0.0
-        self._liq_index: float = 1.0
+        self._total_shares: float = self._num.zero
+        self._liq_index: float = self._num.one
+
+        self._scaled_epoch: int = -1
+        self._scaled_total_supply_value: float = 0
+        self._scaled_ratio: float = 0
 
     @property
     def liq_index(self) -> float:
         """Get current liquidity index."""
         return self._liq_index
 
+    def state(self) -> Dict[str, Any]:
+        state = super().state()
+        state['total_shares'] = self._total_shares
+        state['liq_index'] = self._liq_index
+        return state
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._total_shares = state['total_shares']
+        self._liq_index = state['liq_index']
+        super().load_state(state)
+
+    def fork(
+            self, steth: Optional[StETH] = None,
+            debtsteth: Optional[VDebtStETH] = None
+    ) -> 'AStETH':
+        """Fork aToken; the fork works with given stETH and debt token."""
+        child = super().fork()
+        if steth is not None:
+            child._steth = steth
+        if debtsteth is not None:
+            child._debtsteth = debtsteth
+        return child
+
+    def _log_state(self) -> Dict[str, Any]:
+        state = super()._log_state()
+        state['total_shares'] = self._total_shares
+        state['liq_index'] = self._liq_index
+        return state
+
     def _prepare_log_before(self, action, *args, **kwargs) -> List[str]:
         base_msg = super()._prepare_log_before(action, *args, **kwargs)
         base_msg[-2] = (
@@ -44,12 +101,13 @@ class AStETH(ERC20):
 
     def _increase_liq_index(self, shift: float) -> float:
         self._liq_index += shift
+        self._touch()
         return self._liq_index
 
     def increase_liq_index_mul(self, factor: float) -> float:
         """Increase liq index by factor."""
         previous_liq_index = self._liq_index
-        new_liq_index = previous_liq_index * factor
+        new_liq_index = self._num.scale(previous_liq_index, factor)
         return self._increase_liq_index(new_liq_index - previous_liq_index)
 
     def increase_liq_index_sft(self, shift: float) -> float:
@@ -60,6 +118,11 @@ class AStETH(ERC20):
         """Get amounts of borrowed shares and borrowed steth."""
         return self._debtsteth.get_borrowed_state()
 
+    def utilization(self) -> float:
+        """Get share of scaled total supply that is borrowed."""
+        _, borrowed_steth = self._borrowed_steth()
+        return utilization(borrowed_steth, self._scaled_total_supply())
+
     _State = namedtuple(
         '_State', ['total_supply', 'balance_of']
     )
@@ -67,18 +130,21 @@ class AStETH(ERC20):
     @Logged.with_log
     def _mint_scaled(self, user: AddressT, amount: float) -> float:
         """Convert amount from total amounts to internal and mint it value."""
+        verbose = self._verbose
         log = partial(self.log, self._mint_scaled)
         internal_before = self._State(
             total_supply=super().total_supply(),
             balance_of=super().balance_of(user),
         )
-        log(
-            f'internal before: ts = {internal_before.total_supply}; '
-            f'b = {internal_before.balance_of}'
-        )
+        if verbose:
+            log(
+                f'internal before: ts = {internal_before.total_supply}; '
+                f'b = {internal_before.balance_of}'
+            )
         if internal_before.total_supply == 0:
             amount = self._steth.get_shares_by_pooled_steth(amount)
-            log(f'the first mint; amount = {amount}')
+            if verbose:
+                log(f'the first mint; amount = {amount}')
             return super().mint(user, amount)
 
         scaled_before = self._State(
@@ -86,61 +152,86 @@ class AStETH(ERC20):
             balance_of=self._scaled_balance_of(user)
         )
         other_before = scaled_before.total_supply - scaled_before.balance_of
-        log(
-            f'scaled before: ts = {scaled_before.total_supply}; '
-            f'b = {scaled_before.balance_of}'
-        )
+        if verbose:
+            log(
+                f'scaled before: ts = {scaled_before.total_supply}; '
+                f'b = {scaled_before.balance_of}'
+            )
         if other_before == 0:
-            c = internal_before.total_supply / scaled_before.total_supply
-            amount *= c
-            log(f'other balance == 0; amount = {amount}')
+            c = self._num.ratio(
+                internal_before.total_supply, scaled_before.total_supply
+            )
+            amount = self._num.apply(amount, c)
+            if verbose:
+                log(f'other balance == 0; amount = {amount}')
             return super().mint(user, amount)
 
         scaled_after = self._State(
             total_supply=scaled_before.total_supply + amount,
             balance_of=scaled_before.balance_of + amount
         )
-        log(
-            f'scaled after: ts = {scaled_after.total_supply}; '
-            f'b = {scaled_after.balance_of}'
-        )
-        log(f'other balance = {other_before}')
+        if verbose:
+            log(
+                f'scaled after: ts = {scaled_after.total_supply}; '
+                f'b = {scaled_after.balance_of}'
+            )
+            log(f'other balance = {other_before}')
         a = internal_before.total_supply * scaled_after.balance_of
         b = scaled_after.total_supply * internal_before.balance_of
-        amount = (a - b) / other_before
-        log(f'full calculation; amount = {amount}')
+        amount = self._num.div(a - b, other_before)
+        if verbose:
+            log(f'full calculation; amount = {amount}')
         return super().mint(user, amount)
 
-    def _scaled_total_supply(self) -> float:
-        """Get a total supply of aToken without compounded interest."""
+    def _update_scaled_state(self) -> None:
+        """
+        Compute scaled total supply and internal-to-scaled ratio once per
+        state epoch of stETH, debt token and aToken.
+        """
+        # Epochs only grow, so their sum changes with any of them.
+        epoch = self._epoch + self._steth.epoch + self._debtsteth.epoch
+        if self._scaled_epoch == epoch:
+            return
         borrowed_shares, borrowed_steth = self._borrowed_steth()
         held_shares = self._total_shares - borrowed_shares
         held_steth = self._steth.get_pooled_steth_by_shares(held_shares)
         scaled_total_supply = held_steth + borrowed_steth
 
-        return scaled_total_supply
+        self._scaled_ratio = self._num.ratio(
+            scaled_total_supply, super().total_supply()
+        )
+        self._scaled_total_supply_value = scaled_total_supply
+        self._scaled_epoch = epoch
+
+    def _scaled_total_supply(self) -> float:
+        """Get a total supply of aToken without compounded interest."""
+        self._update_scaled_state()
+        return self._scaled_total_supply_value
 
     def _scaled_balance_of(self, user: AddressT) -> float:
         """Get a balance of user without interest."""
         user_shares = super().balance_of(user)
         if user_shares == 0:
             return 0
-        scaled_total_supply = self._scaled_total_supply()
-        c = scaled_total_supply / super().total_supply()
-        scaled_balance_of = user_shares * c
+        self._update_scaled_state()
+        scaled_balance_of = self._num.apply(user_shares, self._scaled_ratio)
 
         return scaled_balance_of
 
     def _scaled_value(self, value: float) -> float:
-        return value / self._liq_index
+        return self._num.index_div(value, self._liq_index)
 
     def total_supply(self) -> float:
         """Get total supply of aToken (with interest)."""
-        return self._scaled_total_supply() * self._liq_index
+        return self._num.index_mul(
+            self._scaled_total_supply(), self._liq_index
+        )
 
     def balance_of(self, user: AddressT) -> float:
         """Get balance of user (with interest)."""
-        return self._scaled_balance_of(user) * self._liq_index
+        return self._num.index_mul(
+            self._scaled_balance_of(user), self._liq_index
+        )
 
     @Logged.with_log
     def transfer(self, user: AddressT, to: AddressT, value: float) -> bool:
@@ -148,8 +239,8 @@ class AStETH(ERC20):
         scaled_value = self._scaled_value(value)
         total_supply_internal = super().total_supply()
         scaled_total_supply = self._scaled_total_supply()
-        c = total_supply_internal / scaled_total_supply
-        transfer_amount_internal = scaled_value * c
+        c = self._num.ratio(total_supply_internal, scaled_total_supply)
+        transfer_amount_internal = self._num.apply(scaled_value, c)
 
         return super().transfer(user, to, transfer_amount_internal)
 
@@ -160,14 +251,70 @@ class AStETH(ERC20):
         minted = self._mint_scaled(user, scaled_value)
         new_shares = self._steth.get_shares_by_pooled_steth(scaled_value)
         self._total_shares += new_shares
+        self._touch()
 
         return minted
 
+    def balance_factor(self) -> float:
+        """
+        Get balance (with interest) per unit of internal balance as a float.
+        """
+        self._update_scaled_state()
+        num = self._num
+        return (
+            num.factor_float(self._scaled_ratio)
+            * num.index_float(self._liq_index)
+        )
+
+    def balances_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users (with interest) as a float array."""
+        return super().balances_of(users) * self.balance_factor()
+
+    @Logged.with_log
+    def transfer_many(
+            self, users: Sequence[AddressT], tos: Sequence[AddressT],
+            values: Iterable[float]
+    ) -> bool:
+        """Transfer astETH amounts from users to the paired addresses."""
+        scaled_values = self._scaled_value(
+            self._batch_values(values, len(users))
+        )
+        c = self._num.ratio(
+            super().total_supply(), self._scaled_total_supply()
+        )
+
+        return super().transfer_many(
+            users, tos, self._num.apply(scaled_values, c)
+        )
 
-@lru_cache(1)
-def get_asteth() -> AStETH:
-    """Get cached instance of AStETH"""
-    return AStETH(get_steth(), get_debtsteth())
+    @Logged.with_log
+    def mint_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """
+        Mint new astETH for every user at once.
+
+        A mint keeps the ratio of internal to scaled total supply, so the
+        whole batch is converted with the ratio taken before it.
+        """
+        scaled_values = self._scaled_value(
+            self._batch_values(values, len(users))
+        )
+        internal_total_supply = super().total_supply()
+        if internal_total_supply == 0:
+            c = self._steth.steth_to_shares
+        else:
+            c = self._num.ratio(
+                internal_total_supply, self._scaled_total_supply()
+            )
+        minted = super().mint_many(users, self._num.apply(scaled_values, c))
+        new_shares = self._steth.get_shares_by_pooled_steth(
+            float(np.sum(scaled_values))
+        )
+        self._total_shares += new_shares
+        self._touch()
+
+        return minted
 
 
 def deposit_steth(
@@ -190,7 +337,112 @@ def borrow_steth(
 def repay_steth(
         steth: StETH, debtsteth: VDebtStETH, asteth: AStETH,
         user: AddressT, value: float,
+        on_behalf_of: Optional[AddressT] = None,
 ) -> float:
-    """Repay steth and burn debt tokens for user."""
+    """
+    Repay steth of user and burn debt tokens of `on_behalf_of`, the user
+    by default.
+    """
+    if on_behalf_of is None:
+        on_behalf_of = user
     steth.transfer(user, asteth.address, value)
-    return debtsteth.burn(user, value)
+    return debtsteth.burn(on_behalf_of, value)
+
+
+def health_factor(
+        asteth: AStETH, debtsteth: VDebtStETH, user: AddressT,
+        threshold: float = LIQUIDATION_THRESHOLD
+) -> float:
+    """
+    Get health factor of user: collateral weighted by liquidation
+    threshold over debt; infinity without debt.
+    """
+    debt = debtsteth.balance_of(user)
+    if debt == 0:
+        return float('inf')
+    collateral = asteth.numeric.scale(asteth.balance_of(user), threshold)
+    return collateral / debt
+
+
+def liquidate_steth(
+        steth: StETH, debtsteth: VDebtStETH, asteth: AStETH,
+        liquidator: AddressT, user: AddressT, value: float,
+        threshold: float = LIQUIDATION_THRESHOLD,
+        bonus: float = LIQUIDATION_BONUS,
+        close_factor: float = CLOSE_FACTOR,
+) -> float:
+    """
+    Liquidate position of user with health factor below 1.
+
+    Liquidator repays up to `close_factor` of the debt for user and gets
+    the repaid amount plus bonus in aStETH of user. Return seized aStETH.
+    """
+    require(
+        health_factor(asteth, debtsteth, user, threshold) < 1,
+        HEALTHY_POSITION
+    )
+    num = steth.numeric
+    value = min(value, num.scale(debtsteth.balance_of(user), close_factor))
+    repay_steth(steth, debtsteth, asteth, liquidator, value, user)
+    seized = min(num.scale(value, 1 + bonus), asteth.balance_of(user))
+    asteth.transfer(user, liquidator, seized)
+    return seized
+
+
+def _one_by_one(
+        action: Callable[[AddressT, Any], Any],
+        users: Sequence[AddressT], values: Iterable[Any]
+) -> np.ndarray:
+    """
+    Apply scalar action for every user, the batch path of backends other
+    than the float one.
+    """
+    values = list(values)
+    if len(values) != len(users):
+        raise ValueError('users and values must have the same length')
+    return np.array(
+        [action(user, value) for user, value in zip(users, values)],
+        dtype=object
+    )
+
+
+def deposit_many(
+        steth: StETH, asteth: AStETH,
+        users: Sequence[AddressT], values: Iterable[float]
+) -> np.ndarray:
+    """Deposit steth for every user and mint astETH in one batch."""
+    if not isinstance(steth.numeric, FloatMath):
+        return _one_by_one(
+            partial(deposit_steth, steth, asteth), users, values
+        )
+    values = as_values(values, len(users))
+    steth.transfer_many(users, [asteth.address] * len(users), values)
+    return asteth.mint_many(users, values)
+
+
+def borrow_many(
+        steth: StETH, debtsteth: VDebtStETH, asteth: AStETH,
+        users: Sequence[AddressT], values: Iterable[float]
+) -> np.ndarray:
+    """Borrow steth for every user and mint debt tokens in one batch."""
+    if not isinstance(steth.numeric, FloatMath):
+        return _one_by_one(
+            partial(borrow_steth, steth, debtsteth, asteth), users, values
+        )
+    values = as_values(values, len(users))
+    steth.transfer_many([asteth.address] * len(users), users, values)
+    return debtsteth.mint_many(users, values)
+
+
+def repay_many(
+        steth: StETH, debtsteth: VDebtStETH, asteth: AStETH,
+        users: Sequence[AddressT], values: Iterable[float]
+) -> np.ndarray:
+    """Repay steth for every user and burn debt tokens in one batch."""
+    if not isinstance(steth.numeric, FloatMath):
+        return _one_by_one(
+            partial(repay_steth, steth, debtsteth, asteth), users, values
+        )
+    values = as_values(values, len(users))
+    steth.transfer_many(users, [asteth.address] * len(users), values)
+    return debtsteth.burn_many(users, values)
@@ -1,12 +1,18 @@
 """
 ERC20 token.
 """
-from collections import defaultdict
-from typing import Dict, Any, List
+import copy
+from typing import Dict, Any, List, Optional, Sequence, Iterable
 
+import numpy as np
+
+from aave_tokens_model.core.ledger import (
+    DictLedger, LedgerT, as_values, fork_ledger, keeps_floats
+)
 from aave_tokens_model.core.logging import Logged
+from aave_tokens_model.core.numeric import FloatMath, NumericT
 from aave_tokens_model.core.utilities import (
-    AddressT, require, generate_address
+    AddressT, require, generate_address, to_address, to_addresses
 )
 from aave_tokens_model.core.utilities.restriction import NOT_ENOUGH_BALANCE
 
@@ -15,23 +21,53 @@ class ERC20(Logged):
     """
     The most common ERC20 implementation.
     """
+    __slots__ = (
+        '_name', '_symbol', '_address', '_balances', '_num', '_total_supply',
+        '_epoch', '_hooks', '_history'
+    )
 
-    def __init__(self, name: str, symbol: str, verbose: bool = False) -> None:
-        """Prepare new token."""
+    def __init__(
+            self, name: str, symbol: str, verbose: bool = False,
+            ledger: Optional[LedgerT] = None,
+            numeric: Optional[NumericT] = None
+    ) -> None:
+        """
+        Prepare new token.
+
+        `ledger` is a storage of internal balances, `DictLedger` by default.
+        `numeric` is a backend of amounts, `FloatMath` by default. Array and
+        mapped ledgers keep float64 balances, so they take the float
+        backend only.
+        """
         super().__init__(verbose)
         self._name = name
         self._symbol = symbol
         self._verbose = verbose
         self._address = generate_address()
 
-        self._balances: Dict[AddressT, float] = defaultdict(lambda: 0)
+        if ledger is None:
+            ledger = DictLedger()
+        self._balances: LedgerT = ledger
+        if numeric is None:
+            numeric = FloatMath()
+        if not isinstance(numeric, FloatMath) and keeps_floats(ledger):
+            raise TypeError(
+                f'{symbol} on {type(numeric).__name__} needs a dict ledger'
+            )
+        self._num: NumericT = numeric
         self._total_supply: float = 0
+        self._epoch: int = 0
+        self._hooks: List[Any] = []
+        self._history: Optional[Any] = None
 
     def _get_context(self, function: str, stage: str) -> Dict[str, Any]:
         context = super()._get_context(function, stage)
         context['symbol'] = self._symbol
         return context
 
+    def _log_state(self) -> Dict[str, Any]:
+        return {'total_supply': self._total_supply}
+
     def _prepare_log_before(self, action, *args, **kwargs) -> List[str]:
         base_msg = super()._prepare_log_before(action, *args, **kwargs)
         base_msg.append(base_msg[-1])
@@ -52,6 +88,35 @@ class ERC20(Logged):
         start = msg.find('>')
         return msg[:start + 1] + f'{token_symbol}:' + msg[start + 1:]
 
+    def _touch(self) -> None:
+        """Start a new state version; cached conversions become stale."""
+        self._epoch += 1
+
+    def add_hook(self, hook: Any) -> None:
+        """
+        Call `hook.on_balances(token, users, deltas)` after every change
+        of internal balances.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Any) -> None:
+        """Stop calling hook."""
+        self._hooks.remove(hook)
+
+    def _notify(self, users: Sequence[AddressT], deltas: Any) -> None:
+        for hook in self._hooks:
+            hook.on_balances(self, users, deltas)
+
+    @property
+    def epoch(self) -> int:
+        """Get version of token state."""
+        return self._epoch
+
+    @property
+    def numeric(self) -> NumericT:
+        """Get numeric backend of token."""
+        return self._num
+
     @property
     def name(self) -> str:
         """Get name of token."""
@@ -67,13 +132,41 @@ class ERC20(Logged):
         """Get address of token."""
         return self._address
 
+    def state(self) -> Dict[str, Any]:
+        """Get a copy of token state."""
+        return {
+            'address': self._address,
+            'total_supply': self._total_supply,
+            'balances': dict(self._balances.items()),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Replace token state with a copy taken by `state`."""
+        self._address = to_address(state['address'])
+        self._total_supply = state['total_supply']
+        self._balances.clear()
+        for user, value in state['balances'].items():
+            self._balances[to_address(user)] = value
+        self._touch()
+
+    def fork(self) -> 'ERC20':
+        """
+        Get a copy of token that shares balances with this one
+        copy-on-write; only the balances changed later are copied.
+        """
+        child = copy.copy(self)
+        self._balances, child._balances = fork_ledger(self._balances)
+        child._hooks = []
+        child._history = None
+        return child
+
     def total_supply(self) -> float:
         """Get total amount of minted tokens."""
         return self._total_supply
 
     def balance_of(self, user: AddressT) -> float:
         """Get amount of tokens held by the specific user."""
-        return self._balances[user]
+        return self._balances[to_address(user)]
 
     @Logged.with_log
     def transfer(self, user: AddressT, to: AddressT, value: float) -> bool:
@@ -82,23 +175,116 @@ class ERC20(Logged):
 
         Return an indicator of transfer success.
         """
+        user, to = to_address(user), to_address(to)
         require(self._balances[user] >= value, NOT_ENOUGH_BALANCE)
         self._balances[user] -= value
         self._balances[to] += value
+        self._touch()
+        if self._hooks:
+            self._notify((user, to), (-value, value))
 
         return True
 
     @Logged.with_log
     def mint(self, user: AddressT, value: float) -> float:
         """Mint new tokens for user; return new balance."""
+        user = to_address(user)
         self._balances[user] += value
         self._total_supply += value
+        self._touch()
+        if self._hooks:
+            self._notify((user,), (value,))
         return self._balances[user]
 
     @Logged.with_log
     def burn(self, user: AddressT, value: float) -> float:
         """Burn tokens for user; return new balance."""
+        user = to_address(user)
         require(self._balances[user] >= value, NOT_ENOUGH_BALANCE)
         self._balances[user] -= value
         self._total_supply -= value
+        self._touch()
+        if self._hooks:
+            self._notify((user,), (-value,))
         return self._balances[user]
+
+    def _recorded(self) -> Any:
+        if self._history is None:
+            raise ValueError(f'{self._symbol} has no history')
+        return self._history
+
+    def balance_of_at(self, user: AddressT, step: int) -> float:
+        """
+        Get balance of user after step of market; needs the market to be
+        recorded by `History`.
+        """
+        return self._recorded().balance_of_at(self, user, step)
+
+    def total_supply_at(self, step: int) -> float:
+        """Get total supply after step of market."""
+        return self._recorded().total_supply_at(self, step)
+
+    def balances_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get amounts of tokens held by users as an array."""
+        return self._balances.get_many(to_addresses(users))
+
+    def _batch_values(
+            self, values: Iterable[float], size: int
+    ) -> np.ndarray:
+        """Get values of a batch; batches work on float arrays only."""
+        if not isinstance(self._num, FloatMath):
+            raise TypeError(
+                f'batch operations of {self._symbol} need the float backend'
+            )
+        return as_values(values, size)
+
+    @Logged.with_log
+    def mint_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Mint new tokens for every user; return new balances."""
+        values = self._batch_values(values, len(users))
+        users = to_addresses(users)
+        balances = self._balances.add_many(users, values)
+        self._total_supply += float(np.sum(values))
+        self._touch()
+        if self._hooks:
+            self._notify(users, values)
+        return balances
+
+    @Logged.with_log
+    def transfer_many(
+            self, users: Sequence[AddressT], tos: Sequence[AddressT],
+            values: Iterable[float]
+    ) -> bool:
+        """
+        Transfer amounts from users to the paired addresses.
+
+        Every sender must hold the sum of its outgoing amounts before the
+        batch; incoming amounts of the same batch are not spendable.
+        """
+        values = self._batch_values(values, len(users))
+        users, tos = to_addresses(users), to_addresses(tos)
+        require(self._balances.can_spend(users, values), NOT_ENOUGH_BALANCE)
+        self._balances.add_many(users, -values)
+        self._balances.add_many(tos, values)
+        self._touch()
+        if self._hooks:
+            self._notify(users + tos, np.concatenate((-values, values)))
+
+        return True
+
+    @Logged.with_log
+    def burn_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Burn tokens for every user; return new balances."""
+        values = self._batch_values(values, len(users))
+        users = to_addresses(users)
+        require(self._balances.can_spend(users, values), NOT_ENOUGH_BALANCE)
+        balances = self._balances.add_many(users, -values)
+        self._total_supply -= float(np.sum(values))
+        self._touch()
+        if self._hooks:
+            self._notify(users, -values)
+        return balances
@@ -0,0 +1,304 @@
+import inspect
+from functools import lru_cache, wraps
+from typing import Any, Dict, List, Optional, Sequence, Iterable
+
+import numpy as np
+
+from aave_tokens_model.core.ledger import AddressIndex, ArrayLedger
+from aave_tokens_model.core.log_sink import StructuredLogSink
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens.atoken import (
+    AStETH, deposit_steth, borrow_steth, repay_steth,
+    deposit_many, borrow_many, repay_many, liquidate_steth
+)
+from aave_tokens_model.core.tokens.steth import StETH, stake_eth
+from aave_tokens_model.core.tokens.vdebtsteth import VDebtStETH
+from aave_tokens_model.core.utilities.types import AddressT
+
+
+class Market:
+    """
+    A single stETH market: stETH, its variable debt token and aStETH.
+
+    Missing tokens are created, so `Market()` is a fresh isolated market.
+    Every state-changing operation of market is a step; listeners added
+    by `subscribe` get `on_operation(market, name, args)` after each step.
+    Listeners with `before_operation(market, name, args)` get it before
+    each operation and `on_failure(market, name, args)` if it raises.
+
+    With a `rate_model` the market has a clock of blocks moved by
+    `advance`. Interest of elapsed blocks is accrued into liquidity and
+    borrow indices lazily, before the next operation or on `accrue`.
+    """
+
+    def __init__(
+            self,
+            steth: Optional[StETH] = None,
+            debtsteth: Optional[VDebtStETH] = None,
+            asteth: Optional[AStETH] = None,
+            rate_model: Optional[RateModel] = None,
+    ):
+        if steth is None:
+            steth = StETH()
+        if debtsteth is None:
+            debtsteth = VDebtStETH(steth)
+        if asteth is None:
+            asteth = AStETH(steth, debtsteth)
+
+        self._steth = steth
+        self._debtsteth = debtsteth
+        self._asteth = asteth
+
+        self._rate_model = rate_model
+        self._block = 0
+        self._accrued_block = 0
+
+        self._step = 0
+        self._listeners: List[Any] = []
+        self._writers: List[Any] = []
+
+    def operation(action):
+        """
+        Accrue interest before the action; count a step and notify
+        listeners after it. Keyword arguments are bound to positions, so
+        listeners always get positional `args`.
+        """
+        signature = inspect.signature(action)
+
+        @wraps(action)
+        def _handler(self, *args, **kwargs):
+            if kwargs:
+                args = signature.bind(self, *args, **kwargs).args[1:]
+            name = action.__name__
+            for writer in self._writers:
+                writer.before_operation(self, name, args)
+            try:
+                self.accrue()
+                result = action(self, *args)
+            except Exception:
+                for writer in self._writers:
+                    writer.on_failure(self, name, args)
+                raise
+            self._step += 1
+            for listener in self._listeners:
+                listener.on_operation(self, name, args)
+            return result
+
+        return _handler
+
+    @classmethod
+    def with_array_ledgers(
+            cls, rate_model: Optional[RateModel] = None
+    ) -> 'Market':
+        """Create market with tokens sharing one array-backed address index."""
+        index = AddressIndex()
+        steth = StETH(ArrayLedger(index))
+        debtsteth = VDebtStETH(steth, ArrayLedger(index))
+        asteth = AStETH(steth, debtsteth, ArrayLedger(index))
+        return cls(steth, debtsteth, asteth, rate_model)
+
+    @property
+    def steth(self) -> StETH:
+        """Get stETH of market."""
+        return self._steth
+
+    @property
+    def debtsteth(self) -> VDebtStETH:
+        """Get variable debt stETH of market."""
+        return self._debtsteth
+
+    @property
+    def asteth(self) -> AStETH:
+        """Get aStETH of market."""
+        return self._asteth
+
+    @property
+    def step(self) -> int:
+        """Get amount of applied operations."""
+        return self._step
+
+    @property
+    def block(self) -> int:
+        """Get current block of market clock."""
+        return self._block
+
+    @property
+    def rate_model(self) -> Optional[RateModel]:
+        """Get interest rate model, None for a market without interest."""
+        return self._rate_model
+
+    def accrue(self) -> None:
+        """
+        Accrue interest of blocks elapsed since the previous accrual.
+
+        The indices grow in closed form, so the cost does not depend on
+        amount of elapsed blocks.
+        """
+        elapsed = self._block - self._accrued_block
+        if elapsed == 0:
+            return
+        self._accrued_block = self._block
+        if self._rate_model is None:
+            return
+        liquidity, borrow = self._rate_model.growth(
+            self._asteth.utilization(), elapsed
+        )
+        self._asteth.increase_liq_index_mul(liquidity)
+        self._debtsteth.increase_bor_index_mul(borrow)
+
+    def subscribe(self, listener: Any) -> None:
+        """Notify listener after (and, if it asks, before) every operation."""
+        self._listeners.append(listener)
+        if hasattr(listener, 'before_operation'):
+            self._writers.append(listener)
+
+    def unsubscribe(self, listener: Any) -> None:
+        """Stop notifying listener."""
+        self._listeners.remove(listener)
+        if listener in self._writers:
+            self._writers.remove(listener)
+
+    def state(self) -> Dict[str, Any]:
+        """Get a copy of market state."""
+        return {
+            'step': self._step,
+            'block': self._block,
+            'accrued_block': self._accrued_block,
+            'steth': self._steth.state(),
+            'debtsteth': self._debtsteth.state(),
+            'asteth': self._asteth.state(),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Replace market state with a copy taken by `state`."""
+        self._step = state['step']
+        self._block = state['block']
+        self._accrued_block = state['accrued_block']
+        self._steth.load_state(state['steth'])
+        self._debtsteth.load_state(state['debtsteth'])
+        self._asteth.load_state(state['asteth'])
+
+    def fork(self) -> 'Market':
+        """
+        Get an independent market branched from the current state.
+
+        Balances are shared copy-on-write, listeners are not inherited.
+        """
+        steth = self._steth.fork()
+        debtsteth = self._debtsteth.fork(steth)
+        asteth = self._asteth.fork(steth, debtsteth)
+        market = Market(steth, debtsteth, asteth, self._rate_model)
+        market._step = self._step
+        market._block = self._block
+        market._accrued_block = self._accrued_block
+        return market
+
+    def switch_up_logger(self, with_logging: bool) -> None:
+        """Switch-up logging of all tokens."""
+        self._steth.switch_up_logger(with_logging)
+        self._debtsteth.switch_up_logger(with_logging)
+        self._asteth.switch_up_logger(with_logging)
+
+    def switch_up_structured_log(
+            self, sink: Optional[StructuredLogSink]
+    ) -> None:
+        """Log records of all tokens into sink; None switches it off."""
+        self._steth.switch_up_structured_log(sink)
+        self._debtsteth.switch_up_structured_log(sink)
+        self._asteth.switch_up_structured_log(sink)
+
+    @operation
+    def stake(self, user: AddressT, value: float) -> float:
+        """Stake ethereum; return amount of minted shares."""
+        return stake_eth(self._steth, user, value)
+
+    @operation
+    def deposit(self, user: AddressT, value: float) -> float:
+        """Deposit stETH; return amount of minted aStETH."""
+        return deposit_steth(self._steth, self._asteth, user, value)
+
+    @operation
+    def borrow(self, user: AddressT, value: float) -> float:
+        """Borrow stETH; return amount of minted debt."""
+        return borrow_steth(
+            self._steth, self._debtsteth, self._asteth, user, value
+        )
+
+    @operation
+    def repay(self, user: AddressT, value: float) -> float:
+        """Repay stETH; return remaining debt."""
+        return repay_steth(
+            self._steth, self._debtsteth, self._asteth, user, value
+        )
+
+    @operation
+    def liquidate(
+            self, liquidator: AddressT, user: AddressT, value: float
+    ) -> float:
+        """Liquidate position of user; return seized aStETH."""
+        return liquidate_steth(
+            self._steth, self._debtsteth, self._asteth,
+            liquidator, user, value
+        )
+
+    @operation
+    def transfer(self, user: AddressT, to: AddressT, value: float) -> bool:
+        """Transfer aStETH between users."""
+        return self._asteth.transfer(user, to, value)
+
+    @operation
+    def deposit_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Deposit stETH for every user in one batch."""
+        return deposit_many(self._steth, self._asteth, users, values)
+
+    @operation
+    def borrow_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Borrow stETH for every user in one batch."""
+        return borrow_many(
+            self._steth, self._debtsteth, self._asteth, users, values
+        )
+
+    @operation
+    def repay_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Repay stETH for every user in one batch."""
+        return repay_many(
+            self._steth, self._debtsteth, self._asteth, users, values
+        )
+
+    @operation
+    def rebase(self, factor: float) -> float:
+        """Rebase stETH by factor; return new total supply."""
+        return self._steth.rebase_mul(factor)
+
+    @operation
+    def advance(self, blocks: int) -> int:
+        """Move clock forward by blocks; return the new block."""
+        self._block += int(blocks)
+        return self._block
+
+
+@lru_cache(1)
+def get_market() -> Market:
+    """Get cached instance of Market"""
+    return Market()
+
+
+def get_steth() -> StETH:
+    """Get stETH of cached market."""
+    return get_market().steth
+
+
+def get_debtsteth() -> VDebtStETH:
+    """Get VDebtStETH of cached market."""
+    return get_market().debtsteth
+
+
+def get_asteth() -> AStETH:
+    """Get AStETH of cached market."""
+    return get_market().asteth
@@ -1,7 +1,10 @@
-from functools import lru_cache
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Iterable
 
+import numpy as np
+
+from aave_tokens_model.core.ledger import LedgerT
 from aave_tokens_model.core.logging import Logged
+from aave_tokens_model.core.numeric import NumericT
 from aave_tokens_model.core.tokens.erc20 import ERC20
 from aave_tokens_model.core.utilities.types import (
     AddressT
@@ -14,11 +17,31 @@ class StETH(ERC20):
 
     self._total_supply == total shares
     underlaying ERC20 token is equal to shares from contract.
+
+    Debt token and aToken built on stETH use its numeric backend.
     """
+    __slots__ = (
+        '_pooled_eth', '_factors_epoch', '_shares_to_steth_factor',
+        '_steth_to_shares_factor'
+    )
+
+    def __init__(
+            self, ledger: Optional[LedgerT] = None,
+            numeric: Optional[NumericT] = None
+    ):
+        super().__init__(
+            'stETH token', 'stETH', ledger=ledger, numeric=numeric
+        )
+        self._pooled_eth: float = self._num.zero
 
-    def __init__(self):
-        super().__init__('stETH token', 'stETH')
-        self._pooled_eth: float = 0.0
+        self._factors_epoch: int = -1
+        self._shares_to_steth_factor: float = 0
+        self._steth_to_shares_factor: float = 0
+
+    def _log_state(self) -> Dict[str, Any]:
+        state = super()._log_state()
+        state['pooled_eth'] = self._pooled_eth
+        return state
 
     def _prepare_log_after(self, action, *args, **kwargs) -> List[str]:
         msg = super()._prepare_log_after(action, *args, **kwargs)
@@ -36,31 +59,55 @@ class StETH(ERC20):
         )
         return msg
 
+    def state(self) -> Dict[str, Any]:
+        state = super().state()
+        state['pooled_eth'] = self._pooled_eth
+        return state
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._pooled_eth = state['pooled_eth']
+        super().load_state(state)
+
+    def _update_factors(self) -> None:
+        """Compute conversion factors once per state epoch."""
+        if self._factors_epoch == self._epoch:
+            return
+        self._shares_to_steth_factor = self._num.ratio(
+            self._pooled_eth, self._total_supply
+        )
+        self._steth_to_shares_factor = self._num.ratio(
+            self._total_supply, self._pooled_eth
+        )
+        self._factors_epoch = self._epoch
+
     @property
     def shares_to_steth(self) -> float:
-        """Get factor for shares to stETH conversion."""
-        if self._total_supply == 0:
-            return 0
-        return self._pooled_eth / self._total_supply
+        """
+        Get factor for shares to stETH conversion.
+
+        The factor is a float for the default backend, see `numeric`.
+        """
+        self._update_factors()
+        return self._shares_to_steth_factor
 
     @property
     def steth_to_shares(self) -> float:
         """Get factor for stETH to shares conversion."""
-        if self._pooled_eth == 0:
-            return 0
-        return self._total_supply / self._pooled_eth
+        self._update_factors()
+        return self._steth_to_shares_factor
 
     def _shares_to_steth(self, shares_amount: float) -> float:
         """Convert amount of shares to amount of stETH."""
-        return shares_amount * self.shares_to_steth
+        return self._num.apply(shares_amount, self.shares_to_steth)
 
     def _steth_to_shares(self, steth_amount: float) -> float:
         """Convert amount of stETH to amount of shares."""
-        return steth_amount * self.steth_to_shares
+        return self._num.apply(steth_amount, self.steth_to_shares)
 
     def _rebase(self, shift: float) -> float:
         """Shift pooled eth with shift value."""
         self._pooled_eth += shift
+        self._touch()
         return self._pooled_eth
 
     def rebase_mul(self, factor: float) -> float:
@@ -70,7 +117,7 @@ class StETH(ERC20):
         Return new amount.
         """
         previous_total_supply = self._pooled_eth
-        new_total_supply = self._pooled_eth * factor
+        new_total_supply = self._num.scale(self._pooled_eth, factor)
         return self._rebase(new_total_supply - previous_total_supply)
 
     def rebase_sft(self, shift: float) -> float:
@@ -112,6 +159,35 @@ class StETH(ERC20):
         value_in_shares = self._steth_to_shares(value)
         return super().burn(user, value_in_shares)
 
+    def balances_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users in stETH as an array."""
+        return super().balances_of(users) * self._num.factor_float(
+            self.shares_to_steth
+        )
+
+    @Logged.with_log
+    def mint_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Mint new tokens for every user; return new amounts of shares."""
+        values = self._batch_values(values, len(users))
+        if self._pooled_eth == 0:
+            values_in_shares = values
+        else:
+            values_in_shares = self._num.apply(values, self.steth_to_shares)
+        self._pooled_eth += float(np.sum(values))
+        return super().mint_many(users, values_in_shares)
+
+    @Logged.with_log
+    def transfer_many(
+            self, users: Sequence[AddressT], tos: Sequence[AddressT],
+            values: Iterable[float]
+    ) -> bool:
+        """Transfer stETH amounts from users to the paired addresses."""
+        values = self._batch_values(values, len(users))
+        values_in_shares = self._num.apply(values, self.steth_to_shares)
+        return super().transfer_many(users, tos, values_in_shares)
+
     def get_pooled_steth_by_shares(self, shares_amount: float) -> float:
         """Convert shares to steth."""
         return self._shares_to_steth(shares_amount)
@@ -121,12 +197,6 @@ class StETH(ERC20):
         return self._steth_to_shares(steth_amount)
 
 
-@lru_cache(1)
-def get_steth() -> StETH:
-    """Get cached instance of StETH."""
-    return StETH()
-
-
 def stake_eth(steth: StETH, user: AddressT, value: float) -> float:
     """Stake ethereum and get StETH, return amount of minted shares."""
     return steth.mint(user, value)
@@ -1,16 +1,23 @@
-from typing import Tuple
-from functools import lru_cache
+from typing import Any, Dict, Tuple, Optional, Sequence, Iterable
 
+import numpy as np
+
+from aave_tokens_model.core.ledger import LedgerT
 from aave_tokens_model.core.tokens.erc20 import ERC20
-from aave_tokens_model.core.tokens.steth import StETH, get_steth
+from aave_tokens_model.core.tokens.steth import StETH
 from aave_tokens_model.core.utilities.types import AddressT
 
 
 class VDebtStETH(ERC20):
-    def __init__(self, steth: StETH):
-        super().__init__('variable debt stETH token', 'VDebtStETH')
-        self._borrowed_shares: float = 0.0
-        self._bor_index: float = 1.0
+    __slots__ = ('_borrowed_shares', '_bor_index', '_steth')
+
+    def __init__(self, steth: StETH, ledger: Optional[LedgerT] = None):
+        super().__init__(
+            'variable debt stETH token', 'VDebtStETH', ledger=ledger,
+            numeric=steth.numeric
+        )
+        self._borrowed_shares: float = self._num.zero
+        self._bor_index: float = self._num.one
         self._steth: StETH = steth
 
     @property
@@ -18,6 +25,45 @@ class VDebtStETH(ERC20):
         """Get borrow index"""
         return self._bor_index
 
+    def _log_state(self) -> Dict[str, Any]:
+        state = super()._log_state()
+        state['borrowed_shares'] = self._borrowed_shares
+        state['bor_index'] = self._bor_index
+        return state
+
+    def _increase_bor_index(self, shift: float) -> float:
+        self._bor_index += shift
+        self._touch()
+        return self._bor_index
+
+    def increase_bor_index_mul(self, factor: float) -> float:
+        """Increase borrow index by factor."""
+        previous_bor_index = self._bor_index
+        new_bor_index = self._num.scale(previous_bor_index, factor)
+        return self._increase_bor_index(new_bor_index - previous_bor_index)
+
+    def increase_bor_index_sft(self, shift: float) -> float:
+        """Increase borrow index by adding the shift."""
+        return self._increase_bor_index(shift)
+
+    def state(self) -> Dict[str, Any]:
+        state = super().state()
+        state['borrowed_shares'] = self._borrowed_shares
+        state['bor_index'] = self._bor_index
+        return state
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._borrowed_shares = state['borrowed_shares']
+        self._bor_index = state['bor_index']
+        super().load_state(state)
+
+    def fork(self, steth: Optional[StETH] = None) -> 'VDebtStETH':
+        """Fork debt token; the fork works with steth if it is given."""
+        child = super().fork()
+        if steth is not None:
+            child._steth = steth
+        return child
+
     def _scaled_total_supply(self) -> float:
         """Get total supply without borrowing interest."""
         return super().total_supply()
@@ -27,15 +73,19 @@ class VDebtStETH(ERC20):
         return super().balance_of(user)
 
     def _scale_value(self, value: float) -> float:
-        return value / self._bor_index
+        return self._num.index_div(value, self._bor_index)
 
     def total_supply(self) -> float:
         """Get total supply (with borrowing interest)"""
-        return self._scaled_total_supply() * self._bor_index
+        return self._num.index_mul(
+            self._scaled_total_supply(), self._bor_index
+        )
 
     def balance_of(self, user: AddressT) -> float:
         """Get balance of user (with borrowing interest)"""
-        return self._scaled_balance_of(user) * self._bor_index
+        return self._num.index_mul(
+            self._scaled_balance_of(user), self._bor_index
+        )
 
     def transfer(self, user: AddressT, to: AddressT, value: int) -> bool:
         """Out of modeling"""
@@ -54,15 +104,52 @@ class VDebtStETH(ERC20):
         remains = super().burn(user, scaled_value)
         burned_shares = self._steth.get_shares_by_pooled_steth(scaled_value)
         self._borrowed_shares -= burned_shares
+        self._touch()
+
+        return remains
+
+    def balances_of(self, users: Sequence[AddressT]) -> np.ndarray:
+        """Get balances of users (with borrowing interest) as an array."""
+        return super().balances_of(users) * self._num.index_float(
+            self._bor_index
+        )
+
+    def transfer_many(
+            self, users: Sequence[AddressT], tos: Sequence[AddressT],
+            values: Iterable[float]
+    ) -> bool:
+        """Out of modeling"""
+        raise NotImplementedError('out of modeling.')
+
+    def mint_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Mint new debt tokens for every user."""
+        scaled_values = self._scale_value(
+            self._batch_values(values, len(users))
+        )
+        new_shares = self._steth.get_shares_by_pooled_steth(
+            float(np.sum(scaled_values))
+        )
+        self._borrowed_shares += new_shares
+        return super().mint_many(users, scaled_values)
+
+    def burn_many(
+            self, users: Sequence[AddressT], values: Iterable[float]
+    ) -> np.ndarray:
+        """Burn debt tokens for every user."""
+        scaled_values = self._scale_value(
+            self._batch_values(values, len(users))
+        )
+        remains = super().burn_many(users, scaled_values)
+        burned_shares = self._steth.get_shares_by_pooled_steth(
+            float(np.sum(scaled_values))
+        )
+        self._borrowed_shares -= burned_shares
+        self._touch()
 
         return remains
 
     def get_borrowed_state(self) -> Tuple[float, float]:
         """Get borrowed shares and total supply of debt token"""
         return self._borrowed_shares, self._scaled_total_supply()
-
-
-@lru_cache(1)
-def get_debtsteth() -> VDebtStETH:
-    """Get cached instance of VDebtStETH"""
-    return VDebtStETH(get_steth())
@@ -1,8 +1,12 @@
-from .address import generate_address
+from .address import (
+    AddressAllocator, generate_address, seed_addresses,
+    to_address, to_addresses
+)
 from .restriction import require
-from .types import AddressT
+from .types import Address, AddressT
 
 __all__ = [
-    'generate_address', 'require',
-    'AddressT'
+    'AddressAllocator', 'generate_address', 'seed_addresses',
+    'to_address', 'to_addresses', 'require',
+    'Address', 'AddressT'
 ]
@@ -1,8 +1,52 @@
-from uuid import uuid4
+from itertools import count
+from typing import Iterable, List
 
-from .types import AddressT
+from .types import Address, AddressT
 
+# Allocators of different seeds hand out disjoint ranges of addresses.
+_SEED_SHIFT = 64
 
-def generate_address() -> AddressT:
-    """Generate address as 20 bytes sequence."""
-    return f'0x{uuid4().hex.zfill(40)}'
+
+class AddressAllocator:
+    """Deterministic allocator of compact sequential addresses."""
+
+    def __init__(self, seed: int = 0):
+        self._seed = seed
+        self._counter = count(1 + (seed << _SEED_SHIFT))
+
+    @property
+    def seed(self) -> int:
+        """Get seed of allocator."""
+        return self._seed
+
+    def allocate(self) -> Address:
+        """Get the next address."""
+        return Address(next(self._counter))
+
+
+_allocator = AddressAllocator()
+
+
+def seed_addresses(seed: int = 0) -> None:
+    """Restart address generation from seed; generation is replayable."""
+    global _allocator
+    _allocator = AddressAllocator(seed)
+
+
+def generate_address() -> Address:
+    """Generate the next address of the current allocator."""
+    return _allocator.allocate()
+
+
+def to_address(address: AddressT) -> Address:
+    """Get compact address of an address or its hex string."""
+    if address.__class__ is Address:
+        return address
+    if isinstance(address, str):
+        return Address(int(address, 16))
+    return Address(address)
+
+
+def to_addresses(addresses: Iterable[AddressT]) -> List[Address]:
+    """Get compact addresses of addresses or their hex strings."""
+    return [to_address(address) for address in addresses]
@@ -15,3 +15,4 @@ def require(
 
 
 NOT_ENOUGH_BALANCE = 'not enough balance'
+HEALTHY_POSITION = 'health factor is not below 1'
@@ -1,13 +1,26 @@
+from typing import Union
+
 # ========================================================================
 # ======================== Types aliases =================================
 # ========================================================================
-AddressT = str
+AddressT = Union['Address', str]
 
 
 # ========================================================================
 # ======================== New types =====================================
 # ========================================================================
 
+class Address(int):
+    """
+    Compact address: an integer that renders as a 20 bytes hex string.
+    """
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        return f'0x{int(self):040x}'
+
+    __repr__ = __str__
+
 
 # ========================================================================
 # ======================== Exceptions ====================================
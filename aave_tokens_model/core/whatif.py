@@ -0,0 +1,113 @@
+"""
+What-if evaluation of rebases without touching the market.
+
+Under a rebase by factor `f` every balance is linear in the current
+internal balance of user:
+
+    stETH   = shares * pooled_eth * f / total_shares
+    aStETH  = internal * (held_shares * pooled_eth * f / total_shares
+                          + borrowed_steth) / internal_total * liq_index
+    debt    = scaled_debt * bor_index
+
+so a grid of factors and users is an outer product of a factor vector and
+a balance vector. `what_if_rebase` computes both vectors from the live
+state; the matrices are broadcast on request. The vectors are float64 for
+every numeric backend: amounts are taken as floats and indices through
+`index_float` of the backend, as `balances_of` of tokens does.
+"""
+from typing import NamedTuple, Sequence, Union
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import to_addresses
+from aave_tokens_model.core.utilities.types import AddressT
+
+FactorsT = Union[float, Sequence[float], np.ndarray]
+
+
+class WhatIf(NamedTuple):
+    """
+    Balances of users under hypothetical rebases.
+
+    `*_factors` have one value per scenario, the balance vectors one per
+    user; matrices have a row per scenario and a column per user.
+    """
+    steth_factors: np.ndarray
+    asteth_factors: np.ndarray
+    debt_factors: np.ndarray
+    shares: np.ndarray
+    internal: np.ndarray
+    scaled_debt: np.ndarray
+
+    @staticmethod
+    def _outer(factors: np.ndarray, balances: np.ndarray,
+               dtype: np.dtype) -> np.ndarray:
+        return (
+            factors.astype(dtype, copy=False)[:, None]
+            * balances.astype(dtype, copy=False)[None, :]
+        )
+
+    def steth(self, dtype: np.dtype = np.float64) -> np.ndarray:
+        """Get `StETH.balance_of` of users per scenario."""
+        return self._outer(self.steth_factors, self.shares, dtype)
+
+    def asteth(self, dtype: np.dtype = np.float64) -> np.ndarray:
+        """Get `AStETH.balance_of` of users per scenario."""
+        return self._outer(self.asteth_factors, self.internal, dtype)
+
+    def debtsteth(self, dtype: np.dtype = np.float64) -> np.ndarray:
+        """Get `VDebtStETH.balance_of` of users per scenario."""
+        return self._outer(self.debt_factors, self.scaled_debt, dtype)
+
+
+def what_if_rebase(
+        market: Market, users: Sequence[AddressT], factors: FactorsT,
+        liq_index_factors: FactorsT = 1.0, bor_index_factors: FactorsT = 1.0
+) -> WhatIf:
+    """
+    Evaluate balances of users if stETH was rebased by each of factors
+    and liquidity and borrow indices were multiplied by the paired index
+    factors. State of market is only read.
+    """
+    factors = np.atleast_1d(np.asarray(factors, dtype=np.float64))
+    liq_index_factors = np.broadcast_to(
+        np.asarray(liq_index_factors, dtype=np.float64), factors.shape
+    )
+    bor_index_factors = np.broadcast_to(
+        np.asarray(bor_index_factors, dtype=np.float64), factors.shape
+    )
+    steth, debtsteth, asteth = market.steth, market.debtsteth, market.asteth
+    users = to_addresses(users)
+
+    if steth._total_supply == 0:
+        steth_factors = np.zeros_like(factors)
+    else:
+        steth_factors = factors * (
+            float(steth._pooled_eth) / float(steth._total_supply)
+        )
+
+    borrowed_shares, borrowed_steth = debtsteth.get_borrowed_state()
+    internal_total = float(asteth._total_supply)
+    if internal_total == 0:
+        asteth_factors = np.zeros_like(factors)
+    else:
+        held_shares = float(asteth._total_shares - borrowed_shares)
+        scaled_total_supply = (
+            held_shares * steth_factors + float(borrowed_steth)
+        )
+        asteth_factors = (
+            scaled_total_supply / internal_total
+            * asteth.numeric.index_float(asteth.liq_index)
+            * liq_index_factors
+        )
+
+    bor_index = debtsteth.numeric.index_float(debtsteth.bor_index)
+    return WhatIf(
+        steth_factors=steth_factors,
+        asteth_factors=asteth_factors,
+        debt_factors=bor_index * bor_index_factors,
+        shares=steth._balances.get_many(users),
+        internal=asteth._balances.get_many(users),
+        scaled_debt=debtsteth._balances.get_many(users),
+    )
@@ -0,0 +1,57 @@
+"""
+Cost of forking a market against the number of accounts.
+
+A copy-on-write fork is compared with an eager fork: a new market loaded
+with a copy of the whole state of market, which is what a fork costs
+without shared balances.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_fork --accounts 1000 10000 100000
+"""
+import argparse
+import time
+
+from aave_tokens_model.core.tokens import Market
+from benchmarks.markets import populated_market
+
+
+def timed(action, repeat: int) -> float:
+    """Get mean seconds per call of action."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - started) / repeat
+
+
+def eager_fork(market: Market) -> Market:
+    """Get an independent market with copied balances of market."""
+    fork = Market(rate_model=market.rate_model)
+    fork.load_state(market.state())
+    return fork
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--accounts', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f'{"accounts":>10} {"fork + stake, us":>17} {"eager fork, us":>16}'
+    )
+    for accounts in args.accounts:
+        market, users = populated_market(accounts, 'dict', borrowed=0)
+        # A stake changes the parent, so every fork stacks a new overlay.
+        fork = timed(
+            lambda: (market.fork(), market.stake(users[0], 1.0)),
+            args.repeat
+        )
+        eager = timed(lambda: eager_fork(market), 1)
+        print(f'{accounts:>10} {fork * 1e6:>17.1f} {eager * 1e6:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
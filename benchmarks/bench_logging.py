@@ -0,0 +1,67 @@
+"""
+Throughput of token operations with logging switched on and off, and
+with metrics recording.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_logging --rounds 2000
+"""
+import argparse
+import os
+import time
+from contextlib import redirect_stdout
+
+from aave_tokens_model.core.metrics import get_metrics
+from aave_tokens_model.core.tokens import (
+    AStETH, StETH, VDebtStETH,
+    stake_eth, deposit_steth, borrow_steth, repay_steth
+)
+from aave_tokens_model.core.utilities import generate_address
+
+OPS_PER_ROUND = 4
+
+
+def run_rounds(rounds: int, verbose: bool) -> float:
+    """Run stake->deposit->borrow->repay rounds; return ops/sec."""
+    steth = StETH()
+    debtsteth = VDebtStETH(steth)
+    asteth = AStETH(steth, debtsteth)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for token in (steth, debtsteth, asteth):
+            token.switch_up_logger(verbose)
+
+        users = [generate_address() for _ in range(rounds)]
+        started = time.perf_counter()
+        for user in users:
+            stake_eth(steth, user, 100)
+            deposit_steth(steth, asteth, user, 50)
+            borrow_steth(steth, debtsteth, asteth, user, 20)
+            repay_steth(steth, debtsteth, asteth, user, 10)
+        elapsed = time.perf_counter() - started
+
+        for token in (steth, debtsteth, asteth):
+            token.switch_up_logger(False)
+
+    return rounds * OPS_PER_ROUND / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    for verbose in (True, False):
+        ops = run_rounds(args.rounds, verbose)
+        state = 'on' if verbose else 'off'
+        print(f'logging {state:>3}: {ops:12.0f} ops/sec')
+
+    metrics = get_metrics()
+    metrics.enable()
+    ops = run_rounds(args.rounds, verbose=False)
+    metrics.disable()
+    calls = sum(stats.count for _, stats in metrics.items())
+    print(f'metrics on : {ops:12.0f} ops/sec, {calls} recorded calls')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Memory per account of a market.
+
+Compares the current storage (integer addresses, slotted objects, reads of
+unknown accounts that do not insert entries) with the former one: uuid hex
+string addresses in `defaultdict` ledgers, where every balance query of a
+new account stored a zero entry in each token.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_memory --accounts 10000 100000
+"""
+import argparse
+import gc
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Callable
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+
+
+class _DictAccount:
+    """Account with an instance dictionary, as before slots."""
+
+    def __init__(self, address):
+        self._address = address
+
+
+class _SlotsAccount:
+    __slots__ = ('_address',)
+
+    def __init__(self, address):
+        self._address = address
+
+
+def bytes_per_account(
+        populate: Callable[[int], object], accounts: int
+) -> float:
+    """Get traced bytes kept alive by populate, per account."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = populate(accounts)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (after - before) / accounts
+
+
+def former_market(accounts: int) -> object:
+    """Every account staked, half deposited, every one queried once."""
+    steth, debtsteth, asteth = (defaultdict(lambda: 0) for _ in range(3))
+    users = [_DictAccount(f'0x{uuid.uuid4().hex:0>40}')
+             for _ in range(accounts)]
+    for i, user in enumerate(users):
+        steth[user._address] += 100.0
+        if i % 2 == 0:
+            asteth[user._address] += 50.0
+    for user in users:
+        _ = steth[user._address], debtsteth[user._address]
+        _ = asteth[user._address]
+    return steth, debtsteth, asteth, users
+
+
+def current_market(accounts: int) -> object:
+    """The same scenario on the current tokens."""
+    market = Market()
+    users = [_SlotsAccount(generate_address()) for _ in range(accounts)]
+    for user in users:
+        market.stake(user._address, 100.0)
+    depositors = [user._address for user in users[::2]]
+    market.deposit_many(depositors, np.full(len(depositors), 50.0))
+    for user in users:
+        market.steth.balance_of(user._address)
+        market.debtsteth.balance_of(user._address)
+        market.asteth.balance_of(user._address)
+    return market, users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--accounts', type=int, nargs='+', default=[10 ** 4, 10 ** 5]
+    )
+    args = parser.parse_args()
+
+    print(f'{"accounts":>9} {"former, B":>10} {"current, B":>11} {"ratio":>6}')
+    for accounts in args.accounts:
+        former = bytes_per_account(former_market, accounts)
+        current = bytes_per_account(current_market, accounts)
+        print(
+            f'{accounts:>9} {former:>10.0f} {current:>11.0f} '
+            f'{former / current:>6.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
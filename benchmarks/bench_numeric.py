@@ -0,0 +1,54 @@
+"""
+Throughput of token operations per numeric backend.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_numeric --rounds 5000
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from aave_tokens_model.core.numeric import (
+    DecimalMath, FixedPointMath, FloatMath, WAD
+)
+from aave_tokens_model.core.tokens import Market, StETH
+from aave_tokens_model.core.utilities import generate_address
+
+BACKENDS = {
+    'float': (FloatMath(), 1.0),
+    'decimal': (DecimalMath(), Decimal(1)),
+    'fixed-point': (FixedPointMath(), WAD),
+}
+OPS_PER_ROUND = 6
+
+
+def run_rounds(numeric, unit, rounds: int) -> float:
+    """Run stake->deposit->borrow->rebase->repay->read rounds; ops/sec."""
+    market = Market(StETH(numeric=numeric))
+    users = [generate_address() for _ in range(rounds)]
+    started = time.perf_counter()
+    for user in users:
+        market.stake(user, 100 * unit)
+        market.deposit(user, 50 * unit)
+        market.borrow(user, 20 * unit)
+        market.rebase(1.0001)
+        market.repay(user, 10 * unit)
+        market.asteth.balance_of(user)
+    elapsed = time.perf_counter() - started
+
+    return rounds * OPS_PER_ROUND / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=5000)
+    args = parser.parse_args()
+
+    for name, (numeric, unit) in BACKENDS.items():
+        ops = run_rounds(numeric, unit, args.rounds)
+        print(f'{name:>12}: {ops:12.0f} ops/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Per-operation reporting: full text block against delta records.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_reporter --accounts 10000 --operations 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from aave_tokens_model.core.reporter import DeltaReporter, render_block
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--accounts', type=int, default=10 ** 4)
+    parser.add_argument('--operations', type=int, default=1000)
+    args = parser.parse_args()
+
+    users = [generate_address() for _ in range(args.accounts)]
+    accounts = {str(i): user for i, user in enumerate(users)}
+
+    def _operations(market, report):
+        for i in range(args.operations):
+            user = users[i % len(users)]
+            market.stake(user, 10.0)
+            report()
+
+    market = Market()
+    for user in users:
+        market.stake(user, 100.0)
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        _operations(market, lambda: devnull.write(
+            render_block(market, 'step', accounts)
+        ))
+    elapsed = time.perf_counter() - started
+    print(f'text block:    {elapsed * 1e3:8.1f} ms')
+
+    market = Market()
+    for user in users:
+        market.stake(user, 100.0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'report.bin')
+        with DeltaReporter(path) as reporter:
+            reporter.attach(market)
+            started = time.perf_counter()
+            _operations(market, lambda: None)
+            elapsed = time.perf_counter() - started
+        size = os.path.getsize(path)
+    print(f'delta records: {elapsed * 1e3:8.1f} ms, {size} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Saving and opening a market as memory-mapped columns.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_store --accounts 1000000
+"""
+import argparse
+import tempfile
+import time
+
+from aave_tokens_model.core.store import load_market, save_market
+from benchmarks.markets import populated_market
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--accounts', type=int, default=10 ** 6)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    market, users = populated_market(args.accounts, borrowed=0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        save_market(market, directory)
+        elapsed = time.perf_counter() - started
+        print(f'save {args.accounts} accounts: {elapsed * 1e3:8.1f} ms')
+
+        started = time.perf_counter()
+        loaded = load_market(directory, writable=False)
+        elapsed = time.perf_counter() - started
+        print(f'open:                  {elapsed * 1e3:8.1f} ms')
+
+        sample = users[::max(1, args.accounts // args.lookups)]
+        started = time.perf_counter()
+        for user in sample:
+            loaded.asteth.balance_of(user)
+        elapsed = time.perf_counter() - started
+        print(
+            f'aStETH.balance_of:     '
+            f'{elapsed / len(sample) * 1e6:8.1f} us per lookup'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Replay of a daily rebase history: day by day against fast-forward.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_timeline --days 1825 --operations 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.scenario import Operation, ScenarioRunner
+from aave_tokens_model.core.timeline import BLOCKS_PER_DAY, Timeline
+from aave_tokens_model.core.tokens import Market
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--days', type=int, default=5 * 365)
+    parser.add_argument('--operations', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    factors = 1 + rng.uniform(0, 2e-4, args.days)
+    days = np.sort(rng.integers(1, args.days, args.operations))
+    operations = [
+        Operation('stake', 'alice', 1000.0, day=0),
+        Operation('deposit', 'alice', 900.0, day=0),
+    ] + [
+        Operation('borrow', 'alice', 1.0, day=int(day)) for day in days
+    ]
+
+    runner = ScenarioRunner(Market(rate_model=RateModel()))
+    market = runner.market
+    by_day = {}
+    for operation in operations:
+        by_day.setdefault(operation.day, []).append(operation)
+    started = time.perf_counter()
+    for day, factor in enumerate(factors):
+        for operation in by_day.get(day, ()):
+            runner.apply(operation)
+        market.advance(BLOCKS_PER_DAY)
+        market.rebase(factor)
+    elapsed = time.perf_counter() - started
+    print(f'day by day:   {elapsed * 1e3:8.1f} ms, {market.step} steps')
+
+    runner = ScenarioRunner(Market(rate_model=RateModel()))
+    started = time.perf_counter()
+    list(Timeline(runner, factors).run(operations))
+    elapsed = time.perf_counter() - started
+    print(
+        f'fast-forward: {elapsed * 1e3:8.1f} ms, '
+        f'{runner.market.step} steps'
+    )
+
+
+if __name__ == '__main__':
+    main()
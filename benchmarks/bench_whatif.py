@@ -0,0 +1,41 @@
+"""
+What-if rebase grid against the number of users.
+
+Run from the root of repo:
+
+    python -m benchmarks.bench_whatif --factors 1000 --users 100000
+"""
+import argparse
+import time
+import numpy as np
+
+from aave_tokens_model.core.whatif import what_if_rebase
+from benchmarks.markets import populated_market
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--factors', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=10 ** 5)
+    args = parser.parse_args()
+
+    market, users = populated_market(args.users)
+    factors = np.linspace(0.9, 1.1, args.factors)
+
+    started = time.perf_counter()
+    what_if = what_if_rebase(market, users, factors)
+    vectors = time.perf_counter() - started
+    print(f'factor and balance vectors: {vectors * 1e3:8.1f} ms')
+
+    for dtype in (np.float64, np.float32):
+        started = time.perf_counter()
+        what_if.asteth(dtype)
+        elapsed = time.perf_counter() - started
+        print(
+            f'aStETH grid {args.factors}x{args.users} '
+            f'{np.dtype(dtype).name}: {elapsed * 1e3:8.1f} ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
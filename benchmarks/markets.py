@@ -0,0 +1,33 @@
+"""
+Markets populated for benchmarks.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+from aave_tokens_model.core.utilities.types import AddressT
+
+LEDGERS = ('dict', 'array')
+
+
+def populated_market(
+        accounts: int, ledger: str = 'array', borrowed: float = 10.0
+) -> Tuple[Market, List[AddressT]]:
+    """
+    Get market where every account staked 100, deposited 50 and, if
+    `borrowed` is not zero, borrowed it.
+    """
+    if ledger not in LEDGERS:
+        raise ValueError(f'unknown ledger {ledger!r}')
+    if ledger == 'array':
+        market = Market.with_array_ledgers()
+    else:
+        market = Market()
+    users = [generate_address() for _ in range(accounts)]
+    market.steth.mint_many(users, np.full(accounts, 100.0))
+    market.deposit_many(users, np.full(accounts, 50.0))
+    if borrowed:
+        market.borrow_many(users, np.full(accounts, borrowed))
+    return market, users
@@ -0,0 +1,177 @@
+"""
+Benchmark suite of token operations.
+
+Every operation is measured on markets of several sizes with logging
+switched off and on. Results (ops/sec, p50/p99 latency, peak memory) are
+printed and saved as JSON; pass a previous JSON to compare with it.
+
+Run from the root of repo:
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --compare bench.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from aave_tokens_model.core.tokens import (
+    Market, stake_eth, deposit_steth, borrow_steth, repay_steth
+)
+from benchmarks.markets import LEDGERS, populated_market
+
+OperationT = Callable[[Market, List[str], int], Any]
+
+OPERATIONS: Dict[str, OperationT] = {
+    'stake_eth': lambda m, users, i: stake_eth(m.steth, users[i], 1.0),
+    'deposit_steth': lambda m, users, i: deposit_steth(
+        m.steth, m.asteth, users[i], 1.0
+    ),
+    'borrow_steth': lambda m, users, i: borrow_steth(
+        m.steth, m.debtsteth, m.asteth, users[i], 0.1
+    ),
+    'repay_steth': lambda m, users, i: repay_steth(
+        m.steth, m.debtsteth, m.asteth, users[i], 0.1
+    ),
+    'StETH.rebase_mul': lambda m, users, i: m.steth.rebase_mul(1.0000001),
+    'AStETH.transfer': lambda m, users, i: m.asteth.transfer(
+        users[i], users[i - 1], 0.01
+    ),
+    'AStETH.balance_of': lambda m, users, i: m.asteth.balance_of(users[i]),
+}
+
+
+def measure(
+        market: Market, users: List[str], operation: OperationT,
+        samples: int
+) -> Dict[str, float]:
+    """Time single calls of operation; get throughput and latencies."""
+    latencies = np.empty(samples, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i in range(samples):
+        index = i % len(users)
+        started = clock()
+        operation(market, users, index)
+        latencies[i] = clock() - started
+
+    tracemalloc.start()
+    for i in range(min(samples, 100)):
+        operation(market, users, i % len(users))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ops_per_sec': samples / (latencies.sum() / 1e9),
+        'p50_us': float(np.percentile(latencies, 50)) / 1e3,
+        'p99_us': float(np.percentile(latencies, 99)) / 1e3,
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(
+        sizes: List[int], samples: int, ledger: str
+) -> List[Dict[str, Any]]:
+    """Run every operation for every size with logging off and on."""
+    results = []
+    for accounts in sizes:
+        tracemalloc.start()
+        market, users = populated_market(accounts, ledger)
+        _, setup_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        for logging in (False, True):
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                market.switch_up_logger(logging)
+                for name, operation in OPERATIONS.items():
+                    # Logged runs are two orders slower, keep them short.
+                    count = samples if not logging else max(samples // 20, 10)
+                    result = measure(market, users, operation, count)
+                    result.update({
+                        'operation': name,
+                        'accounts': accounts,
+                        'logging': logging,
+                        'setup_peak_bytes': setup_peak,
+                    })
+                    results.append(result)
+                market.switch_up_logger(False)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: Dict[str, Any]) -> tuple:
+    return result['operation'], result['accounts'], result['logging']
+
+
+def print_results(
+        results: List[Dict[str, Any]],
+        baseline: Optional[List[Dict[str, Any]]] = None
+) -> None:
+    """Print results table, with speedup against baseline if given."""
+    previous = {_key(result): result for result in baseline or []}
+    print(
+        f'{"operation":<20} {"accounts":>9} {"log":>4} {"ops/sec":>12} '
+        f'{"p50, us":>9} {"p99, us":>9} {"peak, KiB":>10} {"vs base":>8}'
+    )
+    for result in results:
+        before = previous.get(_key(result))
+        speedup = (
+            f'{result["ops_per_sec"] / before["ops_per_sec"]:7.2f}x'
+            if before else ''
+        )
+        print(
+            f'{result["operation"]:<20} {result["accounts"]:>9} '
+            f'{"on" if result["logging"] else "off":>4} '
+            f'{result["ops_per_sec"]:>12.0f} {result["p50_us"]:>9.2f} '
+            f'{result["p99_us"]:>9.2f} {result["peak_bytes"] / 1024:>10.1f} '
+            f'{speedup:>8}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[100, 10 ** 4, 10 ** 6]
+    )
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--ledger', choices=LEDGERS, default='dict')
+    parser.add_argument('--output', help='Save results as JSON.')
+    parser.add_argument('--compare', help='JSON results to compare with.')
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.samples, args.ledger)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'ledger': args.ledger,
+                'samples': args.samples,
+                'results': results,
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
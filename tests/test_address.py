@@ -0,0 +1,40 @@
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import address as address_module
+from aave_tokens_model.core.utilities import (
+    Address, AddressAllocator, generate_address, seed_addresses, to_address
+)
+
+
+def test_allocation_is_deterministic(monkeypatch):
+    monkeypatch.setattr(address_module, '_allocator', AddressAllocator())
+    first, second = AddressAllocator(seed=5), AddressAllocator(seed=5)
+    addresses = [first.allocate() for _ in range(3)]
+
+    assert addresses == [second.allocate() for _ in range(3)]
+    assert len(set(addresses)) == 3
+    assert AddressAllocator(seed=6).allocate() not in addresses
+
+    seed_addresses(11)
+    replay = [generate_address() for _ in range(3)]
+    seed_addresses(11)
+    assert replay == [generate_address() for _ in range(3)]
+
+
+def test_address_renders_as_hex():
+    address = Address(0xabc)
+    assert str(address) == '0x' + 'abc'.zfill(40)
+    assert f'{address}' == str(address)
+    assert to_address(str(address)) == address
+    assert to_address(str(address)) is not str(address)
+
+
+def test_string_addresses_accepted(accounts):
+    market = Market()
+    a, b = accounts[:2]
+    market.stake(str(a), 100)
+    market.deposit(a, 40)
+    market.transfer(str(a), str(b), 15)
+
+    assert market.steth.balance_of(str(a)) == market.steth.balance_of(a) == 60
+    assert market.asteth.balance_of(str(b)) == 15
+    assert list(market.asteth.balances_of([str(a), b])) == [25, 15]
@@ -45,3 +45,31 @@ def test_transfer_rebase(
 
     assert asteth.balance_of(c) == 60
     assert asteth.balance_of(d) == 90 * 2
+
+
+def test_conversions_cached_per_epoch(
+        steth, asteth, debtsteth, fixed_stake_eth, fixed_deposit_steth,
+        accounts, monkeypatch
+):
+    e = accounts[4]
+    fixed_stake_eth(e, 100)
+    fixed_deposit_steth(e, 100)
+    steth.rebase_mul(1.5)
+
+    calls = []
+    get_borrowed_state = type(debtsteth).get_borrowed_state
+    monkeypatch.setattr(
+        type(debtsteth), 'get_borrowed_state',
+        lambda self: calls.append(1) or get_borrowed_state(self)
+    )
+    epoch = steth.epoch
+    balance = asteth.balance_of(e)
+    for _ in range(10):
+        assert asteth.balance_of(e) == balance
+    assert len(calls) == 1
+    assert steth.epoch == epoch
+
+    steth.rebase_mul(2.0)
+    assert steth.epoch == epoch + 1
+    assert asteth.balance_of(e) == balance * 2
+    assert len(calls) == 2
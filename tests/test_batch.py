@@ -0,0 +1,87 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.numeric import (
+    DecimalMath, FixedPointMath, FloatMath, WAD
+)
+from aave_tokens_model.core.tokens import Market, StETH
+from aave_tokens_model.core.utilities import generate_address
+
+
+def _apply(market: Market, batched: bool, operation: str, users, values):
+    if batched:
+        getattr(market, f'{operation}_many')(users, values)
+        return
+    for user, value in zip(users, values):
+        getattr(market, operation)(user, value)
+
+
+def test_batches_match_sequential_operations():
+    rng = random.Random(3)
+    users = [generate_address() for _ in range(200)]
+    stakes = [rng.uniform(100, 1000) for _ in users]
+
+    def draw(scale):
+        return [stake * scale * rng.random() for stake in stakes]
+
+    deposits, second_deposits, borrows = draw(0.5), draw(0.1), draw(0.2)
+    repays = [value * rng.random() for value in borrows]
+
+    sequential, batched = Market(), Market.with_array_ledgers()
+    for market, is_batched in ((sequential, False), (batched, True)):
+        for user, stake in zip(users, stakes):
+            market.stake(user, stake)
+        market.rebase(1.1)
+        _apply(market, is_batched, 'deposit', users, deposits)
+        _apply(market, is_batched, 'borrow', users, borrows)
+        _apply(market, is_batched, 'deposit', users, second_deposits)
+        market.rebase(1.3)
+        _apply(market, is_batched, 'repay', users, repays)
+
+    for token in ('steth', 'asteth', 'debtsteth'):
+        expected = getattr(sequential, token)
+        actual = getattr(batched, token)
+        assert np.isclose(expected.total_supply(), actual.total_supply())
+        assert np.allclose(
+            [expected.balance_of(user) for user in users],
+            actual.balances_of(users)
+        )
+    assert np.isclose(
+        sequential.asteth._total_shares, batched.asteth._total_shares  # noqa
+    )
+
+
+@pytest.mark.parametrize('numeric, unit', [
+    (FloatMath(), 1.0), (DecimalMath(), Decimal(1)), (FixedPointMath(), WAD)
+])
+def test_batches_match_scalar_path_on_backends(numeric, unit):
+    users = [generate_address() for _ in range(5)]
+    markets = Market(StETH(numeric=numeric)), Market(StETH(numeric=numeric))
+    for market, is_batched in zip(markets, (False, True)):
+        for i, user in enumerate(users, start=1):
+            market.stake(user, 100 * i * unit)
+        _apply(market, is_batched, 'deposit', users, [50 * unit] * 5)
+        market.asteth.increase_liq_index_mul(1.1)
+        market.debtsteth.increase_bor_index_mul(1.3)
+        _apply(market, is_batched, 'borrow', users, [30 * unit] * 5)
+        market.rebase(1.07)
+        _apply(market, is_batched, 'deposit', users, [7 * unit] * 5)
+        _apply(market, is_batched, 'repay', users, [11 * unit] * 5)
+
+    scalar, batched = markets
+    for token in ('steth', 'asteth', 'debtsteth'):
+        for user in users:
+            expected = getattr(scalar, token).balance_of(user)
+            value = getattr(batched, token).balance_of(user)
+            assert type(value) is type(expected)
+            assert value == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('numeric', [DecimalMath(), FixedPointMath()])
+def test_token_batches_need_float_backend(numeric):
+    steth = StETH(numeric=numeric)
+    with pytest.raises(TypeError, match='float backend'):
+        steth.mint_many([generate_address()], [1])
@@ -0,0 +1,71 @@
+import pytest
+
+from aave_tokens_model.core.ledger import MAX_FORK_DEPTH, OverlayLedger
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities import generate_address
+
+
+def _populated(market: Market, accounts) -> Market:
+    for account in accounts[:6]:
+        market.stake(account, 1000)
+        market.deposit(account, 500)
+    market.borrow(accounts[6], 300)
+    return market
+
+
+def test_fork_branches_are_independent(accounts):
+    for parent in (Market(), Market.with_array_ledgers()):
+        parent = _populated(parent, accounts)
+        state = parent.state()
+        a, b, c = accounts[0], accounts[1], accounts[6]
+
+        rebased = parent.fork()
+        repaid = parent.fork()
+        rebased.rebase(2.0)
+        repaid.repay(c, 300)
+
+        assert parent.state() == state
+        assert rebased.step == repaid.step == parent.step + 1
+        assert rebased.asteth.balance_of(a) > parent.asteth.balance_of(a)
+        assert repaid.debtsteth.balance_of(c) == 0
+        assert rebased.debtsteth.balance_of(c) == 300
+
+        parent.transfer(a, b, 100)
+        assert rebased.asteth.balance_of(a) == (2 * (3000 - 300) + 300) / 6
+        assert repaid.asteth.balance_of(b) == 500
+
+
+def test_fork_materializes_only_changes(accounts):
+    parent = _populated(Market(), accounts)
+    child = parent.fork()
+    child.transfer(accounts[0], accounts[1], 10)
+
+    ledger = child.asteth._balances  # noqa
+    assert isinstance(ledger, OverlayLedger)
+    assert set(ledger.changes) == {accounts[0], accounts[1]}
+    assert parent.fork().asteth._balances.base is ledger.base  # noqa
+
+
+def test_repeated_forks_bound_overlays(accounts):
+    for parent in (Market(), Market.with_array_ledgers()):
+        parent = _populated(parent, accounts)
+        root = parent.steth._balances  # noqa
+        values = dict(root.items())
+        child = parent.fork()
+        for i in range(2000):
+            parent.fork()
+            parent.stake(accounts[i % 10], 1)
+            child = child.fork()
+            child.stake(accounts[i % 10], 1)
+        for market in (parent, child):
+            ledger = market.steth._balances  # noqa
+            assert ledger.depth <= MAX_FORK_DEPTH
+            while isinstance(ledger, OverlayLedger):
+                ledger = ledger.base
+            # The forked ledger is shared and never written.
+            assert ledger is root
+            assert market.steth.balance_of(generate_address()) == 0
+        assert dict(root.items()) == values
+        assert child.steth.balance_of(accounts[0]) == pytest.approx(
+            parent.steth.balance_of(accounts[0])
+        )
@@ -0,0 +1,90 @@
+import pytest
+
+from aave_tokens_model.core.history import History
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market
+
+
+def _tokens(market):
+    return market.steth, market.debtsteth, market.asteth
+
+
+def test_queries_match_live_state(accounts):
+    a, b, c = accounts[:3]
+    market = Market(rate_model=RateModel())
+    market.stake(a, 1000)
+    history = History()
+    history.attach(market)
+
+    steps = [
+        lambda: market.stake(b, 1000),
+        lambda: market.deposit(a, 500),
+        lambda: market.deposit(b, 300),
+        lambda: market.borrow(c, 200),
+        lambda: market.rebase(1.2),
+        lambda: market.advance(10 ** 5),
+        lambda: market.transfer(a, b, 100),
+        lambda: market.repay(c, 50),
+    ]
+    expected = {}
+    for operation in [lambda: None] + steps:
+        operation()
+        expected[market.step] = [
+            ([token.balance_of(user) for user in accounts[:4]],
+             token.total_supply())
+            for token in _tokens(market)
+        ]
+
+    for step, tokens in expected.items():
+        for token, (balances, total_supply) in zip(_tokens(market), tokens):
+            assert token.total_supply_at(step) == pytest.approx(total_supply)
+            assert [
+                token.balance_of_at(user, step) for user in accounts[:4]
+            ] == pytest.approx(balances)
+
+    with pytest.raises(ValueError):
+        market.steth.balance_of_at(a, 0)
+
+
+def test_storage_follows_changes(accounts):
+    market = Market()
+    history = History()
+    history.attach(market)
+    market.stake(accounts[0], 10)
+    for _ in range(50):
+        market.transfer(accounts[1], accounts[2], 0)
+    market.stake(accounts[1], 10)
+
+    steps, _ = history._balances[market.steth][accounts[0]]
+    assert steps == [1]
+    assert accounts[2] not in history._balances[market.asteth]
+    assert len(history._steps) == 3
+    assert market.steth.balance_of_at(accounts[1], 30) == 0
+    assert market.steth.balance_of_at(accounts[1], 52) == 10
+    assert Market().steth.fork()._history is None
+
+
+def test_queries_reuse_copies_and_detach(accounts):
+    a, b = accounts[:2]
+    market = Market()
+    history = History()
+    history.attach(market)
+    market.stake(a, 100)
+    market.stake(b, 50)
+    market.rebase(2.0)
+
+    assert market.steth.balance_of_at(a, 1) == 100
+    views = history._views
+    assert market.steth.balance_of_at(a, 3) == 200
+    assert market.steth.total_supply_at(2) == 150
+    assert history._views is views
+    # Copies returned by `tokens_at` do not move with queries.
+    steth, _, _ = history.tokens_at(1)
+    assert market.steth.balance_of_at(b, 3) == 100
+    assert steth.balance_of(b) == 0
+
+    history.detach()
+    assert all(token._history is None for token in _tokens(market))
+    with pytest.raises(ValueError, match='no history'):
+        market.steth.balance_of_at(a, 1)
+    assert history.balance_of_at(market.steth, a, 3) == 200
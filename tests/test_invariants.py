@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.invariants import (
+    InvariantChecker, InvariantViolation
+)
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market
+
+
+def _run(market, accounts):
+    a, b, c = accounts[:3]
+    market.stake(a, 1000)
+    market.stake(b, 1000)
+    market.deposit(a, 500)
+    market.deposit_many([a, b], np.array([100.0, 300.0]))
+    market.borrow(c, 200)
+    market.rebase(1.3)
+    market.transfer(a, b, 50)
+    market.repay_many([c], np.array([100.0]))
+    market.repay(c, 50)
+
+
+@pytest.mark.parametrize('market', [
+    Market(), Market.with_array_ledgers(), Market(rate_model=RateModel())
+])
+def test_operations_keep_invariants(market, accounts):
+    checker = InvariantChecker(full_scan_every=3)
+    checker.attach(market)
+    _run(market, accounts)
+    if market.rate_model is not None:
+        market.advance(10 ** 5)
+        market.deposit(accounts[0], 10)
+    checker.full_scan()
+    assert checker.checks == market.step
+
+
+def test_detects_broken_state(accounts):
+    market = Market()
+    checker = InvariantChecker()
+    checker.attach(market)
+    _run(market, accounts)
+
+    market.steth._total_supply += 1
+    with pytest.raises(InvariantViolation, match='stETH'):
+        checker.check()
+    market.steth._total_supply -= 1
+
+    market.asteth._total_shares += 1
+    with pytest.raises(InvariantViolation, match='aToken shares'):
+        checker.check()
+    market.asteth._total_shares -= 1
+
+    # A write around the hooks is caught only by a full scan.
+    market.debtsteth._balances[accounts[5]] = 7
+    checker.check()
+    with pytest.raises(InvariantViolation, match='scanned'):
+        checker.full_scan()
+
+
+def test_detach_and_forks_drop_hooks(accounts):
+    market = Market()
+    checker = InvariantChecker()
+    checker.attach(market)
+    fork = market.fork()
+    fork.stake(accounts[0], 10)
+    checker.detach()
+    market.stake(accounts[0], 10)
+    assert checker.checks == 0
@@ -0,0 +1,112 @@
+import pytest
+
+from aave_tokens_model.core.journal import Journal
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market
+from aave_tokens_model.core.utilities.types import Revert
+
+
+def _operations(market: Market, accounts):
+    a, b, c = accounts[:3]
+    yield market.stake, (a, 1000)
+    yield market.stake, (b, 1000)
+    for i in range(5):
+        yield market.deposit, (a, 50)
+        yield market.deposit, (b, 30)
+        yield market.borrow, (c, 40)
+        yield market.rebase, (1.01,)
+        yield market.repay, (c, 10)
+    yield market.transfer, (a, b, 25)
+    yield market.deposit_many, ([a, b], [10, 20])
+
+
+def test_restore_any_step(tmp_path, accounts):
+    path = str(tmp_path / 'market.journal')
+    market = Market()
+    states = {}
+    with Journal(path, snapshot_every=5) as journal:
+        journal.attach(market)
+        states[market.step] = market.state()
+        for action, args in _operations(market, accounts):
+            action(*args)
+            states[market.step] = market.state()
+
+    assert Journal.steps(path) == list(range(0, market.step + 1, 5))
+    for step in (0, 3, 5, 12, market.step):
+        assert Journal.restore(path, step).state() == states[step]
+    assert Journal.restore(path).state() == states[market.step]
+
+
+def test_closed_journal_stops_recording(tmp_path, accounts):
+    path = str(tmp_path / 'market.journal')
+    market = Market()
+    with Journal(path) as journal:
+        journal.attach(market)
+        market.stake(accounts[0], 10)
+    market.stake(accounts[0], 10)
+
+    restored = Journal.restore(path)
+    assert restored.step == 1
+    assert restored.steth.balance_of(accounts[0]) == 10
+
+
+def test_operations_are_written_ahead(tmp_path, accounts):
+    path = str(tmp_path / 'market.journal')
+    market = Market()
+    seen = []
+
+    class Probe:
+        def on_balances(self, token, users, deltas):
+            restored = Journal.restore(path, market_factory=Market)
+            seen.append(restored.steth.balance_of(accounts[0]))
+
+    with Journal(path) as journal:
+        journal.attach(market)
+        market.steth.add_hook(Probe())
+        market.stake(accounts[0], 10)
+        with pytest.raises(ValueError):
+            market.deposit_many(accounts[:2], [1.0])
+        market.stake(accounts[0], 5)
+
+    # The journal already had each operation while it was being applied.
+    assert seen[:2] == [10, 15]
+    restored = Journal.restore(path)
+    assert restored.step == market.step == 2
+    assert restored.state() == market.state()
+
+
+def test_failed_operations_are_replayed(tmp_path, accounts):
+    a = accounts[0]
+    path = str(tmp_path / 'market.journal')
+    market = Market()
+    with Journal(path) as journal:
+        journal.attach(market)
+        market.stake(a, 100)
+        # Repay moves stETH before the burn of missing debt reverts.
+        with pytest.raises(Revert):
+            market.repay(a, 10)
+        market.stake(a, 5)
+
+    assert market.steth.balance_of(a) == 95
+    restored = Journal.restore(path)
+    assert restored.steth.balance_of(a) == 95
+    assert restored.state() == market.state()
+    assert Journal.restore(path, 1).steth.balance_of(a) == 100
+
+
+def test_rate_model_is_journaled(tmp_path, accounts):
+    path = str(tmp_path / 'market.journal')
+    rate_model = RateModel(slope1=0.07)
+    market = Market(rate_model=rate_model)
+    with Journal(path) as journal:
+        journal.attach(market)
+        market.stake(accounts[0], 100)
+        market.deposit(accounts[0], 100)
+        market.borrow(accounts[1], 50)
+        market.advance(10000)
+
+    restored = Journal.restore(path)
+    assert restored.rate_model == rate_model
+    restored.accrue()
+    market.accrue()
+    assert restored.state() == market.state()
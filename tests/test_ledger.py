@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.ledger import (
+    ArrayLedger, AddressIndex, BalanceTable
+)
+from aave_tokens_model.core.tokens import (
+    AStETH, VDebtStETH, StETH,
+    deposit_steth, borrow_steth, stake_eth
+)
+from aave_tokens_model.core.utilities import generate_address
+from aave_tokens_model.core.utilities.types import Revert
+
+
+def _market(with_arrays: bool):
+    if with_arrays:
+        index = AddressIndex()
+        steth = StETH(ArrayLedger(index))
+        debtsteth = VDebtStETH(steth, ArrayLedger(index))
+        asteth = AStETH(steth, debtsteth, ArrayLedger(index))
+    else:
+        steth = StETH()
+        debtsteth = VDebtStETH(steth)
+        asteth = AStETH(steth, debtsteth)
+    return steth, debtsteth, asteth
+
+
+def _run_script(steth, debtsteth, asteth, accounts):
+    a, b, c = accounts[:3]
+    stake_eth(steth, a, 1000)
+    stake_eth(steth, b, 1000)
+    deposit_steth(steth, asteth, a, 500)
+    deposit_steth(steth, asteth, b, 300)
+    borrow_steth(steth, debtsteth, asteth, c, 200)
+    steth.rebase_mul(1.7)
+    asteth.transfer(a, b, 100)
+
+
+def test_scalar_api_matches_dict_ledger(accounts):
+    dict_tokens = _market(with_arrays=False)
+    array_tokens = _market(with_arrays=True)
+    _run_script(*dict_tokens, accounts)
+    _run_script(*array_tokens, accounts)
+
+    for expected, actual in zip(dict_tokens, array_tokens):
+        assert expected.total_supply() == actual.total_supply()
+        for user in accounts[:4]:
+            assert expected.balance_of(user) == actual.balance_of(user)
+
+
+def test_bulk_operations():
+    steth, debtsteth, asteth = _market(with_arrays=True)
+    users = [generate_address() for _ in range(100)]
+    values = np.arange(1, 101, dtype=np.float64)
+
+    steth.mint_many(users, values)
+    assert np.array_equal(steth.balances_of(users), values)
+    assert steth.total_supply() == values.sum()
+
+    steth.rebase_mul(2.0)
+    assert np.allclose(steth.balances_of(users), values * 2)
+
+    steth.transfer_many(users[:50], users[50:], values[:50])
+    expected = values * 2
+    expected[:50] -= values[:50]
+    expected[50:] += values[:50]
+    assert np.allclose(steth.balances_of(users), expected)
+    assert steth.balances_of([generate_address()])[0] == 0
+
+    with pytest.raises(Revert):
+        steth.transfer_many(users[:2], users[2:4], [1e9, 1e9])
+
+
+def test_transfer_many_sums_outgoing_amounts():
+    ledger = ArrayLedger()
+    steth = StETH(ledger)
+    a, b, c = (generate_address() for _ in range(3))
+    steth.mint(a, 10)
+
+    with pytest.raises(Revert):
+        steth.transfer_many([a, a], [b, c], [6, 6])
+    assert steth.transfer_many([a, a], [b, c], [5, 5])
+    assert steth.balance_of(a) == 0
+    assert list(ledger.values) == [0, 5, 5]
+
+
+@pytest.mark.parametrize('with_arrays', [False, True])
+def test_reads_do_not_allocate(with_arrays, accounts):
+    steth, debtsteth, asteth = _market(with_arrays)
+    _run_script(steth, debtsteth, asteth, accounts)
+    stored = [len(token._balances) for token in (steth, debtsteth, asteth)]
+
+    stranger = generate_address()
+    for token in (steth, debtsteth, asteth):
+        assert token.balance_of(stranger) == 0
+        assert list(token.balances_of([stranger])) == [0]
+        assert not token._balances.can_spend([stranger], np.ones(1))
+
+    assert [
+        len(token._balances) for token in (steth, debtsteth, asteth)
+    ] == stored
+
+
+def test_table_columns_grow_together():
+    table = BalanceTable()
+    first = table.add_column()
+    users = [generate_address() for _ in range(3000)]
+    first.add_many(users, np.arange(3000.0))
+    second = table.add_column()
+    second[users[-1]] = 5
+
+    assert first[users[2999]] == 2999
+    assert second.get_many(users[-2:]).tolist() == [0, 5]
+    assert table.rows(users[-1:]).tolist() == [[2999, 5]]
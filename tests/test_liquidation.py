@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import pytest
+
+from aave_tokens_model.core.liquidation import HealthIndex
+from aave_tokens_model.core.numeric import DecimalMath, FixedPointMath, WAD
+from aave_tokens_model.core.tokens import Market, StETH, health_factor
+from aave_tokens_model.core.utilities.types import Revert
+
+
+def _market(accounts):
+    market = Market()
+    lender = accounts[9]
+    market.stake(lender, 10000)
+    market.deposit(lender, 5000)
+    # Borrowers deposit 100 stETH and borrow 50..70 of it.
+    for i, user in enumerate(accounts[:5]):
+        market.stake(user, 100)
+        market.deposit(user, 100)
+        market.borrow(user, 50 + 5 * i)
+    return market
+
+
+def _scan(market, accounts):
+    return [
+        user for user in accounts
+        if health_factor(market.asteth, market.debtsteth, user) < 1
+    ]
+
+
+def test_index_follows_rebases(accounts):
+    market = _market(accounts)
+    index = HealthIndex()
+    index.attach(market)
+    assert len(index) == 5
+    assert index.liquidatable() == _scan(market, accounts) == []
+
+    market.rebase(0.8)
+    assert index.liquidatable() == [accounts[4], accounts[3]]
+    assert _scan(market, accounts) == [accounts[3], accounts[4]]
+    for user in accounts[:5]:
+        assert index.health_factor(user) == pytest.approx(
+            health_factor(market.asteth, market.debtsteth, user)
+        )
+
+    market.debtsteth.increase_bor_index_mul(1.1)
+    assert set(index.liquidatable()) == set(_scan(market, accounts))
+    assert index.liquidatable(limit=1) == [accounts[4]]
+
+
+def test_liquidation(accounts):
+    market = _market(accounts)
+    index = HealthIndex()
+    index.attach(market)
+    borrower, liquidator = accounts[4], accounts[8]
+    market.stake(liquidator, 1000)
+
+    with pytest.raises(Revert):
+        market.liquidate(liquidator, borrower, 10)
+
+    market.rebase(0.8)
+    seized = market.liquidate(liquidator, borrower, 100)
+    assert seized == pytest.approx(35 * 1.05)
+    assert market.debtsteth.balance_of(borrower) == pytest.approx(35)
+    assert market.asteth.balance_of(liquidator) == pytest.approx(seized)
+    assert borrower not in index.liquidatable()
+    assert index.liquidatable() == _scan(market, accounts)
+
+    market.repay(accounts[3], 40)
+    assert index.liquidatable() == []
+    market.stake(accounts[0], 20)
+    market.repay(accounts[0], 50)
+    assert len(index) == 4
+
+
+@pytest.mark.parametrize('numeric, unit, expected', [
+    (FixedPointMath(), WAD, 3675 * WAD // 100),
+    (DecimalMath(), Decimal(1), Decimal('36.75')),
+])
+def test_liquidation_keeps_backend_amounts(
+        numeric, unit, expected, accounts
+):
+    market = Market(StETH(numeric=numeric))
+    borrower, lender, liquidator = accounts[:3]
+    market.stake(lender, 1000 * unit)
+    market.deposit(lender, 500 * unit)
+    market.stake(borrower, 100 * unit)
+    market.deposit(borrower, 100 * unit)
+    market.borrow(borrower, 70 * unit)
+    market.stake(liquidator, 100 * unit)
+    market.rebase('0.8')
+
+    seized = market.liquidate(liquidator, borrower, 100 * unit)
+    amount_type = type(unit)
+    assert type(seized) is amount_type
+    assert seized == expected
+    assert market.debtsteth.balance_of(borrower) == 35 * unit
+    for token in (market.steth, market.debtsteth, market.asteth):
+        ledger = token._balances  # noqa
+        for user in (borrower, liquidator):
+            if user in ledger:
+                assert type(ledger[user]) is amount_type
+
+
+def test_index_on_fixed_point_backend(accounts):
+    market = Market(StETH(numeric=FixedPointMath()))
+    index = HealthIndex()
+    index.attach(market)
+    market.stake(accounts[9], 1000 * WAD)
+    market.deposit(accounts[9], 500 * WAD)
+    for i, user in enumerate(accounts[:3]):
+        market.stake(user, 100 * WAD)
+        market.deposit(user, 100 * WAD)
+        market.borrow(user, (60 + 10 * i) * WAD)
+    market.debtsteth.increase_bor_index_mul('1.1')
+    market.rebase('0.9')
+
+    for user in accounts[:3]:
+        assert index.health_factor(user) == pytest.approx(
+            health_factor(market.asteth, market.debtsteth, user)
+        )
+    assert index.liquidatable() == [accounts[2], accounts[1]]
+    assert _scan(market, accounts) == [accounts[1], accounts[2]]
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from aave_tokens_model.__main__ import main
+from aave_tokens_model.core.log_sink import StructuredLogSink, read_records
+from aave_tokens_model.core.tokens import Market
+
+
+@pytest.mark.parametrize('format', ['jsonl', 'binary'])
+def test_market_records(format, tmp_path, accounts):
+    a, b = accounts[:2]
+    path = str(tmp_path / 'log')
+    market = Market()
+    with StructuredLogSink(path, format=format) as sink:
+        market.switch_up_structured_log(sink)
+        market.stake(a, 100)
+        market.deposit(a, 40)
+        market.borrow(b, 10)
+        market.switch_up_structured_log(None)
+        market.stake(b, 100)
+
+    records = list(read_records(path, format))
+    functions = [record['function'] for record in records]
+    assert functions[:2] == ['StETH.mint', 'ERC20.mint']
+    assert functions.count('StETH.mint') == 2
+    assert {record['stage'] for record in records} == {
+        'BEFORE', 'AFTER', 'INTERNAL'
+    }
+
+    after_stake = next(
+        record for record in records
+        if record['function'] == 'StETH.mint' and record['stage'] == 'AFTER'
+    )
+    assert after_stake['symbol'] == 'stETH'
+    assert after_stake['args'] == [a, 100]
+    assert after_stake['state'] == {'total_supply': 100, 'pooled_eth': 100}
+
+    after_mint = [
+        record for record in records
+        if record['function'] == 'AStETH.mint' and record['stage'] == 'AFTER'
+    ][-1]
+    assert after_mint['state']['total_shares'] == 40
+    assert after_mint['state']['liq_index'] == 1
+
+
+def test_rotation_by_size(tmp_path, accounts):
+    path = str(tmp_path / 'log.jsonl')
+    market = Market()
+    with StructuredLogSink(path, max_bytes=2000, backups=2) as sink:
+        market.switch_up_structured_log(sink)
+        for _ in range(200):
+            market.stake(accounts[0], 1)
+
+    rotated = sorted(file.name for file in tmp_path.iterdir())
+    assert rotated == ['log.jsonl', 'log.jsonl.1', 'log.jsonl.2']
+    for name in rotated:
+        records = list(read_records(str(tmp_path / name)))
+        assert all(record['symbol'] == 'stETH' for record in records)
+
+
+def test_records_are_copied(tmp_path, accounts):
+    path = str(tmp_path / 'log')
+    values = np.array([1.0, 2.0])
+    with StructuredLogSink(path, format='binary') as sink:
+        sink.emit({'function': 'f'}, (values, [values]), {}, {})
+        values[:] = 0
+
+    record, = read_records(path, 'binary')
+    assert record['args'] == [[1.0, 2.0], [[1.0, 2.0]]]
+
+
+class _Unpicklable:
+    def __reduce__(self):
+        raise TypeError('not picklable')
+
+
+def test_writer_errors_are_raised(tmp_path):
+    path = str(tmp_path / 'log')
+    sink = StructuredLogSink(path, format='binary', queue_size=1)
+    sink.emit({'function': 'f'}, (_Unpicklable(),), {}, {})
+    sink._thread.join(5)
+    assert not sink._thread.is_alive()
+
+    # A dead writer would never free the queue; emit and close raise.
+    with pytest.raises(TypeError, match='not picklable'):
+        sink.emit({'function': 'f'}, (), {}, {})
+    with pytest.raises(TypeError, match='not picklable'):
+        sink.close()
+    assert sink._file is None
+
+
+def test_log_file_needs_scenario(tmp_path, capsys):
+    path = tmp_path / 'log.jsonl'
+    with pytest.raises(SystemExit):
+        main(['--log-file', str(path)])
+    assert '--log-file needs a scenario' in capsys.readouterr().err
+    assert not path.exists()
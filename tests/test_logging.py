@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+from aave_tokens_model.core import logging
+from aave_tokens_model.core.tokens import StETH
+from aave_tokens_model.core.utilities import AddressT
+
+
+def test_quiet_token_skips_messages(monkeypatch):
+    prepared = []
+    monkeypatch.setattr(
+        StETH, '_prepare_log_before',
+        lambda self, *args, **kwargs: prepared.append(args) or ['', '']
+    )
+    steth = StETH()
+    steth.mint('0x1', 10)
+    assert prepared == []
+
+
+def test_signature_rendered_once(monkeypatch):
+    def action(user: str, value: float = 1.0, *args, **kwargs):
+        pass
+
+    assert logging.get_function_signature(action) == (
+        'action(user: str, value: float = 1.0, *args, **kwargs)'
+    )
+    monkeypatch.setattr(
+        logging.inspect, 'getfullargspec',
+        lambda *args: (_ for _ in ()).throw(AssertionError('not cached'))
+    )
+    assert logging.get_function_signature(action).startswith('action(')
+    message = logging.Logged()._prepare_base_message(action, 'a', value=2)
+    assert message == [
+        'signature: action(user: str, value: float = 1.0, *args, **kwargs)',
+        'args: a', 'kwargs: value = 2', '=' * 20
+    ]
+
+
+def test_signature_renders_typing_generics():
+    def action(
+            user: AddressT, values: List[float],
+            limit: Optional[int] = None
+    ):
+        pass
+
+    assert logging.get_function_signature(action) == (
+        'action(user: Union[Address, str], values: List[float], '
+        'limit: Union[int, None])'
+    )
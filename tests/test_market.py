@@ -0,0 +1,45 @@
+from aave_tokens_model.core.tokens import (
+    Market, get_market, get_steth, get_asteth, get_debtsteth
+)
+
+
+def test_markets_are_isolated(accounts):
+    a, b = accounts[:2]
+    first = Market()
+    second = Market.with_array_ledgers()
+
+    for market in (first, second):
+        assert market.stake(a, 1000) == 1000
+        assert market.deposit(a, 500) == 500
+        assert market.borrow(b, 200) == 200
+
+    first.rebase(2.0)
+    assert first.asteth.balance_of(a) == 800
+    assert second.asteth.balance_of(a) == 500
+
+    assert second.repay(b, 200) == 0
+    assert first.debtsteth.balance_of(b) == 200
+
+
+def test_cached_market_wrappers():
+    market = get_market()
+    assert get_steth() is market.steth
+    assert get_asteth() is market.asteth
+    assert get_debtsteth() is market.debtsteth
+
+
+def test_operations_accept_keywords(accounts):
+    a, b = accounts[:2]
+    market = Market()
+    calls = []
+
+    class Listener:
+        def on_operation(self, market, name, args):
+            calls.append((name, args))
+
+    market.subscribe(Listener())
+    market.stake(a, 1000)
+    assert market.deposit(user=a, value=400) == 400
+    assert market.borrow(b, value=100) == 100
+    assert calls[1:] == [('deposit', (a, 400)), ('borrow', (b, 100))]
+    assert market.step == 3
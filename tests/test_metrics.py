@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from aave_tokens_model.__main__ import main
+from aave_tokens_model.core.metrics import (
+    Metrics, bucket_floor, bucket_of, get_metrics
+)
+from aave_tokens_model.core.tokens import Market
+
+
+@pytest.fixture
+def metrics():
+    metrics = get_metrics()
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+@pytest.mark.parametrize('latency', [0, 7, 31, 32, 1000, 123456, 10 ** 10])
+def test_bucket_bounds_latency(latency):
+    floor = bucket_floor(bucket_of(latency))
+    assert floor <= latency
+    assert latency - floor <= latency / 16
+
+
+def test_percentiles():
+    metrics = Metrics()
+    for latency in range(1, 101):
+        metrics.record('f', latency)
+    stats = metrics.stats('f')
+    assert stats.count == 100
+    assert stats.total_ns == 5050
+    assert stats.max_ns == 100
+    percentiles = stats.percentiles((50, 99))
+    assert 48 <= percentiles['p50_ns'] <= 50
+    assert 92 <= percentiles['p99_ns'] <= 99
+
+
+def test_decorated_calls_are_counted(metrics, accounts):
+    a, b = accounts[:2]
+    market = Market()
+    market.stake(a, 100)
+    market.stake(b, 100)
+    market.deposit(a, 50)
+    summary = metrics.summary()
+
+    assert summary['StETH.mint']['count'] == 2
+    assert summary['ERC20.mint']['count'] == 3
+    assert summary['AStETH._mint_scaled']['count'] == 1
+    assert summary['StETH.transfer']['count'] == 1
+    assert 'VDebtStETH.burn' not in summary
+
+    metrics.disable()
+    market.stake(a, 100)
+    assert metrics.stats('StETH.mint').count == 2
+
+
+def test_cli_dumps_metrics(tmp_path, capsys):
+    scenario = tmp_path / 'scenario.jsonl'
+    scenario.write_text(
+        '{"op": "stake", "user": "alice", "value": 100}\n'
+        '{"op": "deposit", "user": "alice", "value": 10}\n'
+    )
+    path = tmp_path / 'metrics.json'
+    get_metrics().reset()
+    main([str(scenario), '--metrics-json', str(path)])
+    get_metrics().disable()
+
+    dumped = json.loads(path.read_text())
+    assert dumped['StETH.mint']['count'] == 1
+    assert dumped['AStETH.mint']['count'] == 1
+    assert {'total_ns', 'p50_ns', 'p99_ns', 'histogram'} <= set(
+        dumped['StETH.mint']
+    )
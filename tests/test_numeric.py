@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.ledger import (
+    ADDRESS_DTYPE, AddressIndex, ArrayLedger, BalanceTable, DictLedger,
+    MappedLedger, OverlayLedger
+)
+from aave_tokens_model.core.numeric import (
+    DecimalMath, FixedPointMath, RAY, WAD
+)
+from aave_tokens_model.core.tokens import Market, StETH
+from aave_tokens_model.core.utilities import generate_address
+
+
+def _market(numeric) -> Market:
+    return Market(StETH(numeric=numeric))
+
+
+@pytest.mark.parametrize('numeric, unit, expected', [
+    (FixedPointMath(), WAD, 2625 * WAD // 10),
+    (DecimalMath(), Decimal(1), Decimal('262.5')),
+])
+def test_exact_market_case(numeric, unit, expected):
+    market = _market(numeric)
+    a, b, c = (generate_address() for _ in range(3))
+
+    market.stake(a, 1000 * unit)
+    market.stake(b, 1000 * unit)
+    market.deposit(a, 150 * unit)
+    market.deposit(b, 50 * unit)
+    market.borrow(c, 50 * unit)
+    market.rebase(2)
+
+    assert market.asteth.balance_of(a) == expected
+    assert market.steth.balance_of(c) == 100 * unit
+    assert market.debtsteth.balance_of(c) == 50 * unit
+    market.repay(c, 50 * unit)
+    assert market.debtsteth.balance_of(c) == 0
+    assert market.asteth.total_supply() == market.steth.balance_of(
+        market.asteth.address
+    )
+
+
+def test_fixed_point_rounds_in_favour_of_protocol():
+    market = _market(FixedPointMath())
+    users = [generate_address() for _ in range(7)]
+    for i, user in enumerate(users, start=1):
+        market.stake(user, i * WAD // 3)
+        market.deposit(user, i * WAD // 7)
+    for _ in range(50):
+        market.rebase('1.000137')
+        market.asteth.increase_liq_index_mul('1.0000031')
+
+    steth, asteth = market.steth, market.asteth
+    assert isinstance(steth.balance_of(users[0]), int)
+    assert asteth.liq_index > RAY
+    held = sum(steth.balance_of(user) for user in users)
+    held += steth.balance_of(asteth.address)
+    assert held <= steth.total_supply()
+    assert steth.total_supply() - held < len(users) + 1
+
+
+@pytest.mark.parametrize('numeric, unit', [
+    (FixedPointMath(), WAD), (DecimalMath(), Decimal(1))
+])
+def test_vectorized_reads_match_scalar_ones(numeric, unit):
+    market = _market(numeric)
+    users = [generate_address() for _ in range(3)]
+    for i, user in enumerate(users, start=1):
+        market.stake(user, 100 * i * unit)
+        market.deposit(user, 30 * i * unit)
+    market.borrow(users[0], 20 * unit)
+    market.rebase('1.1')
+    market.asteth.increase_liq_index_mul('1.01')
+    market.debtsteth.increase_bor_index_mul('1.02')
+
+    for token in (market.steth, market.asteth, market.debtsteth):
+        assert token.balances_of(users[:1]).shape == (1,)
+        assert token.balances_of(users) == pytest.approx(
+            [float(token.balance_of(user)) for user in users], rel=1e-12
+        )
+    asteth = market.asteth
+    assert asteth.balance_factor() * float(
+        asteth._balances[users[1]]  # noqa
+    ) == pytest.approx(float(asteth.balance_of(users[1])), rel=1e-12)
+
+
+@pytest.mark.parametrize('numeric', [FixedPointMath(), DecimalMath()])
+def test_exact_backends_refuse_float_ledgers(numeric):
+    index = AddressIndex()
+    mapped = MappedLedger(
+        np.empty(0, dtype=ADDRESS_DTYPE), np.empty(0, dtype=np.float64)
+    )
+    for ledger in (
+            ArrayLedger(index), BalanceTable(index).add_column(), mapped,
+            OverlayLedger(ArrayLedger(index))
+    ):
+        with pytest.raises(TypeError, match='dict ledger'):
+            StETH(ledger, numeric=numeric)
+
+    steth = StETH(OverlayLedger(DictLedger()), numeric=numeric)
+    amount = 10 ** 27 + 1 if isinstance(numeric, FixedPointMath) else (
+        Decimal('1000000000.000000000000000001')
+    )
+    steth.mint(generate_address(), amount)
+    assert sum(value for _, value in steth._balances.items()) == (  # noqa
+        steth._total_supply  # noqa
+    )
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.pool import LendingPool
+from aave_tokens_model.core.rates import RateModel
+
+
+def _pool(accounts) -> LendingPool:
+    a, b, c = accounts[:3]
+    pool = LendingPool()
+    steth = pool.add_reserve('stETH', price=2.0)
+    usdc = pool.add_reserve('USDC', rate_model=RateModel())
+    pool.add_reserve('DAI')
+
+    for market in (steth, usdc):
+        market.stake(a, 1000)
+        market.stake(b, 1000)
+        market.deposit(a, 600)
+        market.deposit(b, 100)
+        market.borrow(c, 300)
+    steth.rebase(1.5)
+    pool.advance(10 ** 5)
+    usdc.repay(c, 50)
+    return pool
+
+
+def test_rows_match_tokens(accounts):
+    pool = _pool(accounts)
+    users = accounts[:4]
+    supplied = pool.supplied_of(users)
+    borrowed = pool.borrowed_of(users)
+    assert supplied.shape == borrowed.shape == (4, 3)
+
+    for row, symbol in enumerate(pool.symbols):
+        market = pool.reserve(symbol)
+        for i, user in enumerate(users):
+            assert supplied[i, row] == pytest.approx(
+                market.asteth.balance_of(user)
+            )
+            assert borrowed[i, row] == pytest.approx(
+                market.debtsteth.balance_of(user)
+            )
+    assert pool.liq_indices[1] > 1
+    assert pool.bor_indices[1] > 1
+    assert list(pool.liq_indices[[0, 2]]) == [1, 1]
+
+
+def test_collateral_and_debt_in_pool_currency(accounts):
+    pool = _pool(accounts)
+    users = accounts[:4]
+    expected_collateral = pool.supplied_of(users) @ pool.prices
+    expected_debt = pool.borrowed_of(users) @ pool.prices
+    assert np.allclose(pool.collateral_of(users), expected_collateral)
+    assert np.allclose(pool.debt_of(users), expected_debt)
+
+    pool.set_price('stETH', 3.0)
+    steth = pool.reserve('stETH')
+    assert pool.collateral_of([accounts[0]])[0] == pytest.approx(
+        3 * steth.asteth.balance_of(accounts[0])
+        + pool.reserve('USDC').asteth.balance_of(accounts[0])
+    )
+    assert list(pool.debt_of([accounts[9]])) == [0]
+
+
+def test_reserves_are_isolated(accounts):
+    pool = _pool(accounts)
+    dai = pool.reserve('DAI')
+    assert dai.steth.balance_of(accounts[0]) == 0
+    with pytest.raises(ValueError):
+        pool.add_reserve('DAI')
@@ -0,0 +1,76 @@
+import pytest
+
+from aave_tokens_model.core.journal import Journal
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market
+
+
+def _market(accounts) -> Market:
+    a, b = accounts[:2]
+    market = Market(rate_model=RateModel())
+    market.stake(a, 1000)
+    market.stake(b, 1000)
+    market.deposit(a, 1000)
+    market.borrow(b, 400)
+    return market
+
+
+def test_rate_model_kink():
+    model = RateModel(
+        optimal_utilization=0.8, base_rate=0.01, slope1=0.04, slope2=0.6,
+        reserve_factor=0.1
+    )
+    assert model.borrow_rate(0) == 0.01
+    assert model.borrow_rate(0.4) == pytest.approx(0.03)
+    assert model.borrow_rate(0.9) == pytest.approx(0.35)
+    assert model.liquidity_rate(0.4) == pytest.approx(0.03 * 0.4 * 0.9)
+    assert model.growth(0.4, 0) == (1.0, 1.0)
+
+
+def test_lazy_accrual_in_closed_form(accounts):
+    market = _market(accounts)
+    model = market.rate_model
+    assert market.asteth.utilization() == pytest.approx(0.4)
+
+    blocks = model.blocks_per_year
+    market.advance(blocks)
+    assert market.asteth.liq_index == 1
+    assert market.debtsteth.bor_index == 1
+
+    market.accrue()
+    liquidity, borrow = model.growth(0.4, blocks)
+    assert market.asteth.liq_index == pytest.approx(liquidity)
+    assert market.debtsteth.bor_index == pytest.approx(borrow)
+    assert market.debtsteth.balance_of(accounts[1]) == pytest.approx(
+        400 * borrow
+    )
+
+    market.accrue()
+    assert market.debtsteth.bor_index == pytest.approx(borrow)
+
+
+def test_operation_accrues_first(accounts):
+    market = _market(accounts)
+    market.advance(1000)
+    market.deposit(accounts[1], 10)
+    assert market.debtsteth.bor_index > 1
+    assert market.block == 1000
+
+
+def test_clock_is_journaled(accounts, tmp_path):
+    path = str(tmp_path / 'market.journal')
+    market = _market(accounts)
+    with Journal(path) as journal:
+        journal.attach(market)
+        market.advance(5000)
+        market.repay(accounts[1], 100)
+        market.advance(300)
+
+    restored = Journal.restore(
+        path, market_factory=lambda: Market(rate_model=RateModel())
+    )
+    restored.accrue()
+    market.accrue()
+    assert restored.block == 5300
+    assert restored.debtsteth.bor_index == market.debtsteth.bor_index
+    assert restored.asteth.liq_index == market.asteth.liq_index
@@ -0,0 +1,82 @@
+import pytest
+
+from aave_tokens_model.core.reporter import (
+    DeltaReporter, read_reports, render_block
+)
+from aave_tokens_model.core.tokens import Market
+
+
+def _run(market, accounts):
+    for i, user in enumerate(accounts):
+        market.stake(user, 100 + 10 * i)
+    for user in accounts[:6]:
+        market.deposit(user, 50)
+    market.borrow(accounts[7], 30)
+    market.rebase(1.1)
+    market.transfer(accounts[0], accounts[8], 20)
+    market.repay(accounts[7], 10)
+
+
+@pytest.mark.parametrize('market', [Market(), Market.with_array_ledgers()])
+def test_records_replay_to_state(tmp_path, market, accounts):
+    path = str(tmp_path / 'report.bin')
+    market.stake(accounts[9], 1000)
+    with DeltaReporter(path) as reporter:
+        reporter.attach(market)
+        _run(market, accounts)
+
+    records = list(read_reports(path))
+    assert [record['step'] for record in records] == list(
+        range(1, market.step + 1)
+    )
+    assert records[0]['op'] == 'attach'
+    rebase = next(record for record in records if record['op'] == 'rebase')
+    assert rebase['balances'] == {}
+    assert set(rebase['aggregates']) == {
+        'stETH.total_supply', 'AStETH.total_supply', 'pooled_eth'
+    }
+
+    balances = {}
+    aggregates = {}
+    for record in records:
+        aggregates.update(record['aggregates'])
+        for symbol, (users, values) in record['balances'].items():
+            balances.setdefault(symbol, {}).update(zip(users, values))
+    for token in (market.steth, market.debtsteth, market.asteth):
+        for user in accounts:
+            assert balances[token.symbol].get(user, 0) == pytest.approx(
+                token._balances[user]
+            )
+        assert aggregates[f'{token.symbol}.total_supply'] == pytest.approx(
+            token.total_supply()
+        )
+
+
+def test_summaries_are_incremental(accounts):
+    market = Market()
+    reporter = DeltaReporter(top_k=3)
+    reporter.attach(market)
+    _run(market, accounts)
+
+    for token in (market.steth, market.debtsteth, market.asteth):
+        holders = [u for u, v in token._balances.items() if v != 0]
+        expected = sorted(holders, key=token.balance_of, reverse=True)
+        top = reporter.top(token.symbol)
+        assert [user for user, _ in top] == expected[:3]
+        assert top[0][1] == token.balance_of(expected[0])
+        assert reporter.aggregates[f'{token.symbol}.holders'] == len(holders)
+    assert reporter.aggregates['pooled_eth'] == market.steth._pooled_eth
+
+    reporter.detach()
+    market.stake(accounts[0], 10 ** 6)
+    assert reporter.top('stETH', 1)[0][0] != accounts[0]
+
+
+def test_render_block(accounts):
+    market = Market()
+    market.stake(accounts[0], 10)
+    block = render_block(market, 'Stake', {'a': accounts[0]})
+    lines = block.splitlines()
+    assert len(lines) == 4
+    assert len(lines[0]) == 110 and '  Stake  ' in lines[0]
+    assert f'Address of a = {accounts[0]}; stETH balance = 10' in lines[1]
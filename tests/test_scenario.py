@@ -0,0 +1,74 @@
+import pytest
+
+from aave_tokens_model.__main__ import main
+from aave_tokens_model.core.scenario import (
+    Operation, ScenarioRunner, read_operations
+)
+
+JSONL_SCENARIO = '''
+{"op": "stake", "user": "alice", "value": 1000}
+{"op": "stake", "user": "bob", "value": 1000}
+{"op": "deposit", "user": "alice", "value": 500}
+{"op": "borrow", "user": "bob", "value": 200}
+{"op": "rebase", "value": 2.0}
+{"op": "transfer", "user": "alice", "to": "bob", "value": 100}
+{"op": "repay", "user": "bob", "value": 200}
+'''
+
+CSV_SCENARIO = '''op,user,value,to
+stake,alice,1000,
+stake,bob,1000,
+deposit,alice,500,
+borrow,bob,200,
+rebase,,2.0,
+transfer,alice,100,bob
+repay,bob,200,
+'''
+
+
+@pytest.mark.parametrize('name, content', [
+    ('scenario.jsonl', JSONL_SCENARIO),
+    ('scenario.csv', CSV_SCENARIO),
+])
+def test_run_scenario_file(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+
+    runner = ScenarioRunner()
+    snapshots = list(runner.run(read_operations(str(path)), 3))
+
+    assert [snapshot.step for snapshot in snapshots] == [3, 6, 7]
+    last = snapshots[-1]
+    assert last.users == 2
+    assert last.steth_total_supply == 4000
+    assert last.asteth_total_supply == 800
+    assert last.debt_total_supply == 0
+    asteth = runner.market.asteth
+    assert asteth.balance_of(runner.address('alice')) == 700
+    assert asteth.balance_of(runner.address('bob')) == 100
+
+
+def test_bad_operation(tmp_path):
+    path = tmp_path / 'scenario.jsonl'
+    path.write_text('{"op": "stake", "user": "a", "value": 1}\n{"op": "x"}\n')
+
+    with pytest.raises(ValueError, match='line 2'):
+        list(read_operations(str(path)))
+
+
+def test_runner_is_lazy():
+    def operations():
+        yield Operation('stake', 'alice', 10.0)
+        yield Operation('deposit', 'alice', 5.0)
+        raise AssertionError('read too far')
+
+    snapshots = ScenarioRunner().run(operations(), snapshot_every=2)
+    assert next(snapshots).step == 2
+
+
+@pytest.mark.parametrize('snapshot_every', [0, -1])
+def test_snapshot_every_must_be_positive(snapshot_every):
+    with pytest.raises(ValueError):
+        next(ScenarioRunner().run([], snapshot_every))
+    with pytest.raises(SystemExit):
+        main(['scenario.jsonl', '--snapshot-every', str(snapshot_every)])
@@ -0,0 +1,25 @@
+from aave_tokens_model.core.simulation import (
+    SimulationConfig, run_simulation
+)
+
+
+def test_paths_reproducible_from_seed():
+    config = SimulationConfig(paths=8, seed=7, steps=20)
+
+    sequential = list(run_simulation(config, workers=1))
+    parallel = list(run_simulation(config, workers=2, chunk_size=3))
+
+    assert sequential == parallel
+    assert [result.path for result in parallel] == list(range(8))
+    assert sequential != list(run_simulation(config._replace(seed=8), 1))
+
+
+def test_invariants_hold_on_paths():
+    config = SimulationConfig(paths=20, seed=1, steps=30)
+
+    for result in run_simulation(config, workers=1):
+        scale = max(result.asteth_total_supply, 1.0)
+        assert abs(result.supply_residual) / scale < 1e-9
+        assert abs(result.balances_residual) / scale < 1e-9
+        assert abs(result.shares_residual) / scale < 1e-9
+        assert result.debt_total_supply >= 0
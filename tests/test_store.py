@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.ledger import MappedLedger, address_bytes
+from aave_tokens_model.core.numeric import DecimalMath, FixedPointMath, WAD
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.store import load_market, save_market
+from aave_tokens_model.core.tokens import Market, StETH
+from aave_tokens_model.core.utilities import Address
+
+
+def _populate(market, accounts):
+    for i, user in enumerate(accounts):
+        market.stake(user, 100 + 10 * i)
+    for user in accounts[:6]:
+        market.deposit(user, 50)
+    market.borrow(accounts[7], 30)
+    market.advance(10 ** 5)
+    market.rebase(1.1)
+
+
+def _assert_same(market, loaded, accounts):
+    assert loaded.step == market.step
+    assert loaded.block == market.block
+    for token, other in zip(
+            (market.steth, market.debtsteth, market.asteth),
+            (loaded.steth, loaded.debtsteth, loaded.asteth)
+    ):
+        assert other.address == token.address
+        assert other.total_supply() == pytest.approx(token.total_supply())
+        for user in accounts + [market.asteth.address]:
+            assert other.balance_of(user) == pytest.approx(
+                token.balance_of(user)
+            )
+
+
+@pytest.mark.parametrize('factory', [Market, Market.with_array_ledgers])
+def test_round_trip(tmp_path, factory, accounts):
+    market = factory(rate_model=RateModel())
+    _populate(market, accounts)
+    save_market(market, str(tmp_path))
+
+    loaded = load_market(str(tmp_path), rate_model=RateModel())
+    assert isinstance(loaded.steth._balances.base.values, np.memmap)
+    _assert_same(market, loaded, accounts)
+
+    for current in (market, loaded):
+        current.advance(10 ** 4)
+        current.repay(accounts[7], 10)
+        current.transfer(accounts[0], accounts[9], 5)
+    _assert_same(market, loaded, accounts)
+
+
+def test_read_only(tmp_path, accounts):
+    market = Market()
+    _populate(market, accounts)
+    save_market(market, str(tmp_path))
+
+    loaded = load_market(str(tmp_path), writable=False)
+    _assert_same(market, loaded, accounts)
+    with pytest.raises(TypeError):
+        loaded.stake(accounts[0], 1)
+
+
+def test_mapped_ledger_lookups(accounts):
+    users = accounts[:5]
+    keys = address_bytes(users)
+    order = np.argsort(keys)
+    ledger = MappedLedger(keys[order], np.arange(5.0)[order])
+
+    assert [ledger[user] for user in users] == [0, 1, 2, 3, 4]
+    assert ledger.get_many(accounts[3:7]).tolist() == [3, 4, 0, 0]
+    assert accounts[9] not in ledger and str(accounts[0]) in ledger
+    assert dict(ledger.items()) == dict(zip(users, range(5)))
+    assert ledger.can_spend(users[3:5] + users[4:5], np.ones(3) * 2)
+    assert not ledger.can_spend(users[1:2] * 2, np.ones(2))
+
+
+def test_addresses_ending_with_zero_bytes(tmp_path):
+    users = [Address(0x100), Address(0x2), Address(0x10000)]
+    market = Market()
+    for user in users:
+        market.stake(user, 10)
+
+    save_market(market, str(tmp_path / 'first'))
+    loaded = load_market(str(tmp_path / 'first'))
+    assert set(users) <= set(loaded.steth._balances.base)
+    save_market(loaded, str(tmp_path / 'second'))
+    loaded = load_market(str(tmp_path / 'second'))
+
+    assert [loaded.steth.balance_of(user) for user in users] == [10] * 3
+    assert loaded.steth.state()['balances'] == market.steth.state()[
+        'balances'
+    ]
+
+
+@pytest.mark.parametrize('numeric, unit', [
+    (FixedPointMath(), WAD), (DecimalMath(), Decimal(1))
+])
+def test_exact_backends_are_refused(tmp_path, numeric, unit, accounts):
+    market = Market(StETH(numeric=numeric))
+    market.stake(accounts[0], 1000 * unit)
+    market.deposit(accounts[0], 500 * unit)
+
+    directory = tmp_path / 'market'
+    with pytest.raises(TypeError, match='float backend'):
+        save_market(market, str(directory))
+    assert not directory.exists()
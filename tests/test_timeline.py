@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from aave_tokens_model.__main__ import main
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.scenario import (
+    Operation, ScenarioRunner, read_operations
+)
+from aave_tokens_model.core.timeline import (
+    BLOCKS_PER_DAY, Timeline, read_rebase_factors
+)
+from aave_tokens_model.core.tokens import Market
+
+OPERATIONS = [
+    Operation('stake', 'alice', 1000.0, day=0),
+    Operation('stake', 'bob', 1000.0, day=0),
+    Operation('deposit', 'alice', 800.0, day=0),
+    Operation('borrow', 'bob', 300.0, day=3),
+    Operation('repay', 'bob', 100.0, day=40),
+    Operation('deposit', 'bob', 200.0, day=41),
+]
+
+
+def _factors(days):
+    return 1 + np.random.default_rng(1).uniform(0, 2e-4, days)
+
+
+def _day_by_day(runner, factors, operations):
+    """Replay history with a rebase and a clock move per day."""
+    market = runner.market
+    operations = list(operations)
+    for day, factor in enumerate(factors):
+        for operation in operations:
+            if operation.day == day:
+                runner.apply(operation)
+        market.advance(BLOCKS_PER_DAY)
+        market.rebase(factor)
+    market.accrue()
+
+
+@pytest.mark.parametrize('rate_model, rel', [
+    (None, 1e-12), (RateModel(), 1e-4)
+])
+def test_matches_day_by_day(rate_model, rel):
+    factors = _factors(60)
+    reference = ScenarioRunner(Market(rate_model=rate_model))
+    _day_by_day(reference, factors, OPERATIONS)
+
+    runner = ScenarioRunner(Market(rate_model=rate_model))
+    timeline = Timeline(runner, factors)
+    assert list(timeline.run(OPERATIONS)) == []
+    runner.market.accrue()
+    assert timeline.day == 60
+    # Two jumps of clock and rebase per gap between operation days.
+    assert runner.market.step == len(OPERATIONS) + 2 * 4
+
+    market, expected = runner.market, reference.market
+    assert market.block == expected.block
+    assert market.asteth.liq_index == pytest.approx(
+        expected.asteth.liq_index, rel=rel
+    )
+    assert market.debtsteth.bor_index == pytest.approx(
+        expected.debtsteth.bor_index, rel=rel
+    )
+    for user in ('alice', 'bob'):
+        for token, reference_token in zip(
+                (market.steth, market.asteth, market.debtsteth),
+                (expected.steth, expected.asteth, expected.debtsteth)
+        ):
+            assert token.balance_of(runner.address(user)) == pytest.approx(
+                reference_token.balance_of(reference.address(user)), rel=rel
+            )
+
+
+def test_reports_only_requested_days():
+    factors = _factors(60)
+    runner = ScenarioRunner()
+    timeline = Timeline(runner, factors)
+    reports = list(timeline.run(OPERATIONS, report_days=[50, 2, 40]))
+
+    assert [report.day for report in reports] == [2, 40, 50]
+    # Operations of a day run before its report.
+    day_40 = reports[1]
+    assert day_40.debt_total_supply == pytest.approx(200)
+    assert day_40.steth_total_supply == pytest.approx(
+        2000 * np.prod(factors[:41])
+    )
+    assert day_40.block == 41 * BLOCKS_PER_DAY
+
+    with pytest.raises(ValueError):
+        list(Timeline(ScenarioRunner(), factors).run([], report_days=[60]))
+
+
+def test_operations_out_of_order():
+    timeline = Timeline(ScenarioRunner(), _factors(10))
+    operations = [
+        Operation('stake', 'alice', 10.0, day=5),
+        Operation('stake', 'bob', 10.0, day=4),
+    ]
+    with pytest.raises(ValueError, match='already passed'):
+        list(timeline.run(operations))
+
+
+def test_read_files(tmp_path):
+    history = tmp_path / 'apr.csv'
+    history.write_text('day,apr\n2021-01-01,0.0365\n2021-01-02,0.073\n')
+    assert read_rebase_factors(str(history)) == pytest.approx(
+        [1.0001, 1.0002]
+    )
+    history.write_text('day,factor\n0,1.5\n1,x\n')
+    with pytest.raises(ValueError, match='line 3'):
+        read_rebase_factors(str(history))
+
+    scenario = tmp_path / 'scenario.csv'
+    scenario.write_text('op,user,value,to,day\nstake,alice,10,,3\n')
+    assert next(read_operations(str(scenario))).day == 3
+
+
+def test_report_days_need_rebases(tmp_path, capsys):
+    scenario = tmp_path / 'scenario.csv'
+    scenario.write_text('op,user,value,to,day\nstake,alice,10,,0\n')
+    with pytest.raises(SystemExit):
+        main([str(scenario), '--report-days', '3'])
+    assert '--report-days needs --rebases' in capsys.readouterr().err
@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from aave_tokens_model.core.numeric import DecimalMath, FixedPointMath, WAD
+from aave_tokens_model.core.rates import RateModel
+from aave_tokens_model.core.tokens import Market, StETH
+from aave_tokens_model.core.whatif import what_if_rebase
+
+
+@pytest.mark.parametrize('market', [
+    Market(rate_model=RateModel()), Market.with_array_ledgers()
+])
+def test_matches_mutated_forks(market, accounts):
+    a, b, c, d = accounts[:4]
+    market.stake(a, 1000)
+    market.stake(b, 1000)
+    market.deposit(a, 500)
+    market.deposit(b, 300)
+    market.borrow(c, 200)
+    market.advance(10 ** 5)
+    market.rebase(1.1)
+    state = market.state()
+
+    users = [a, b, c, d]
+    factors = [0.9, 1.0, 1.05]
+    liq_factors = [1.0, 1.01, 1.02]
+    what_if = what_if_rebase(market, users, factors, liq_factors, 1.03)
+
+    for i, factor in enumerate(factors):
+        fork = market.fork()
+        fork.steth.rebase_mul(factor)
+        fork.asteth.increase_liq_index_mul(liq_factors[i])
+        fork.debtsteth.increase_bor_index_mul(1.03)
+        for matrix, token in [
+            (what_if.steth(), fork.steth),
+            (what_if.asteth(), fork.asteth),
+            (what_if.debtsteth(), fork.debtsteth),
+        ]:
+            assert matrix[i] == pytest.approx(
+                [token.balance_of(user) for user in users]
+            )
+    assert market.state() == state
+
+
+def test_empty_market(accounts):
+    what_if = what_if_rebase(Market(), accounts[:2], np.linspace(0.9, 1.1, 5))
+    assert what_if.asteth().shape == (5, 2)
+    assert not what_if.steth().any()
+
+
+@pytest.mark.parametrize('numeric, unit', [
+    (FixedPointMath(), WAD), (DecimalMath(), Decimal(1))
+])
+def test_other_backends(numeric, unit, accounts):
+    a, b, c = accounts[:3]
+    market = Market(StETH(numeric=numeric))
+    market.stake(a, 1000 * unit)
+    market.stake(b, 1000 * unit)
+    market.deposit(a, 500 * unit)
+    market.borrow(c, 200 * unit)
+    market.rebase('1.1')
+
+    users = [a, b, c]
+    factors = ['0.9', '1', '1.05']
+    what_if = what_if_rebase(market, users, [float(f) for f in factors])
+    for i, factor in enumerate(factors):
+        fork = market.fork()
+        fork.rebase(factor)
+        for matrix, token in [
+            (what_if.steth(), fork.steth),
+            (what_if.asteth(), fork.asteth),
+            (what_if.debtsteth(), fork.debtsteth),
+        ]:
+            assert matrix[i] == pytest.approx(
+                [float(token.balance_of(user)) for user in users], rel=1e-9
+            )